@@ -0,0 +1,116 @@
+# EnviroSnoop HTTP Writer Loop Jitter Benchmark 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Measures how late a periodic "sensor" task wakes up while InfluxDB writes are in flight to a deliberately
+# slow local stand-in server. The blocking case posts with a plain blocking socket (like the old
+# adafruit_requests path); the non-blocking case uses AsyncHTTPWriter.
+#
+# CPython only (from the repository root):  python bench/bench_http_jitter.py
+# Exits non-zero if the non-blocking writer lets the sensor task jitter by more than MAX_JITTER_MS.
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from async_http import AsyncHTTPWriter
+
+# How long the stand-in server waits before answering each request (seconds)
+SERVER_DELAY = 0.5
+# Number of writes per run
+WRITES = 4
+# Period of the simulated sensor task (seconds)
+TICK = 0.05
+# Largest acceptable wakeup lateness for the non-blocking writer (ms)
+MAX_JITTER_MS = 40
+
+BODY = b"env,device=bme680,location=Bench temperature=21.5,humidity=40.2,pressure=1012.8"
+
+# ------------------------
+# Slow stand-in server
+# ------------------------
+
+# Accepts connections, reads the request, waits SERVER_DELAY and answers 204
+def serve(listener):
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except OSError:
+            return
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+def handle(conn):
+    with conn:
+        data = b""
+        while b"\r\n\r\n" not in data:
+            chunk = conn.recv(1024)
+            if not chunk:
+                return
+            data += chunk
+        head, _, body = data.partition(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        while len(body) < length:
+            body += conn.recv(1024)
+        time.sleep(SERVER_DELAY)
+        conn.sendall(b"HTTP/1.1 204 No Content\r\nConnection: close\r\n\r\n")
+
+# ------------------------
+# Measurement
+# ------------------------
+
+# Periodic task standing in for a read_* coroutine; records how late each wakeup is
+async def sensor_task(lateness, stop):
+    expected = time.monotonic() + TICK
+    while not stop.is_set():
+        await asyncio.sleep(TICK)
+        now = time.monotonic()
+        lateness.append(max(0.0, now - expected))
+        expected = now + TICK
+
+# The old behaviour: a blocking POST inside a coroutine
+def blocking_post(port):
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        sock.sendall(b"POST /api/v2/write HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY)
+        return sock.recv(512)
+
+async def run(port, non_blocking):
+    lateness = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(sensor_task(lateness, stop))
+    writer = AsyncHTTPWriter(socket, f"http://127.0.0.1:{port}/api/v2/write", {"Content-Type": "text/plain"})
+    await asyncio.sleep(TICK * 2)
+    for _ in range(WRITES):
+        if non_blocking:
+            await writer.post(BODY)
+        else:
+            blocking_post(port)
+        await asyncio.sleep(0)
+    stop.set()
+    await ticker
+    return max(lateness) * 1000, sum(lateness) / len(lateness) * 1000
+
+def main():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+    port = listener.getsockname()[1]
+    threading.Thread(target=serve, args=(listener,), daemon=True).start()
+    print(f"{WRITES} writes to a server answering after {SERVER_DELAY}s, sensor tick {TICK * 1000:.0f} ms")
+    blocking_max, blocking_mean = asyncio.run(run(port, False))
+    print(f"blocking      max lateness {blocking_max:8.1f} ms  mean {blocking_mean:6.1f} ms")
+    async_max, async_mean = asyncio.run(run(port, True))
+    print(f"non-blocking  max lateness {async_max:8.1f} ms  mean {async_mean:6.1f} ms")
+    listener.close()
+    if async_max > MAX_JITTER_MS:
+        print(f"FAIL: non-blocking jitter above {MAX_JITTER_MS} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
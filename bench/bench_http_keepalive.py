@@ -0,0 +1,141 @@
+# EnviroSnoop HTTPS Connection Reuse Benchmark 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Posts a series of writes to a local HTTPS stand-in server and reports TLS handshakes, reuse ratio and time per
+# write, with and without keep-alive. The server closes every CLOSE_EVERY-th connection after answering (without
+# saying so), so the keep-alive run also exercises detecting a connection the server has dropped; the last run
+# lets the connection go idle for longer than the idle timeout between writes.
+#
+# CPython only (from the repository root):  python bench/bench_http_keepalive.py
+# Needs the openssl command line tool to create a throwaway self-signed certificate.
+# Exits non-zero if keep-alive doesn't reuse connections as expected.
+
+import asyncio
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from async_http import AsyncHTTPWriter
+
+# Number of writes per run
+WRITES = 40
+# The server drops each connection after this many requests
+CLOSE_EVERY = 10
+# Idle timeout (seconds) for the idle run, and the pause between its writes
+IDLE_TIMEOUT = 0.2
+IDLE_PAUSE = 0.3
+# Smallest acceptable reuse ratio for the keep-alive run
+MIN_REUSE_RATIO = 0.8
+
+BODY = b"env,device=bme680,location=Bench temperature=21.5,humidity=40.2,pressure=1012.8"
+
+# ------------------------
+# HTTPS stand-in server
+# ------------------------
+
+# Throwaway self-signed certificate; returns (certfile, keyfile)
+def make_certificate(directory):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cert, key
+
+def serve(listener, context):
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except OSError:
+            return
+        threading.Thread(target=handle, args=(conn, context), daemon=True).start()
+
+# Answers 204 to every request on a connection (HTTP/1.1 keep-alive) and closes it after CLOSE_EVERY requests
+def handle(conn, context):
+    try:
+        conn = context.wrap_socket(conn, server_side=True)
+    except (OSError, ssl.SSLError):
+        conn.close()
+        return
+    with conn:
+        data = b""
+        for _ in range(CLOSE_EVERY):
+            while b"\r\n\r\n" not in data:
+                chunk = conn.recv(1024)
+                if not chunk:
+                    return
+                data += chunk
+            head, _, data = data.partition(b"\r\n\r\n")
+            length = 0
+            close = False
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+                if line.lower() == b"connection: close":
+                    close = True
+            while len(data) < length:
+                data += conn.recv(1024)
+            data = data[length:]
+            conn.sendall(b"HTTP/1.1 204 No Content\r\n\r\n")
+            if close:
+                return
+
+# ------------------------
+# Measurement
+# ------------------------
+
+async def run(port, keep_alive, idle_timeout=30, pause=0.0):
+    client_context = ssl.create_default_context()
+    client_context.check_hostname = False
+    client_context.verify_mode = ssl.CERT_NONE
+    writer = AsyncHTTPWriter(socket, f"https://127.0.0.1:{port}/api/v2/write", {"Content-Type": "text/plain"},
+                             client_context, keep_alive=keep_alive, idle_timeout=idle_timeout)
+    writes = WRITES if not pause else 5
+    elapsed = 0.0
+    for _ in range(writes):
+        start = time.monotonic()
+        status, _ = await writer.post(BODY)
+        elapsed += time.monotonic() - start
+        if status != 204:
+            raise OSError(f"unexpected status {status}")
+        if pause:
+            await asyncio.sleep(pause)
+    writer.close()
+    return writer, elapsed / writes * 1000
+
+def report(name, writer, per_write_ms):
+    print(f"{name:<12} requests {writer.requests:3d}  handshakes {writer.handshakes:3d}  "
+          f"reuse {writer.reuse_ratio:4.0%}  stale {writer.stale:2d}  idle reconnects {writer.idle_reconnects:2d}  "
+          f"retries {writer.retries:2d}  {per_write_ms:6.2f} ms/write")
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_context.load_cert_chain(cert, key)
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+    port = listener.getsockname()[1]
+    threading.Thread(target=serve, args=(listener, server_context), daemon=True).start()
+    print(f"{WRITES} writes over HTTPS, server drops each connection after {CLOSE_EVERY} requests")
+    close_writer, close_ms = asyncio.run(run(port, False))
+    report("close", close_writer, close_ms)
+    keep_writer, keep_ms = asyncio.run(run(port, True))
+    report("keep-alive", keep_writer, keep_ms)
+    idle_writer, idle_ms = asyncio.run(run(port, True, IDLE_TIMEOUT, IDLE_PAUSE))
+    report("idle", idle_writer, idle_ms)
+    listener.close()
+    if keep_writer.reuse_ratio < MIN_REUSE_RATIO or idle_writer.idle_reconnects != 4:
+        print("FAIL: connections not reused as expected")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# EnviroSnoop Line Protocol Encoder Benchmark 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Compares three ways of encoding one full send cycle (all four sensors enabled, 17 fields): the old per-field
+# f-strings, the batch with the preallocated LineEncoder (the default, INFLUXDB_PREALLOCATED_ENCODER) and the
+# batch with string-formatted lines. The two batches produce the same bodies. On CPython the encoder is the slowest
+# of the three; see line_protocol.py for the figures.
+#
+# On CPython (from the repository root):  python bench/bench_line_protocol.py
+# On the device: copy this file next to code.py and the EnviroSnoop modules and run it from the REPL with
+#   import bench_line_protocol
+#
+# Allocation figures:
+# - CircuitPython: bytes allocated per point, from gc.mem_alloc() deltas with the collector disabled.
+# - CPython: peak transient bytes per cycle from tracemalloc (CPython frees temporaries immediately, so the
+#   total allocated isn't observable there; use the device figures for the real heap churn).
+
+import gc
+import sys
+import time
+
+# Make the modules in src/ importable when run from a checkout
+try:
+    import os
+    _here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.join(os.path.dirname(_here), "src"))
+except (ImportError, AttributeError, NameError):
+    pass
+
+from influx_batch import LineBatch
+
+# Number of cycles measured per approach
+ITERATIONS = 200
+LOCATION = "Some-Room"
+
+# One cycle worth of readings, grouped per device like the send loop does
+READINGS = (
+    ("radsens", (("radiation_intensity_dynamic", 14.3), ("radiation_intensity_static", 12.8), ("number_of_pulses", 1532))),
+    ("bme680", (("temperature", 21.563720703125), ("humidity", 41.20458984375), ("pressure", 1012.8524169921875), ("gas_resistance", 132548), ("altitude", 3.72113037109375))),
+    ("scd4x", (("co2", 612), ("temperature", 22.41455078125), ("humidity", 39.9871826171875))),
+    ("pm25", (("pm10_standard", 3), ("pm25_standard", 5), ("pm100_standard", 6), ("pm10_env", 3), ("pm25_env", 5), ("pm100_env", 6))),
+)
+POINTS_PER_CYCLE = sum(len(fields) for _, fields in READINGS)
+
+# The previous approach: one f-string per field, each encoded on its way to the socket
+def encode_fstrings():
+    size = 0
+    for device, fields in READINGS:
+        for name, value in fields:
+            size += len(f"{name},device={device},location={LOCATION} value={value}".encode())
+    return size
+
+# The batched approaches: one line per device, formatted as strings or written into one reused buffer
+text_batch = LineBatch("env", LOCATION, 4096, preallocated=False)
+encoder_batch = LineBatch("env", LOCATION, 4096)
+
+def _encode(batch):
+    batch.clear()
+    for device, fields in READINGS:
+        batch.add_point(device, fields)
+    size = 0
+    for body in batch.bodies():
+        size += len(body)
+    return size
+
+def encode_text():
+    return _encode(text_batch)
+
+def encode_preallocated():
+    return _encode(encoder_batch)
+
+# Measure time and allocations for one approach
+def measure(name, fn):
+    # Warm up caches (prefixes, field keys) before measuring
+    fn()
+    gc.collect()
+    mem_alloc = getattr(gc, "mem_alloc", None)
+    tracemalloc = None
+    if mem_alloc is not None:
+        gc.disable()
+        before = mem_alloc()
+    else:
+        import tracemalloc
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.monotonic_ns()
+    for _ in range(ITERATIONS):
+        size = fn()
+    elapsed = time.monotonic_ns() - start
+    if mem_alloc is not None:
+        allocated = (mem_alloc() - before) / (ITERATIONS * POINTS_PER_CYCLE)
+        gc.enable()
+        alloc_label = "bytes allocated/point"
+    else:
+        allocated = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        alloc_label = "peak transient bytes/cycle"
+    per_point_us = elapsed / (ITERATIONS * POINTS_PER_CYCLE) / 1000
+    print(f"{name:10s} {per_point_us:8.2f} us/point  {allocated:8.1f} {alloc_label}  {size} bytes/cycle")
+
+print(f"{POINTS_PER_CYCLE} points per cycle, {ITERATIONS} cycles")
+measure("f-string", encode_fstrings)
+measure("formatted", encode_text)
+measure("encoder", encode_preallocated)
@@ -0,0 +1,90 @@
+# EnviroSnoop Logging Overhead Benchmark 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Measures the per-call cost of logging a sensor reading (the 12-field PM2.5 message) when logging is disabled:
+# - the previous structured_log(), which always formatted the f-string before checking whether any sink was on
+# - Logger.log() with no sinks (console and syslog both off)
+# - Logger.log() with a sink but the message below LOG_LEVEL
+# and, for reference, the cost when a (no-op) sink does receive the message.
+#
+# On CPython (from the repository root):  python bench/bench_logging.py
+# On the device: copy this file next to code.py and the EnviroSnoop modules and run  import bench_logging
+
+import sys
+import time
+
+# Make the modules in src/ importable when run from a checkout
+try:
+    import os
+    _here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.join(os.path.dirname(_here), "src"))
+except (ImportError, AttributeError, NameError):
+    pass
+
+from logger import Logger, S_INFO, S_ERR
+
+try:
+    import gc
+    _mem_alloc = gc.mem_alloc
+except AttributeError:
+    _mem_alloc = None
+
+# Number of calls measured per variant
+ITERATIONS = 5000
+
+# A representative PM2.5 frame
+FRAME = (3, 5, 6, 3, 5, 6, 612, 180, 30, 4, 1, 0)
+
+TEMPLATE = "PM2.5 Data - PM 1.0 (Standard): %s, PM2.5 (Standard): %s, PM10 (Standard): %s, PM 1.0 (Env): %s, PM2.5 (Env): %s, PM10 (Env): %s, Particles > 0.3um: %s, Particles > 0.5um: %s, Particles > 1.0um: %s, Particles > 2.5um: %s, Particles > 5.0um: %s, Particles > 10um: %s"
+
+# The previous structured_log() with console and syslog logging both disabled
+CONSOLE_LOG_ENABLED = False
+SYSLOG_SERVER_ENABLED = False
+
+def old_structured_log(message, level=None):
+    if level is None:
+        level = S_INFO
+    if CONSOLE_LOG_ENABLED:
+        print(message)
+    if SYSLOG_SERVER_ENABLED:
+        pass
+
+def old_call(frame):
+    old_structured_log(f"PM2.5 Data - PM 1.0 (Standard): {frame[0]}, PM2.5 (Standard): {frame[1]}, PM10 (Standard): {frame[2]}, PM 1.0 (Env): {frame[3]}, PM2.5 (Env): {frame[4]}, PM10 (Env): {frame[5]}, Particles > 0.3um: {frame[6]}, Particles > 0.5um: {frame[7]}, Particles > 1.0um: {frame[8]}, Particles > 2.5um: {frame[9]}, Particles > 5.0um: {frame[10]}, Particles > 10um: {frame[11]}", S_INFO)
+
+def new_call(log, frame):
+    log(TEMPLATE, S_INFO, *frame)
+
+def null_sink(level, message):
+    pass
+
+# Run one variant and return (ns per call, bytes allocated per call or None)
+def measure(call, *args):
+    if _mem_alloc is not None:
+        gc.collect()
+        before = _mem_alloc()
+    start = time.monotonic_ns()
+    for _ in range(ITERATIONS):
+        call(*args)
+    elapsed = time.monotonic_ns() - start
+    allocated = (_mem_alloc() - before) / ITERATIONS if _mem_alloc is not None else None
+    return elapsed / ITERATIONS, allocated
+
+def show(name, result):
+    ns, allocated = result
+    text = f"{name:34s} {ns / 1000:8.2f} us/call"
+    if allocated is not None:
+        text += f"  {allocated:8.1f} bytes/call"
+    print(text)
+
+no_sinks = Logger()
+filtered = Logger(S_ERR)
+filtered.add_sink(null_sink)
+emitting = Logger(S_INFO, 0)
+emitting.add_sink(null_sink)
+
+print(f"{ITERATIONS} calls, 12-field PM2.5 message")
+show("old structured_log (disabled)", measure(old_call, FRAME))
+show("Logger, no sinks", measure(new_call, no_sinks.log, FRAME))
+show("Logger, below LOG_LEVEL", measure(new_call, filtered.log, FRAME))
+show("Logger, emitted to a no-op sink", measure(new_call, emitting.log, FRAME))
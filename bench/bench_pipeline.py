@@ -0,0 +1,303 @@
+# EnviroSnoop Acquisition-to-Write Pipeline Benchmark 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Runs code.py in the host simulation (see sim/) and measures, per task iteration:
+# - cpu_us: real CPU time of one iteration (one send_data_to_influxdb() cycle, one update_display() tick, one
+#   read_* iteration). Virtual time spent blocked on simulated devices isn't included.
+# - alloc_bytes: bytes allocated per iteration. Taken from gc.mem_alloc() deltas where the VM has it; CPython
+#   doesn't, so there it is the sum of tracemalloc's peak transient bytes over the iteration's steps.
+# - wire_bytes: bytes sent to InfluxDB per send cycle (request heads and bodies)
+# - lag_ms_mean / lag_ms_max: how late the task woke up after its sleep, in virtual time (blocking device accesses
+#   and TLS handshakes of other tasks delay it)
+#
+# Each task step is timed by wrapping the task's coroutine; an iteration ends whenever the task suspends in
+# TaskMonitor.sleep(). Timing and allocations are measured in separate runs, since tracing allocations slows
+# everything down.
+#
+# CPython 3.11+ only (from the repository root):
+#   python bench/bench_pipeline.py                   # compare against bench/baselines/pipeline.json
+#   python bench/bench_pipeline.py --update          # write the current results as the new baseline
+#   python bench/bench_pipeline.py --threshold 0.05 --time-threshold 1.0
+# Exits non-zero if a metric is worse than its baseline by more than the threshold (CPU time has its own, looser
+# threshold, since it depends on the machine).
+
+import argparse
+import collections.abc
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT, "sim"))
+
+import asyncio
+
+from simulation import Simulation
+from world import World
+
+BASELINE_PATH = os.path.join(_ROOT, "bench", "baselines", "pipeline.json")
+# Virtual seconds simulated per scenario
+DURATION = 3600
+# Default regression thresholds (fraction of the baseline)
+THRESHOLD = 0.10
+TIME_THRESHOLD = 0.50
+# CPU time of tasks with fewer iterations than this is too noisy to compare
+MIN_TIMED_ITERATIONS = 10
+
+# Settings shared by every scenario: everything enabled, nothing logged
+SETTINGS = {
+    "ENABLE_SCD4X_SENSOR": "TRUE",
+    "ENABLE_BME680_SENSOR": "TRUE",
+    "ENABLE_RADSENS_SENSOR": "TRUE",
+    "ENABLE_PM25_SENSOR": "TRUE",
+    "ENABLE_DISPLAY": "TRUE",
+    "CONSOLE_LOG_ENABLED": "FALSE",
+    "SYSLOG_SERVER_ENABLED": "FALSE",
+    "TASK_MONITORING": "FALSE",
+    "MEMORY_MONITORING": "FALSE",
+}
+
+# Blocking time (seconds) per access of each simulated device
+LATENCIES = {"scd4x": 0.002, "bme680": 0.15, "radsens": 0.002, "ssd1306": 0.025}
+
+# InfluxDB unreachable for 15 minutes: the breaker opens, writes go to the spool and are drained afterwards
+def _outage(world):
+    world.influxdb.outages.append((900, 1800))
+
+# Scenario name -> (settings overrides, function preparing the world or None)
+SCENARIOS = {
+    "steady": ({}, None),
+    "influxdb_outage": ({}, _outage),
+    "graph_display": ({"DISPLAY_MODE": "graph"}, None),
+}
+
+# Metric -> (threshold kind, absolute slack below which a change is ignored)
+METRICS = {
+    "cpu_us": ("time", 5.0),
+    "alloc_bytes": ("value", 64),
+    "wire_bytes": ("value", 16),
+    "lag_ms_mean": ("value", 1.0),
+    "lag_ms_max": ("value", 5.0),
+}
+
+# ------------------------
+# Task Probe
+# ------------------------
+
+class TaskStats:
+    def __init__(self):
+        self.steps = 0
+        self.iterations = 0
+        self.cpu_ns = 0
+        self.alloc_bytes = 0
+        self.lag_ns = 0
+        self.lag_max_ns = 0
+        self.wakes = 0
+        # Virtual time (ns) the task is due to wake up from its TaskMonitor.sleep(), None while running
+        self.expected_ns = None
+
+# Seconds a suspended coroutine is sleeping for if it is waiting in TaskMonitor.sleep(), otherwise None
+def _monitor_sleep(coro):
+    while coro is not None:
+        code = getattr(coro, "cr_code", None)
+        if code is not None and code.co_qualname == "TaskMonitor.sleep":
+            return coro.cr_frame.f_locals.get("seconds")
+        coro = getattr(coro, "cr_await", None)
+    return None
+
+# Wraps a task's coroutine and accounts every step (send/throw) to the task's statistics
+class TaskProbe(collections.abc.Coroutine):
+    def __init__(self, coro, stats, clock, allocations):
+        self.coro = coro
+        self.stats = stats
+        self.clock = clock
+        self.allocations = allocations
+
+    def send(self, value):
+        return self._step(self.coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self.coro.throw, *args)
+
+    def close(self):
+        self.coro.close()
+
+    def __await__(self):
+        return self.coro.__await__()
+
+    def _step(self, method, *args):
+        stats = self.stats
+        clock = self.clock
+        if stats.expected_ns is not None:
+            lag = clock.now_ns - stats.expected_ns
+            stats.wakes += 1
+            if lag > 0:
+                stats.lag_ns += lag
+                if lag > stats.lag_max_ns:
+                    stats.lag_max_ns = lag
+            stats.expected_ns = None
+        allocations = self.allocations
+        if allocations == "mem_alloc":
+            base = gc.mem_alloc()
+        elif allocations == "tracemalloc":
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter_ns()
+        try:
+            return method(*args)
+        finally:
+            stats.cpu_ns += time.perf_counter_ns() - start
+            if allocations == "mem_alloc":
+                stats.alloc_bytes += gc.mem_alloc() - base
+            elif allocations == "tracemalloc":
+                stats.alloc_bytes += tracemalloc.get_traced_memory()[1] - base
+            stats.steps += 1
+            seconds = _monitor_sleep(self.coro)
+            if seconds is not None:
+                stats.iterations += 1
+                stats.expected_ns = clock.now_ns + int(seconds * 1_000_000_000)
+
+# Task factory wrapping every task code.py starts in a TaskProbe, keyed by the name given to task_monitor.wrap()
+class Probes:
+    def __init__(self, world, allocations=None):
+        self.world = world
+        self.allocations = allocations
+        self.tasks = {}
+
+    def __call__(self, loop, coro, **kwargs):
+        frame = getattr(coro, "cr_frame", None)
+        name = frame.f_locals.get("name") if frame is not None else None
+        if not isinstance(name, str):
+            name = getattr(coro, "__qualname__", "task")
+        stats = self.tasks.setdefault(name, TaskStats())
+        return asyncio.Task(TaskProbe(coro, stats, self.world.clock, self.allocations), loop=loop, **kwargs)
+
+# ------------------------
+# Measurement
+# ------------------------
+
+def _world():
+    world = World(seed=1)
+    for name, latency in LATENCIES.items():
+        world.device(name).latency = latency
+    return world
+
+def _simulate(scenario, duration, allocations):
+    overrides, prepare = SCENARIOS[scenario]
+    world = _world()
+    if prepare is not None:
+        prepare(world)
+    settings = dict(SETTINGS)
+    settings.update(overrides)
+    probes = Probes(world, allocations)
+    result = Simulation(world, overrides=settings, task_factory=probes).run(duration)
+    if result.error is not None:
+        raise RuntimeError(f"{scenario}: simulation stopped early: {result.error!r}")
+    return world, probes
+
+# Measure one scenario; returns {task: {metric: value}}
+def measure(scenario, duration=DURATION):
+    world, timed = _simulate(scenario, duration, None)
+    allocations = "mem_alloc" if hasattr(gc, "mem_alloc") else "tracemalloc"
+    if allocations == "tracemalloc":
+        tracemalloc.start()
+    try:
+        _, traced = _simulate(scenario, duration, allocations)
+    finally:
+        if allocations == "tracemalloc":
+            tracemalloc.stop()
+    results = {}
+    for name, stats in sorted(timed.tasks.items()):
+        if not stats.iterations:
+            continue
+        traced_stats = traced.tasks.get(name)
+        entry = {
+            "iterations": stats.iterations,
+            "cpu_us": round(stats.cpu_ns / stats.iterations / 1000, 2),
+            "alloc_bytes": round(traced_stats.alloc_bytes / traced_stats.iterations) if traced_stats else None,
+            "lag_ms_mean": round(stats.lag_ns / stats.wakes / 1_000_000, 3) if stats.wakes else 0.0,
+            "lag_ms_max": round(stats.lag_max_ns / 1_000_000, 3),
+        }
+        if name == "send_data_to_influxdb":
+            entry["wire_bytes"] = round(world.influxdb.bytes_received / stats.iterations)
+        results[name] = entry
+    return results
+
+# ------------------------
+# Baselines
+# ------------------------
+
+# Compare results against a baseline; returns a list of regression messages
+def compare(results, baseline, threshold, time_threshold):
+    regressions = []
+    for scenario, tasks in results.items():
+        for name, entry in tasks.items():
+            reference = baseline.get(scenario, {}).get(name)
+            if reference is None:
+                continue
+            for metric, (kind, slack) in METRICS.items():
+                value = entry.get(metric)
+                base = reference.get(metric)
+                if value is None or base is None:
+                    continue
+                if kind == "time" and entry["iterations"] < MIN_TIMED_ITERATIONS:
+                    continue
+                limit = base * (1 + (time_threshold if kind == "time" else threshold)) + slack
+                if value > limit:
+                    regressions.append(f"{scenario}/{name} {metric}: {value} > {limit:.2f} (baseline {base})")
+    return regressions
+
+def report(scenario, tasks):
+    print(f"\n{scenario}")
+    print(f"  {'task':<24}{'iters':>7}{'cpu us':>10}{'alloc B':>10}{'wire B':>9}{'lag ms':>9}{'max':>9}")
+    for name, entry in tasks.items():
+        wire = entry.get("wire_bytes")
+        alloc = entry.get("alloc_bytes")
+        print(f"  {name:<24}{entry['iterations']:>7}{entry['cpu_us']:>10.1f}{alloc if alloc is not None else '-':>10}"
+              f"{wire if wire is not None else '-':>9}{entry['lag_ms_mean']:>9.2f}{entry['lag_ms_max']:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the EnviroSnoop acquisition-to-write pipeline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed regression for allocations, bytes and lag (fraction, default 0.10)")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD,
+                        help="allowed regression for CPU time (fraction, default 0.50)")
+    parser.add_argument("--duration", type=float, default=DURATION, help="virtual seconds per scenario")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these scenarios")
+    args = parser.parse_args()
+
+    results = {}
+    for scenario in args.scenario or SCENARIOS:
+        results[scenario] = measure(scenario, args.duration)
+        report(scenario, results[scenario])
+
+    if args.update:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"duration": args.duration, "scenarios": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}; run with --update to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("duration") != args.duration:
+        print(f"\nbaseline was recorded over {baseline.get('duration')} s, not {args.duration} s; not compared")
+        sys.exit(1)
+    regressions = compare(results, baseline["scenarios"], args.threshold, args.time_threshold)
+    if regressions:
+        print("\nFAIL: regressions against the baseline")
+        for message in regressions:
+            print("  " + message)
+        sys.exit(1)
+    print("\nno regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# EnviroSnoop Task Instrumentation Overhead Benchmark 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Measures the cost of one task iteration boundary with plain asyncio.sleep(0), with TaskMonitor.sleep()
+# disabled (TASK_MONITORING = "FALSE") and enabled, plus the overhead the monitor reports about itself.
+#
+# On CPython (from the repository root):  python bench/bench_task_monitor.py
+# On the device: copy this file next to code.py and the EnviroSnoop modules and run  import bench_task_monitor
+
+import sys
+import time
+
+# Make the modules in src/ importable when run from a checkout
+try:
+    import os
+    _here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.join(os.path.dirname(_here), "src"))
+except (ImportError, AttributeError, NameError):
+    pass
+
+import asyncio
+
+from task_monitor import TaskMonitor
+
+# Number of iterations measured per variant
+ITERATIONS = 2000
+
+async def plain():
+    for _ in range(ITERATIONS):
+        await asyncio.sleep(0)
+
+async def monitored(monitor):
+    for _ in range(ITERATIONS):
+        await monitor.sleep("bench", 0)
+
+# Run one variant and return ns per iteration
+def measure(coro):
+    start = time.monotonic_ns()
+    asyncio.run(coro)
+    return (time.monotonic_ns() - start) / ITERATIONS
+
+base = measure(plain())
+disabled = measure(monitored(TaskMonitor(False, "Bench")))
+enabled_monitor = TaskMonitor(True, "Bench")
+enabled = measure(monitored(enabled_monitor))
+
+print(f"{ITERATIONS} iterations")
+print(f"asyncio.sleep(0)          {base / 1000:8.2f} us/iteration")
+print(f"TaskMonitor disabled      {disabled / 1000:8.2f} us/iteration  (+{(disabled - base) / 1000:.2f} us)")
+print(f"TaskMonitor enabled       {enabled / 1000:8.2f} us/iteration  (+{(enabled - base) / 1000:.2f} us)")
+print(f"self-reported overhead    {enabled_monitor.overhead_ns / ITERATIONS / 1000:8.2f} us/iteration")
@@ -0,0 +1,26 @@
+# EnviroSnoop Simulation Stand-in: RadSens 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Every getter is one bus access to the "radsens" device
+
+from world import current
+
+class CG_RadSens:
+    def __init__(self, i2c, address=0x66):
+        self.i2c = i2c
+        self.address = address
+        self._world = current()
+        self._world.access("radsens")
+
+    def _read(self, field):
+        self._world.access("radsens")
+        return self._world.value("radsens", field)
+
+    def get_rad_intensy_dynamic(self):
+        return self._read("radiation_intensity_dynamic")
+
+    def get_rad_intensy_static(self):
+        return self._read("radiation_intensity_static")
+
+    def get_number_of_pulses(self):
+        return int(self._read("number_of_pulses"))
@@ -0,0 +1,67 @@
+# EnviroSnoop Simulation Stand-in: adafruit_bme680 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Like the driver, every property triggers a forced measurement through _perform_reading() (one access to the
+# "bme680" device, whose latency models the conversion and heater time) and then reads its results, unless the
+# previous conversion finished less than 1 / refresh_rate seconds ago.
+
+import time
+
+from world import current
+
+class Adafruit_BME680_I2C:
+    def __init__(self, i2c, address=0x77, debug=False, *, refresh_rate=10):
+        self.i2c = i2c
+        self.address = address
+        self.sea_level_pressure = 1013.25
+        self._world = current()
+        self._world.access("bme680")
+        self._temperature = None
+        self._humidity = None
+        self._pressure = None
+        self._gas = None
+        self._last_reading = 0
+        self._min_refresh_time = 1 / refresh_rate
+        # Conversions performed
+        self.conversions = 0
+
+    def _perform_reading(self):
+        if time.monotonic() - self._last_reading < self._min_refresh_time:
+            return
+        world = self._world
+        world.access("bme680")
+        self.conversions += 1
+        self._temperature = world.value("bme680", "temperature")
+        self._humidity = world.value("bme680", "humidity")
+        self._pressure = world.value("bme680", "pressure")
+        self._gas = int(world.value("bme680", "gas_resistance"))
+        self._last_reading = time.monotonic()
+
+    @property
+    def temperature(self):
+        self._perform_reading()
+        return self._temperature
+
+    @property
+    def relative_humidity(self):
+        self._perform_reading()
+        return self._humidity
+
+    @property
+    def humidity(self):
+        return self.relative_humidity
+
+    @property
+    def pressure(self):
+        self._perform_reading()
+        return self._pressure
+
+    @property
+    def gas(self):
+        self._perform_reading()
+        return self._gas
+
+    @property
+    def altitude(self):
+        pressure = self.pressure
+        return 44330 * (1.0 - ((pressure / self.sea_level_pressure) ** 0.1903))
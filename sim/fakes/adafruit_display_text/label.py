@@ -0,0 +1,10 @@
+# EnviroSnoop Simulation Stand-in: adafruit_display_text.label 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+class Label:
+    def __init__(self, font, text="", color=0xFFFFFF, x=0, y=0, **kwargs):
+        self.font = font
+        self.text = text
+        self.color = color
+        self.x = x
+        self.y = y
@@ -0,0 +1,24 @@
+# EnviroSnoop Simulation Stand-in: adafruit_displayio_ssd1306 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# A frame push is one access to the "ssd1306" device (set its latency to model the I2C transfer time)
+
+from world import current
+
+class SSD1306:
+    def __init__(self, bus, width=128, height=64, **kwargs):
+        self.bus = bus
+        self.width = width
+        self.height = height
+        self.auto_refresh = True
+        self.root_group = None
+        self.frames = 0
+        current().device("ssd1306")
+
+    def show(self, group):
+        self.root_group = group
+
+    def refresh(self, target_frames_per_second=60, minimum_frames_per_second=0):
+        current().access("ssd1306")
+        self.frames += 1
+        return True
@@ -0,0 +1,68 @@
+# EnviroSnoop Simulation Stand-in: adafruit_scd4x 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# SCD4X in periodic measurement mode: a new measurement is ready every 5 seconds. Like the driver, data_ready is
+# one bus access and reading the values fetches the measurement (another access) when one is ready.
+
+from world import current
+
+# Seconds between measurements in periodic mode
+MEASUREMENT_INTERVAL = 5
+
+class SCD4X:
+    def __init__(self, i2c_bus, address=0x62):
+        self.i2c_bus = i2c_bus
+        self.address = address
+        self._world = current()
+        self._world.access("scd4x")
+        self._running = False
+        self._next = None
+        self._co2 = None
+        self._temperature = None
+        self._relative_humidity = None
+
+    @property
+    def serial_number(self):
+        self._world.access("scd4x")
+        return (0x12, 0x34, 0x56, 0x78, 0x9A, 0xBC)
+
+    def start_periodic_measurement(self):
+        self._world.access("scd4x")
+        self._running = True
+        self._next = self._world.clock.elapsed + MEASUREMENT_INTERVAL
+
+    def stop_periodic_measurement(self):
+        self._world.access("scd4x")
+        self._running = False
+
+    @property
+    def data_ready(self):
+        self._world.access("scd4x")
+        return self._running and self._world.clock.elapsed >= self._next
+
+    def _read_data(self):
+        world = self._world
+        world.access("scd4x")
+        self._co2 = int(world.value("scd4x", "co2"))
+        self._temperature = world.value("scd4x", "temperature")
+        self._relative_humidity = world.value("scd4x", "humidity")
+        while self._next <= world.clock.elapsed:
+            self._next += MEASUREMENT_INTERVAL
+
+    @property
+    def CO2(self):
+        if self.data_ready:
+            self._read_data()
+        return self._co2
+
+    @property
+    def temperature(self):
+        if self.data_ready:
+            self._read_data()
+        return self._temperature
+
+    @property
+    def relative_humidity(self):
+        if self.data_ready:
+            self._read_data()
+        return self._relative_humidity
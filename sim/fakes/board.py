@@ -0,0 +1,16 @@
+# EnviroSnoop Simulation Stand-in: board 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Raspberry Pi Pico W pin names (GP0 to GP28)
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "board." + self.name
+
+for _number in range(29):
+    globals()["GP%d" % _number] = Pin("GP%d" % _number)
+
+LED = Pin("LED")
@@ -0,0 +1,118 @@
+# EnviroSnoop Simulation Stand-in: busio 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# I2C: the sensor stand-ins model their own transfers; raw transfers here (the OLED commands) count as accesses to
+# the device at that address.
+# UART: produces the PM2.5 sensor's 32-byte frames once per second from the world's "pm25.*" signals into a
+# receive buffer of receiver_buffer_size bytes (bytes arriving while it is full are lost, as on the device).
+# The "pm25" device's error_rate (and its scheduled failures) corrupt a frame byte, and its outages stop the stream.
+
+import struct
+
+from world import current, in_window
+
+# I2C addresses of the simulated devices
+ADDRESSES = {0x3C: "ssd1306", 0x3D: "ssd1306", 0x62: "scd4x", 0x77: "bme680", 0x76: "bme680", 0x66: "radsens"}
+
+# Order of the 12 readings in a PMS frame
+PM25_FIELDS = (
+    "pm10_standard", "pm25_standard", "pm100_standard",
+    "pm10_env", "pm25_env", "pm100_env",
+    "particles_03um", "particles_05um", "particles_10um",
+    "particles_25um", "particles_50um", "particles_100um",
+)
+
+class I2C:
+    def __init__(self, scl=None, sda=None, frequency=100000, timeout=255):
+        self.frequency = frequency
+        self._locked = False
+
+    def try_lock(self):
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
+
+    def scan(self):
+        return sorted(ADDRESSES)
+
+    def writeto(self, address, buffer, start=0, end=None):
+        current().access(ADDRESSES.get(address, "i2c_%02x" % address))
+
+    def readfrom_into(self, address, buffer, start=0, end=None):
+        current().access(ADDRESSES.get(address, "i2c_%02x" % address))
+
+    def writeto_then_readfrom(self, address, out_buffer, in_buffer, out_start=0, out_end=None, in_start=0,
+                              in_end=None):
+        current().access(ADDRESSES.get(address, "i2c_%02x" % address))
+
+    def deinit(self):
+        pass
+
+class UART:
+    def __init__(self, tx=None, rx=None, baudrate=9600, timeout=1, receiver_buffer_size=64, **kwargs):
+        self.baudrate = baudrate
+        self.receiver_buffer_size = receiver_buffer_size
+        self._rx = bytearray()
+        world = current()
+        self._world = world
+        self._next_frame = world.clock.elapsed + 1
+        self.frames_sent = 0
+        self.bytes_lost = 0
+
+    # Move the frames sent since the last call into the receive buffer
+    def _receive(self):
+        world = self._world
+        now = world.clock.elapsed
+        faults = world.device("pm25")
+        while self._next_frame <= now:
+            t = self._next_frame
+            self._next_frame += 1
+            if in_window(faults.outages, t):
+                continue
+            frame = bytearray(32)
+            frame[0] = 0x42
+            frame[1] = 0x4D
+            struct.pack_into(">H", frame, 2, 28)
+            for i, field in enumerate(PM25_FIELDS):
+                value = int(world.signals[f"pm25.{field}"](t)) if f"pm25.{field}" in world.signals else 0
+                struct.pack_into(">H", frame, 4 + 2 * i, max(0, min(value, 0xFFFF)))
+            struct.pack_into(">H", frame, 30, sum(frame[:30]))
+            faults.accesses += 1
+            if faults.due(t) is not None or (faults.error_rate and world.random.random() < faults.error_rate):
+                frame[world.random.randrange(4, 30)] ^= 0x5A
+                faults.errors += 1
+            room = self.receiver_buffer_size - len(self._rx)
+            self._rx += frame[:room]
+            self.bytes_lost += max(0, len(frame) - room)
+            self.frames_sent += 1
+
+    @property
+    def in_waiting(self):
+        self._receive()
+        return len(self._rx)
+
+    def readinto(self, buffer):
+        self._receive()
+        count = min(len(buffer), len(self._rx))
+        buffer[:count] = self._rx[:count]
+        del self._rx[:count]
+        return count or None
+
+    def read(self, nbytes=None):
+        self._receive()
+        count = len(self._rx) if nbytes is None else min(nbytes, len(self._rx))
+        if not count:
+            return None
+        data = bytes(self._rx[:count])
+        del self._rx[:count]
+        return data
+
+    def reset_input_buffer(self):
+        self._rx = bytearray()
+
+    def deinit(self):
+        pass
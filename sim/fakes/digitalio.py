@@ -0,0 +1,20 @@
+# EnviroSnoop Simulation Stand-in: digitalio 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+class Direction:
+    INPUT = "input"
+    OUTPUT = "output"
+
+class Pull:
+    UP = "up"
+    DOWN = "down"
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self.value = False
+
+    def deinit(self):
+        pass
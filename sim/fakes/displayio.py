@@ -0,0 +1,67 @@
+# EnviroSnoop Simulation Stand-in: displayio 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Enough of displayio to build the text and graph pages; nothing is drawn except into Bitmap memory
+
+def release_displays():
+    pass
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self._pixels = bytearray(width * height)
+
+    def __getitem__(self, index):
+        x, y = index
+        return self._pixels[y * self.width + x]
+
+    def __setitem__(self, index, value):
+        x, y = index
+        self._pixels[y * self.width + x] = value
+
+    def fill(self, value):
+        for i in range(len(self._pixels)):
+            self._pixels[i] = value
+
+class Palette:
+    def __init__(self, color_count):
+        self._colors = [0] * color_count
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        self._colors[index] = color
+
+    def __len__(self):
+        return len(self._colors)
+
+class TileGrid:
+    def __init__(self, bitmap, pixel_shader=None, width=1, height=1, tile_width=None, tile_height=None,
+                 default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.x = x
+        self.y = y
+
+class Group:
+    def __init__(self, scale=1, x=0, y=0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self._items = []
+
+    def append(self, item):
+        self._items.append(item)
+
+    def remove(self, item):
+        self._items.remove(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
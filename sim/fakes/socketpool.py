@@ -0,0 +1,120 @@
+# EnviroSnoop Simulation Stand-in: socketpool 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# In-memory sockets connected to the servers registered with World.listen().
+# Errors follow CircuitPython: OSError with an errno, EAGAIN when a non-blocking call isn't ready, and ETIMEDOUT
+# from a blocking connect() that got no answer within the socket timeout.
+
+import errno
+
+from world import current
+
+class Socket:
+    def __init__(self, family, type):
+        self.family = family
+        self.type = type
+        self.timeout = None
+        self.tls = False
+        self.server_hostname = None
+        self._world = current()
+        # TCP: server-side connection; UDP: replies waiting to be read as (ready ns, data, address)
+        self._connection = None
+        self._replies = []
+        self.closed = False
+
+    def setsockopt(self, level, optname, value):
+        pass
+
+    def settimeout(self, value):
+        self.timeout = value
+
+    def setblocking(self, flag):
+        self.timeout = None if flag else 0
+
+    def close(self):
+        self.closed = True
+        self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # ------------------------
+    # TCP
+    # ------------------------
+
+    def connect(self, address):
+        world = self._world
+        server = world.route(address, "tcp")
+        connection = server.connect(self.tls)
+        if connection is None:
+            # No answer: a blocking connect waits out its timeout
+            if self.timeout:
+                world.clock.advance(self.timeout)
+            raise OSError(errno.ETIMEDOUT, "Connection timed out")
+        self._connection = connection
+
+    def send(self, data):
+        if self._connection is None:
+            raise OSError(errno.ENOTCONN, "Socket is not connected")
+        self._connection.receive(bytes(data))
+        return len(data)
+
+    def sendall(self, data):
+        self.send(data)
+
+    def recv_into(self, buffer, nbytes=0):
+        if self._connection is None:
+            raise OSError(errno.ENOTCONN, "Socket is not connected")
+        size = nbytes or len(buffer)
+        data = self._connection.read(size)
+        if data is None:
+            raise OSError(errno.EAGAIN, "Resource temporarily unavailable")
+        buffer[:len(data)] = data
+        return len(data)
+
+    # ------------------------
+    # UDP
+    # ------------------------
+
+    def sendto(self, data, address):
+        world = self._world
+        server = world.route(address, "udp")
+        reply = server.handle(bytes(data))
+        if reply is not None:
+            delay, payload = reply
+            self._replies.append((world.clock.now_ns + int(delay * 1_000_000_000), payload, address))
+        return len(data)
+
+    def recvfrom_into(self, buffer, nbytes=0):
+        now = self._world.clock.now_ns
+        for index, (ready, payload, address) in enumerate(self._replies):
+            if ready <= now:
+                del self._replies[index]
+                size = min(len(payload), nbytes or len(buffer))
+                buffer[:size] = payload[:size]
+                return size, address
+        raise OSError(errno.EAGAIN, "Resource temporarily unavailable")
+
+class SocketPool:
+    AF_INET = 2
+    SOCK_STREAM = 1
+    SOCK_DGRAM = 2
+    IPPROTO_TCP = 6
+    TCP_NODELAY = 1
+    EAI_NONAME = -2
+
+    def __init__(self, radio):
+        self.radio = radio
+
+    # Host names resolve to themselves; the world routes by (host, port)
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        world = current()
+        if not world.wifi.connected():
+            raise OSError(self.EAI_NONAME, "Name or service not known")
+        return [(self.AF_INET, self.SOCK_STREAM, 0, "", (host, int(port)))]
+
+    def socket(self, family=AF_INET, type=SOCK_STREAM, proto=0):
+        return Socket(family, type)
@@ -0,0 +1,23 @@
+# EnviroSnoop Simulation Stand-in: ssl 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# CircuitPython's ssl: wrap_socket() returns a socket whose connect() runs the handshake (blocking).
+# There is deliberately no SSLWantReadError, so async_http.py takes its CircuitPython path.
+
+class SSLError(OSError):
+    pass
+
+class SSLContext:
+    def __init__(self):
+        self.check_hostname = True
+
+    def load_verify_locations(self, cadata=None):
+        pass
+
+    def wrap_socket(self, sock, server_side=False, server_hostname=None):
+        sock.tls = True
+        sock.server_hostname = server_hostname
+        return sock
+
+def create_default_context():
+    return SSLContext()
@@ -0,0 +1,10 @@
+# EnviroSnoop Simulation Stand-in: supervisor 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+from world import current
+
+def ticks_ms():
+    return (current().clock.now_ns // 1_000_000) & 0x3FFFFFFF
+
+def reload():
+    raise SystemExit("supervisor.reload()")
@@ -0,0 +1,8 @@
+# EnviroSnoop Simulation Stand-in: terminalio 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+class _Font:
+    def get_bounding_box(self):
+        return 6, 12
+
+FONT = _Font()
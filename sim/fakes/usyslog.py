@@ -0,0 +1,13 @@
+# EnviroSnoop Simulation Stand-in: usyslog 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Only the severity constants are used (messages are sent by syslog_sink.py)
+
+S_EMERG = 0
+S_ALERT = 1
+S_CRIT = 2
+S_ERR = 3
+S_WARN = 4
+S_NOTICE = 5
+S_INFO = 6
+S_DEBUG = 7
@@ -0,0 +1,24 @@
+# EnviroSnoop Simulation Stand-in: wifi 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# wifi.radio backed by the world's access point (connect() blocks for its connect_latency)
+
+from world import current
+
+class Radio:
+    @property
+    def connected(self):
+        return current().wifi.connected()
+
+    @property
+    def ipv4_address(self):
+        access_point = current().wifi
+        return access_point.ipv4_address if access_point.connected() else None
+
+    def connect(self, ssid, password=None, **kwargs):
+        current().wifi.join()
+
+    def disconnect(self):
+        current().wifi.joined = False
+
+radio = Radio()
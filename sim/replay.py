@@ -0,0 +1,215 @@
+# EnviroSnoop Trace Replay 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Replays a trace recorded on the device (TRACE_ENABLED, see src/sensor_trace.py) through the unmodified code.py
+# in the host simulation:
+# - every recorded reading becomes the value its sensor stand-in returns from that time on
+# - every recorded sensor error makes the first access of that sensor around that time fail the same way
+# - the InfluxDB stand-in answers the writes with the recorded statuses, in order (writes that timed out or failed
+#   on the network are left unanswered, so they time out again)
+# The read_* tasks, the reading store, the report filter, the batching, the breaker and the spool all run as they
+# did on the device, so a field problem can be reproduced, stepped through and profiled on a host.
+#
+# From the repository root (copy the trace file(s) off the CIRCUITPY drive first):
+#   python sim/replay.py envirosnoop_trace.bin.old envirosnoop_trace.bin
+#   python sim/replay.py envirosnoop_trace.bin --list              # the runs (boots) in the trace
+#   python sim/replay.py envirosnoop_trace.bin --run 0 --speed 1000
+#   python sim/replay.py envirosnoop_trace.bin --profile 30        # also print the 30 costliest functions
+#
+# Virtual time runs as fast as the host allows unless --speed caps it (e.g. 1000 virtual seconds per real second).
+
+import argparse
+import bisect
+import cProfile
+import os
+import pstats
+import sys
+
+_SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _SIM_DIR)
+
+from simulation import SETTINGS_PATH, SRC_DIR, Simulation
+from world import World
+
+sys.path.insert(0, SRC_DIR)
+from sensor_trace import (KIND_BOOT, KIND_COUNT, KIND_ERROR, KIND_READING, KIND_WRITE, ERROR_RUNTIME, read_trace)
+sys.path.remove(SRC_DIR)
+
+# Sensor device name -> setting enabling it
+SENSOR_SETTINGS = {
+    "scd4x": "ENABLE_SCD4X_SENSOR",
+    "bme680": "ENABLE_BME680_SENSOR",
+    "radsens": "ENABLE_RADSENS_SENSOR",
+    "pm25": "ENABLE_PM25_SENSOR",
+}
+# Errors are recorded after the failed read; the failure is scheduled this many seconds earlier so the same read
+# iteration hits it
+ERROR_LEAD = 0.5
+# Virtual seconds to keep running after the last record (lets the last send cycle finish)
+TAIL = 15
+
+# ------------------------
+# Trace
+# ------------------------
+
+# One run (from a boot to the next) of a trace, with times in seconds relative to its start
+class TraceRun:
+    def __init__(self):
+        # name ("device.field") -> ([time], [value])
+        self.readings = {}
+        # device -> [(time, code)]
+        self.errors = {}
+        # [(time, status, body bytes, ms taken)]
+        self.writes = []
+        # Span covered, in seconds
+        self.span = 0.0
+        self.booted = False
+
+    def devices(self):
+        names = {name.split(".", 1)[0] for name in self.readings}
+        names.update(self.errors)
+        return names
+
+    def count(self):
+        return sum(len(times) for times, _ in self.readings.values())
+
+# Split the records of one or more trace files (oldest first) into runs. A file that doesn't start with a boot
+# (it was rotated in the middle of a run) continues the run before it.
+def load_runs(paths):
+    runs = []
+    run = None
+    origin = last = wrap = 0
+    for path in paths:
+        for kind, name, ticks, payload in read_trace(path):
+            if kind == KIND_BOOT or run is None:
+                run = TraceRun()
+                run.booted = kind == KIND_BOOT
+                runs.append(run)
+                origin = last = ticks
+                wrap = 0
+            # ticks_ms wraps every 2**32 ms (about 49.7 days). Records are only roughly in time order (the
+            # readings are captured a channel at a time), so only a big step back is a wrap.
+            ticks += wrap
+            if ticks < last - (1 << 31):
+                wrap += 1 << 32
+                ticks += 1 << 32
+            last = max(last, ticks)
+            t = (ticks - origin) / 1000
+            run.span = max(run.span, t)
+            if kind in (KIND_READING, KIND_COUNT):
+                times, values = run.readings.setdefault(name, ([], []))
+                times.append(t)
+                values.append(payload[0])
+            elif kind == KIND_ERROR:
+                run.errors.setdefault(name.split(".", 1)[0], []).append((t, payload[0]))
+            elif kind == KIND_WRITE:
+                run.writes.append((t,) + tuple(payload))
+    return runs
+
+# ------------------------
+# Replay World
+# ------------------------
+
+# Signal holding each recorded value until the next one (the first value before it was recorded)
+def held(times, values):
+    def signal(t):
+        return values[max(bisect.bisect_right(times, t) - 1, 0)]
+    return signal
+
+def _exception(code):
+    if code > 0:
+        return OSError(code, os.strerror(code))
+    if code == ERROR_RUNTIME:
+        return RuntimeError("replayed sensor error")
+    return ValueError("replayed sensor error")
+
+# A World that plays back run, starting at the world's current time
+def replay_world(run, seed=0):
+    world = World(seed=seed)
+    start = world.clock.elapsed
+    world.signals = {}
+    for name, (times, values) in run.readings.items():
+        world.signals[name] = held([start + t for t in times], values)
+    for device, errors in run.errors.items():
+        world.device(device).failures.extend((max(start, start + t - ERROR_LEAD), _exception(code))
+                                             for t, code in errors)
+    world.influxdb.script.extend(status if status > 0 else None for _, status, _, _ in run.writes)
+    return world
+
+# ------------------------
+# Report
+# ------------------------
+
+def _statuses(statuses):
+    counts = {}
+    for status in statuses:
+        key = "no response" if status is None or status <= 0 else str(status)
+        counts[key] = counts.get(key, 0) + 1
+    return ", ".join(f"{key}: {count}" for key, count in sorted(counts.items())) or "none"
+
+def describe(index, run):
+    start = "boot" if run.booted else "mid-run"
+    errors = sum(len(errors) for errors in run.errors.values())
+    return (f"run {index} ({start}): {run.span:.0f} s, {run.count()} readings from {', '.join(sorted(run.devices()))}, "
+            f"{errors} sensor errors, {len(run.writes)} writes")
+
+def report(run, result):
+    world = result.world
+    print(result.summary())
+    print(f"writes recorded: {_statuses(status for _, status, _, _ in run.writes)}")
+    print(f"writes replayed: {_statuses(status for _, status, _ in world.influxdb.writes)}")
+    for device in sorted(run.errors):
+        print(f"{device} errors recorded: {len(run.errors[device])}, replayed: {world.device(device).errors}")
+    if world.influxdb.script:
+        print(f"{len(world.influxdb.script)} recorded writes were not reached by the replay")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded EnviroSnoop trace through code.py")
+    parser.add_argument("trace", nargs="+", help="trace file(s), oldest first (e.g. the .old file, then the current one)")
+    parser.add_argument("--list", action="store_true", help="list the runs in the trace and exit")
+    parser.add_argument("--run", type=int, default=-1, help="run to replay (default: the last one)")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="maximum virtual seconds per real second (default: as fast as possible)")
+    parser.add_argument("--settings", default=SETTINGS_PATH, help="settings.toml the device ran with")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override a setting")
+    parser.add_argument("--seed", type=int, default=0, help="seed for anything random in the replay")
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help="profile the replay and print the N functions with the most cumulative time")
+    args = parser.parse_args()
+
+    runs = load_runs(args.trace)
+    if not runs:
+        print("the trace holds no records")
+        sys.exit(1)
+    if args.list:
+        for index, run in enumerate(runs):
+            print(describe(index, run))
+        return
+    run = runs[args.run]
+    print(describe(args.run % len(runs), run))
+
+    # Run the sensors the trace has readings from, and don't record a new trace unless asked to
+    overrides = {"TRACE_ENABLED": "FALSE"}
+    devices = run.devices()
+    for device, key in SENSOR_SETTINGS.items():
+        overrides[key] = "TRUE" if device in devices else "FALSE"
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key.strip()] = value.strip()
+
+    simulation = Simulation(replay_world(run, args.seed), args.settings, overrides, speed=args.speed)
+    duration = run.span + TAIL
+    if args.profile:
+        profiler = cProfile.Profile()
+        result = profiler.runcall(simulation.run, duration)
+    else:
+        result = simulation.run(duration)
+    report(run, result)
+    if args.profile:
+        print()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.profile)
+    if result.error is not None:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# EnviroSnoop Host Simulation Runner 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Runs src/code.py on CPython against the simulated board, sensors, WiFi and servers (see simulation.py) and
+# prints what happened.
+#
+# From the repository root:
+#   python sim/run_sim.py --duration 86400
+#   python sim/run_sim.py --set TASK_MONITORING=TRUE --set CONSOLE_LOG_ENABLED=TRUE --duration 120
+#   python sim/run_sim.py --i2c-error-rate 0.05 --influxdb-outage 600:1800 --duration 7200
+#   python sim/run_sim.py --set TRACE_ENABLED=TRUE --flash-dir /tmp/circuitpy --duration 3600
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulation import SETTINGS_PATH, Simulation
+from world import World
+
+DEVICES = ("scd4x", "bme680", "radsens", "ssd1306")
+
+# "start:end" in seconds since boot
+def window(text):
+    start, end = text.split(":", 1)
+    return float(start), float(end)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run code.py in the EnviroSnoop host simulation")
+    parser.add_argument("--duration", type=float, default=3600, help="virtual seconds to simulate (default 3600)")
+    parser.add_argument("--settings", default=SETTINGS_PATH, help="settings.toml to use (default src/settings.toml)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override a setting")
+    parser.add_argument("--flash-dir", default=None,
+                        help="directory standing in for the CIRCUITPY drive (keeps the spool and trace files)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for random faults")
+    parser.add_argument("--i2c-latency", type=float, default=0.0, help="seconds each I2C sensor access blocks for")
+    parser.add_argument("--i2c-error-rate", type=float, default=0.0, help="probability an I2C access fails")
+    parser.add_argument("--uart-error-rate", type=float, default=0.0, help="probability a PM2.5 frame is corrupted")
+    parser.add_argument("--influxdb-latency", type=float, default=0.05, help="InfluxDB response time in seconds")
+    parser.add_argument("--influxdb-error-rate", type=float, default=0.0, help="probability a write gets HTTP 503")
+    parser.add_argument("--influxdb-outage", type=window, action="append", default=[], metavar="START:END",
+                        help="window (seconds since boot) in which InfluxDB is unreachable")
+    parser.add_argument("--wifi-outage", type=window, action="append", default=[], metavar="START:END",
+                        help="window (seconds since boot) in which the access point is down")
+    args = parser.parse_args()
+
+    world = World(seed=args.seed)
+    for name in DEVICES:
+        world.device(name).latency = args.i2c_latency
+        world.device(name).error_rate = args.i2c_error_rate
+    world.device("pm25").error_rate = args.uart_error_rate
+    world.influxdb.latency = args.influxdb_latency
+    world.influxdb.error_rate = args.influxdb_error_rate
+    world.influxdb.outages.extend(args.influxdb_outage)
+    world.wifi.outages.extend(args.wifi_outage)
+
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key.strip()] = value.strip()
+
+    result = Simulation(world, args.settings, overrides, args.flash_dir).run(args.duration)
+    print(result.summary())
+    if result.error is not None:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# EnviroSnoop Host Simulation 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Runs the unmodified src/code.py on CPython against a simulated World (see world.py):
+# - the CircuitPython modules code.py imports (board, busio, wifi, socketpool, ssl, displayio, the sensor
+#   drivers, ...) are replaced by the stand-ins in fakes/
+# - os.getenv() reads settings.toml (plus overrides), like CircuitPython does
+# - time.monotonic()/monotonic_ns()/sleep()/time() and the asyncio event loop run on the world's virtual clock
+#   (see vclock.py), so hours of device time pass in seconds
+# - InfluxDB, NTP and syslog are in-memory servers at the addresses from the settings
+#
+#     world = World(seed=1)
+#     world.influxdb.outages.append((600, 900))
+#     result = Simulation(world, overrides={"TASK_MONITORING": "TRUE"}).run(3600)
+#     print(result.summary())
+#     lines = world.influxdb.lines()
+#
+# Everything is put back when the run ends, so several simulations can run one after another in one process.
+# The globals of the code.py run stay available (result.globals) for inspection.
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+from vclock import SimulationEnd, VirtualEventLoopPolicy
+from world import World, set_current
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+FAKES_DIR = os.path.join(SIM_DIR, "fakes")
+SRC_DIR = os.path.join(os.path.dirname(SIM_DIR), "src")
+CODE_PATH = os.path.join(SRC_DIR, "code.py")
+SETTINGS_PATH = os.path.join(SRC_DIR, "settings.toml")
+# Settings naming files on the CIRCUITPY drive, with their defaults (moved into the run's flash directory)
+FLASH_PATHS = {"SPOOL_PATH": "/envirosnoop_spool.bin", "TRACE_PATH": "/envirosnoop_trace.bin"}
+
+# ------------------------
+# Settings
+# ------------------------
+
+# Read a settings.toml into a dict (values as CircuitPython's os.getenv() returns them: strings and integers)
+def load_settings(path=SETTINGS_PATH):
+    with open(path, "rb") as f:
+        data = f.read()
+    if tomllib is not None:
+        return tomllib.loads(data.decode())
+    # Minimal fallback for the flat KEY = "value" files CircuitPython supports
+    settings = {}
+    for line in data.decode().splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        value = value.strip()
+        if value.startswith('"'):
+            value = value[1:value.index('"', 1)]
+        else:
+            value = int(value.split("#", 1)[0].strip())
+        settings[key.strip()] = value
+    return settings
+
+# Split an http(s) URL into (host, port)
+def _url_address(url):
+    default = 443 if url.startswith("https://") else 80
+    host = url.split("://", 1)[-1].split("/", 1)[0]
+    if ":" in host:
+        host, port = host.split(":", 1)
+        return host, int(port)
+    return host, default
+
+# ------------------------
+# Result
+# ------------------------
+
+class SimulationResult:
+    def __init__(self, world, virtual_s, real_s, completed, error, globals_):
+        self.world = world
+        # Virtual seconds simulated and the real seconds that took
+        self.virtual_s = virtual_s
+        self.real_s = real_s
+        # True if the run reached its end (False if code.py stopped by itself or raised)
+        self.completed = completed
+        # Exception that ended the run early (None otherwise)
+        self.error = error
+        # Globals of the code.py run
+        self.globals = globals_
+
+    @property
+    def speedup(self):
+        return self.virtual_s / self.real_s if self.real_s else None
+
+    def summary(self):
+        world = self.world
+        influxdb = world.influxdb
+        accepted = influxdb.accepted()
+        lines = [
+            f"simulated {self.virtual_s:.0f} s in {self.real_s:.2f} s ({self.speedup or 0:.0f}x)"
+            + ("" if self.completed else f", stopped early: {self.error!r}"),
+            f"influxdb: {len(influxdb.writes)} writes, {len(accepted)} accepted, {len(influxdb.lines())} lines, "
+            f"{influxdb.bytes_received} bytes received, {influxdb.connections} connections, "
+            f"{influxdb.handshakes} handshakes",
+            f"ntp: {world.ntp.requests} requests; syslog: {len(world.syslog.messages)} messages; "
+            f"wifi: {world.wifi.joins} joins, {world.wifi.failures} failures",
+        ]
+        for name, faults in sorted(world.devices.items()):
+            lines.append(f"{name}: {faults.accesses} accesses, {faults.errors} errors, {faults.busy_s:.2f} s busy")
+        return "\n".join(lines)
+
+# ------------------------
+# Simulation
+# ------------------------
+
+class Simulation:
+    # world: the World to run against (a default one if None)
+    # settings: path to a settings.toml, or a dict of settings
+    # overrides: settings replacing those from the file
+    # flash_dir: directory standing in for the CIRCUITPY drive (the spool and trace files go there; a temporary
+    # directory is used if None)
+    # task_factory: asyncio task factory for the run's event loop (used by the benchmarks to probe every task)
+    # speed: maximum virtual seconds per real second (None runs as fast as possible)
+    def __init__(self, world=None, settings=SETTINGS_PATH, overrides=None, flash_dir=None, code_path=CODE_PATH,
+                 task_factory=None, speed=None):
+        self.world = world if world is not None else World()
+        self.settings = dict(load_settings(settings) if isinstance(settings, str) else settings)
+        if overrides:
+            self.settings.update(overrides)
+        self.flash_dir = flash_dir
+        self.code_path = code_path
+        self.task_factory = task_factory
+        self.speed = speed
+        self._saved = None
+
+    # CircuitPython's os.getenv(): settings.toml only
+    def getenv(self, key, default=None):
+        return self.settings.get(key, default)
+
+    # Run code.py for duration virtual seconds (None runs until code.py stops by itself)
+    def run(self, duration=3600):
+        with tempfile.TemporaryDirectory() as temporary:
+            flash_dir = self.flash_dir or temporary
+            for key, default in FLASH_PATHS.items():
+                path = self.settings.get(key, default)
+                if not path.startswith(flash_dir):
+                    self.settings[key] = os.path.join(flash_dir, path.lstrip("/"))
+            self._bind_servers()
+            clock = self.world.clock
+            start_ns = clock.now_ns
+            clock.end_ns = None if duration is None else start_ns + int(duration * 1_000_000_000)
+            clock.ended = False
+            with open(self.code_path) as f:
+                code = compile(f.read(), self.code_path, "exec")
+            namespace = {"__name__": "__main__", "__file__": self.code_path}
+            completed = False
+            error = None
+            self._install()
+            started = time.perf_counter()
+            clock.pace(self.speed)
+            try:
+                exec(code, namespace)
+            except SimulationEnd:
+                completed = True
+            except Exception as e:
+                error = e
+            finally:
+                real_s = time.perf_counter() - started
+                clock.pace(None)
+                self._uninstall()
+        return SimulationResult(self.world, (clock.now_ns - start_ns) / 1_000_000_000, real_s, completed, error,
+                                namespace)
+
+    # Put the InfluxDB, NTP and syslog stand-ins at the addresses code.py will use
+    def _bind_servers(self):
+        world = self.world
+        settings = self.settings
+        url = settings.get("INFLUXDB_URL")
+        if url:
+            host, port = _url_address(url)
+            world.listen(host, port, "tcp", world.influxdb)
+        world.listen(settings.get("NTP_SERVER", "pool.ntp.org"), settings.get("NTP_PORT", 123), "udp", world.ntp)
+        if settings.get("SYSLOG_SERVER"):
+            world.listen(settings["SYSLOG_SERVER"], settings.get("SYSLOG_PORT", 514), "udp", world.syslog)
+
+    # Names of the modules to load fresh for a run: the stand-ins and the EnviroSnoop modules
+    @staticmethod
+    def _module_names():
+        names = set()
+        for directory in (FAKES_DIR, SRC_DIR):
+            for entry in os.listdir(directory):
+                if entry.endswith(".py"):
+                    names.add(entry[:-3])
+                elif os.path.isdir(os.path.join(directory, entry)) and not entry.startswith("__"):
+                    names.add(entry)
+        names.discard("code")
+        return names
+
+    def _purge(self, names):
+        removed = {}
+        for name in list(sys.modules):
+            if name.split(".", 1)[0] in names:
+                removed[name] = sys.modules.pop(name)
+        return removed
+
+    def _install(self):
+        clock = self.world.clock
+        names = self._module_names()
+        self._saved = {
+            "modules": self._purge(names),
+            "path": list(sys.path),
+            "getenv": os.getenv,
+            "time": (time.monotonic, time.monotonic_ns, time.sleep, time.time, time.time_ns),
+            "policy": asyncio.get_event_loop_policy(),
+            "random": random.getstate(),
+            "names": names,
+        }
+        sys.path[:0] = [FAKES_DIR, SRC_DIR]
+        os.getenv = self.getenv
+        time.monotonic = clock.monotonic
+        time.monotonic_ns = clock.monotonic_ns
+        time.sleep = clock.sleep
+        time.time = clock.time
+        time.time_ns = clock.time_ns
+        asyncio.set_event_loop_policy(VirtualEventLoopPolicy(clock, self.task_factory))
+        # code.py's modules draw from the global generator (e.g. the breaker's jitter); seed it from the world so a
+        # run is repeatable
+        random.seed(self.world.random.getrandbits(32))
+        set_current(self.world)
+
+    def _uninstall(self):
+        saved = self._saved
+        set_current(None)
+        asyncio.set_event_loop_policy(saved["policy"])
+        random.setstate(saved["random"])
+        time.monotonic, time.monotonic_ns, time.sleep, time.time, time.time_ns = saved["time"]
+        os.getenv = saved["getenv"]
+        sys.path[:] = saved["path"]
+        self._purge(saved["names"])
+        sys.modules.update(saved["modules"])
+        self._saved = None
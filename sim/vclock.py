@@ -0,0 +1,143 @@
+# EnviroSnoop Simulation Virtual Clock 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Virtual time for the host simulation. The clock only moves when something waits:
+# - the event loop has nothing to run until its next timer: the clock jumps straight to that timer
+# - code calls time.sleep() or a simulated device blocks (an I2C transfer, a TLS handshake): the clock advances
+#   by that long while nothing else runs, just like on the single-threaded device
+# So a simulated day takes as long as the work done in it, and the sensor and send tasks see the same ordering
+# and lateness they would on the device (minus CPU time, which costs no virtual time).
+#
+# The clock stands in for time.monotonic()/monotonic_ns()/sleep() and, through the boot epoch, time.time().
+# It can be paced to at most a given number of virtual seconds per real second (e.g. 1000x for a replay).
+
+import asyncio
+import math
+import selectors
+import time
+
+# The real clock, taken before a simulation replaces time.sleep()
+_real_sleep = time.sleep
+_real_now = time.perf_counter
+
+# Real seconds the clock has to get ahead of its pace before it waits (fewer, longer real sleeps)
+PACE_SLACK = 0.02
+
+# ------------------------
+# Errors
+# ------------------------
+
+# Raised out of the event loop when the virtual clock reaches the end of the run
+class SimulationEnd(Exception):
+    pass
+
+# Raised when every task is waiting and no timer is scheduled, so virtual time can never move again
+class SimulationStalled(Exception):
+    pass
+
+# ------------------------
+# Clock
+# ------------------------
+
+class VirtualClock:
+    # start_ns: monotonic time at boot; epoch: UTC (seconds since the epoch) at monotonic time 0
+    def __init__(self, start_ns=1_000_000_000, epoch=1_767_225_600):
+        self.now_ns = start_ns
+        self.epoch_ns = epoch * 1_000_000_000
+        # Monotonic time at which the run ends (None runs until the program stops by itself)
+        self.end_ns = None
+        self.ended = False
+        # Maximum virtual seconds per real second (None runs as fast as possible)
+        self.speed = None
+        self._pace_start = None
+
+    def monotonic(self):
+        return self.now_ns / 1_000_000_000
+
+    def monotonic_ns(self):
+        return self.now_ns
+
+    def time(self):
+        return (self.epoch_ns + self.now_ns) / 1_000_000_000
+
+    def time_ns(self):
+        return self.epoch_ns + self.now_ns
+
+    # Move the clock forward (blocking work or a sleep); never past the end of the run.
+    # Rounds up to the next nanosecond, so a timer the loop waits for is always due afterwards.
+    def advance(self, seconds):
+        if seconds <= 0:
+            return
+        now = self.now_ns + math.ceil(seconds * 1_000_000_000)
+        if self.end_ns is not None and now > self.end_ns:
+            now = max(self.end_ns, self.now_ns)
+        self.now_ns = now
+        if self.speed:
+            self._pace()
+
+    # Start pacing the clock at speed virtual seconds per real second from now (None stops pacing)
+    def pace(self, speed):
+        self.speed = speed
+        self._pace_start = (self.now_ns, _real_now()) if speed else None
+
+    # Wait in real time while the clock is ahead of its pace
+    def _pace(self):
+        start_ns, start_real = self._pace_start
+        ahead = (self.now_ns - start_ns) / 1_000_000_000 / self.speed - (_real_now() - start_real)
+        if ahead > PACE_SLACK:
+            _real_sleep(ahead)
+
+    # Blocking sleep (stands in for time.sleep())
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    # Seconds since boot (the time sensor signals and fault schedules are written in)
+    @property
+    def elapsed(self):
+        return self.now_ns / 1_000_000_000
+
+# ------------------------
+# Event Loop
+# ------------------------
+
+# Selector that polls the real file descriptors without waiting and advances the virtual clock by the timeout
+# the loop asked for instead
+class VirtualSelector(selectors.DefaultSelector):
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        clock = self.clock
+        if not clock.ended and clock.end_ns is not None and clock.now_ns >= clock.end_ns:
+            clock.ended = True
+            raise SimulationEnd()
+        if timeout is None:
+            raise SimulationStalled("every task is waiting and no timer is scheduled")
+        clock.advance(timeout)
+        return events
+
+# asyncio event loop running on the virtual clock
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    # task_factory: optional asyncio task factory installed on the loop (e.g. to instrument every task)
+    def __init__(self, clock, task_factory=None):
+        super().__init__(VirtualSelector(clock))
+        self.clock = clock
+        if task_factory is not None:
+            self.set_task_factory(task_factory)
+
+    def time(self):
+        return self.clock.monotonic()
+
+# Event loop policy that makes asyncio.run() (as called at the bottom of code.py) use a VirtualEventLoop
+class VirtualEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    def __init__(self, clock, task_factory=None):
+        super().__init__()
+        self.clock = clock
+        self.task_factory = task_factory
+
+    def new_event_loop(self):
+        return VirtualEventLoop(self.clock, self.task_factory)
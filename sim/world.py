@@ -0,0 +1,422 @@
+# EnviroSnoop Simulation World 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Everything outside the Pico W in a host simulation: what the sensors measure, how the I2C devices, the UART,
+# the access point and the servers behave, and what reached the servers. The stand-in modules in fakes/ look the
+# current world up with current() and route every device access and network operation through it.
+#
+# Scripting a run:
+#
+#     world = World(seed=1)
+#     world.signals["scd4x.co2"] = sine(800, 300, 3600)          # any callable taking seconds since boot
+#     world.device("bme680").latency = 0.2                        # each BME680 access blocks for 200 ms
+#     world.device("scd4x").error_rate = 0.05                     # 5% of SCD4X accesses raise OSError
+#     world.device("radsens").outages.append((600, 900))          # RadSens absent from 600 s to 900 s
+#     world.influxdb.outages.append((1200, 1800))                 # InfluxDB unreachable for 10 minutes
+#     world.influxdb.script.extend((500, 500))                    # the next two writes get HTTP 500
+#     world.device("bme680").failures.append((90, RuntimeError()))  # the first BME680 access after 90 s fails
+#
+# Times in schedules are seconds since boot on the virtual clock.
+
+import errno
+import math
+import random
+import struct
+
+from vclock import VirtualClock
+
+# The world the stand-in modules are currently bound to (set by Simulation while it runs)
+_current = None
+
+def current():
+    if _current is None:
+        raise RuntimeError("no simulation is running")
+    return _current
+
+def set_current(world):
+    global _current
+    _current = world
+
+# ------------------------
+# Signals
+# ------------------------
+
+# A signal is any callable taking the time in seconds since boot and returning the value a sensor reads.
+
+def constant(value):
+    return lambda t: value
+
+# Sinusoid around mean with optional uniform noise (seeded, so runs are repeatable)
+def sine(mean, amplitude, period, noise=0.0, phase=0.0, seed=0):
+    rng = random.Random(seed)
+    def signal(t):
+        value = mean + amplitude * math.sin(2 * math.pi * (t / period + phase))
+        if noise:
+            value += rng.uniform(-noise, noise)
+        return value
+    return signal
+
+# Linear ramp from start, changing by rate per second
+def ramp(start, rate):
+    return lambda t: start + rate * t
+
+# Counter that grows by rate per second (e.g. a pulse count)
+def counter(rate):
+    return lambda t: int(t * rate)
+
+# The values a quiet indoor room might show; keys are "device.field" as stored by code.py
+def default_signals():
+    return {
+        "scd4x.co2": sine(650, 150, 3600, noise=5, seed=1),
+        "scd4x.temperature": sine(22.4, 0.8, 7200, noise=0.02, seed=2),
+        "scd4x.humidity": sine(40, 3, 5400, noise=0.1, seed=3),
+        "bme680.temperature": sine(21.6, 0.8, 7200, noise=0.02, seed=4),
+        "bme680.humidity": sine(41, 3, 5400, noise=0.1, seed=5),
+        "bme680.pressure": sine(1012.8, 2.5, 43200, noise=0.02, seed=6),
+        "bme680.gas_resistance": sine(130000, 15000, 1800, noise=500, seed=7),
+        "radsens.radiation_intensity_dynamic": sine(14, 3, 600, noise=1, seed=8),
+        "radsens.radiation_intensity_static": sine(13, 0.5, 3600, seed=9),
+        "radsens.number_of_pulses": counter(0.25),
+        "pm25.pm10_standard": sine(3, 1, 900, seed=10),
+        "pm25.pm25_standard": sine(5, 2, 900, seed=11),
+        "pm25.pm100_standard": sine(6, 2, 900, seed=12),
+        "pm25.pm10_env": sine(3, 1, 900, seed=13),
+        "pm25.pm25_env": sine(5, 2, 900, seed=14),
+        "pm25.pm100_env": sine(6, 2, 900, seed=15),
+        "pm25.particles_03um": sine(600, 150, 900, seed=16),
+        "pm25.particles_05um": sine(180, 40, 900, seed=17),
+        "pm25.particles_10um": sine(40, 10, 900, seed=18),
+        "pm25.particles_25um": sine(6, 2, 900, seed=19),
+        "pm25.particles_50um": sine(2, 1, 900, seed=20),
+        "pm25.particles_100um": sine(1, 0.5, 900, seed=21),
+    }
+
+# ------------------------
+# Faults
+# ------------------------
+
+# True if t (seconds since boot) falls in one of the (start, end) windows
+def in_window(windows, t):
+    for start, end in windows:
+        if start <= t < end:
+            return True
+    return False
+
+# Behaviour of one simulated device (an I2C sensor, the display, the UART)
+class Faults:
+    def __init__(self, latency=0.0, error_rate=0.0):
+        # Seconds each access blocks for
+        self.latency = latency
+        # Probability that an access fails with an I/O error
+        self.error_rate = error_rate
+        # (start, end) windows in which the device doesn't answer at all
+        self.outages = []
+        # Scheduled failures: (time, exception) pairs in time order; the first access at or after each time raises
+        # the exception (used to replay the errors of a recorded trace)
+        self.failures = []
+        # Counters
+        self.accesses = 0
+        self.errors = 0
+        self.busy_s = 0.0
+
+    # The scheduled failure due at time t (removing it), or None
+    def due(self, t):
+        if self.failures and self.failures[0][0] <= t:
+            return self.failures.pop(0)[1]
+        return None
+
+# ------------------------
+# WiFi
+# ------------------------
+
+class AccessPoint:
+    def __init__(self, world):
+        self.world = world
+        # Seconds wifi.radio.connect() blocks for
+        self.connect_latency = 2.0
+        # (start, end) windows in which the access point is down
+        self.outages = []
+        self.ipv4_address = "192.168.4.20"
+        self.joined = False
+        # Counters
+        self.joins = 0
+        self.failures = 0
+
+    def up(self):
+        return not in_window(self.outages, self.world.clock.elapsed)
+
+    def connected(self):
+        if self.joined and not self.up():
+            self.joined = False
+        return self.joined
+
+    def join(self):
+        self.world.clock.advance(self.connect_latency)
+        if not self.up():
+            self.failures += 1
+            raise ConnectionError("No network with that ssid")
+        self.joined = True
+        self.joins += 1
+
+# ------------------------
+# Servers
+# ------------------------
+
+# One server-side TCP connection to the InfluxDB stand-in
+class HTTPConnection:
+    def __init__(self, server):
+        self.server = server
+        self._in = bytearray()
+        self._out = bytearray()
+        # Monotonic time (ns) from which the queued response can be read
+        self._ready_ns = 0
+        self.requests = 0
+        self.closed = False
+        # Close once the queued response has been read
+        self._closing = False
+        self._last_ns = server.world.clock.now_ns
+
+    # Close the connection if the server would have dropped it by now (idle timeout or an outage)
+    def check(self):
+        server = self.server
+        now = server.world.clock.now_ns
+        if not self.closed and server.idle_timeout and now - self._last_ns > server.idle_timeout * 1_000_000_000:
+            self.closed = True
+        if not server.up():
+            self.closed = True
+            raise ConnectionResetError(errno.ECONNRESET, "Connection reset")
+
+    def receive(self, data):
+        self.check()
+        if self.closed:
+            raise BrokenPipeError(errno.EPIPE, "Broken pipe")
+        self._in += data
+        self.server.bytes_received += len(data)
+        self._last_ns = self.server.world.clock.now_ns
+        while self._request():
+            pass
+
+    # Bytes of the response that are ready (up to size); b"" once the server has closed; None if not ready yet
+    def read(self, size):
+        self.check()
+        now = self.server.world.clock.now_ns
+        if self._out and now >= self._ready_ns:
+            data = bytes(self._out[:size])
+            del self._out[:size]
+            self.server.bytes_sent += len(data)
+            if not self._out and self._closing:
+                self.closed = True
+            self._last_ns = now
+            return data
+        if self.closed:
+            return b""
+        return None
+
+    # Handle one complete request from the input buffer, if there is one
+    def _request(self):
+        end = self._in.find(b"\r\n\r\n")
+        if end < 0:
+            return False
+        head = bytes(self._in[:end]).lower()
+        length = 0
+        for line in head.split(b"\r\n")[1:]:
+            if line.startswith(b"content-length:"):
+                length = int(line[15:])
+        if len(self._in) < end + 4 + length:
+            return False
+        body = bytes(self._in[end + 4:end + 4 + length])
+        del self._in[:end + 4 + length]
+        self.requests += 1
+        server = self.server
+        status = server.respond(body)
+        if status is None:
+            return True
+        asked = b"\r\nconnection: close" in head
+        close = asked or (server.max_requests and self.requests >= server.max_requests)
+        if status == 204:
+            response = b"HTTP/1.1 204 No Content\r\n"
+        else:
+            text = b'{"code":"error","message":"simulated failure"}'
+            response = b"HTTP/1.1 %d Error\r\nContent-Type: application/json\r\nContent-Length: %d\r\n" % (status, len(text))
+        # Connections stay open unless the client asks to close them; max_requests and idle_timeout close them
+        # without saying so (the connection is simply gone on the next request)
+        if asked:
+            response += b"Connection: close\r\n"
+        response += b"\r\n"
+        if status != 204:
+            response += text
+        self._out += response
+        self._ready_ns = server.world.clock.now_ns + int(server.latency * 1_000_000_000)
+        self._closing = close
+        return True
+
+# InfluxDB v2 write endpoint stand-in: accepts line protocol bodies and records them
+class InfluxDBServer:
+    def __init__(self, world):
+        self.world = world
+        # Seconds from a complete request to its response
+        self.latency = 0.05
+        # Seconds a TLS handshake blocks the device for (the handshake runs inside connect() on CircuitPython)
+        self.handshake_latency = 1.0
+        # Probability that a write is answered with HTTP 503
+        self.error_rate = 0.0
+        # Statuses to answer the next writes with, in order (before error_rate applies); None leaves a write
+        # unanswered, so the device's response timeout runs out
+        self.script = []
+        # (start, end) windows in which the server is unreachable (connects time out, open connections reset)
+        self.outages = []
+        # Close a connection (without saying so) after this many requests / this many idle seconds (0 never)
+        self.max_requests = 0
+        self.idle_timeout = 0
+        # Every write received: (monotonic time ns, status, body)
+        self.writes = []
+        # Counters
+        self.connections = 0
+        self.handshakes = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+    def up(self):
+        return not in_window(self.outages, self.world.clock.elapsed)
+
+    # Open a connection (None while the server is unreachable)
+    def connect(self, tls):
+        if not self.up():
+            return None
+        self.connections += 1
+        if tls:
+            self.handshakes += 1
+            self.world.clock.advance(self.handshake_latency)
+        return HTTPConnection(self)
+
+    # Status for a write body, recorded with the body
+    def respond(self, body):
+        if self.script:
+            status = self.script.pop(0)
+        elif self.error_rate and self.world.random.random() < self.error_rate:
+            status = 503
+        else:
+            status = 204
+        self.writes.append((self.world.clock.now_ns, status, body))
+        return status
+
+    # Bodies of the writes InfluxDB accepted
+    def accepted(self):
+        return [body for _, status, body in self.writes if status == 204]
+
+    # Every line protocol line accepted, in order
+    def lines(self):
+        return [line for body in self.accepted() for line in body.split(b"\n") if line]
+
+# SNTP server stand-in. The device's crystal runs drift_ppm fast relative to the server.
+class NTPServer:
+    def __init__(self, world):
+        self.world = world
+        # One-way network delay in seconds
+        self.delay = 0.02
+        # Frequency error of the device's clock in parts per million
+        self.drift_ppm = 0.0
+        # Probability that a request gets no reply
+        self.loss_rate = 0.0
+        # (start, end) windows in which the server doesn't answer
+        self.outages = []
+        self.requests = 0
+
+    # True UTC (ns) at device monotonic time mono_ns
+    def utc_ns(self, mono_ns):
+        clock = self.world.clock
+        return clock.epoch_ns + mono_ns - int(mono_ns * self.drift_ppm / 1_000_000)
+
+    # Reply to a request datagram: (seconds until it arrives, reply) or None if it gets lost
+    def handle(self, data):
+        self.requests += 1
+        world = self.world
+        if len(data) < 48 or not self.up() or (self.loss_rate and world.random.random() < self.loss_rate):
+            return None
+        received = self.utc_ns(world.clock.now_ns + int(self.delay * 1_000_000_000))
+        seconds = received // 1_000_000_000 + 2_208_988_800
+        fraction = ((received % 1_000_000_000) << 32) // 1_000_000_000
+        reply = bytearray(48)
+        # LI 0, version 4, mode 4 (server); stratum 2
+        reply[0] = 0x24
+        reply[1] = 2
+        reply[24:32] = data[40:48]
+        struct.pack_into("!IIII", reply, 32, seconds, fraction, seconds, fraction)
+        return 2 * self.delay, bytes(reply)
+
+    def up(self):
+        return not in_window(self.outages, self.world.clock.elapsed)
+
+# Syslog receiver stand-in: records every datagram
+class SyslogServer:
+    def __init__(self, world):
+        self.world = world
+        # (monotonic time ns, datagram)
+        self.messages = []
+
+    def handle(self, data):
+        self.messages.append((self.world.clock.now_ns, bytes(data)))
+        return None
+
+# ------------------------
+# World
+# ------------------------
+
+class World:
+    # seed: makes random faults repeatable; epoch: UTC (seconds) at boot
+    def __init__(self, seed=0, epoch=1_767_225_600):
+        self.clock = VirtualClock(epoch=epoch)
+        self.random = random.Random(seed)
+        self.signals = default_signals()
+        # Per device faults, created on first use
+        self.devices = {}
+        self.wifi = AccessPoint(self)
+        self.influxdb = InfluxDBServer(self)
+        self.ntp = NTPServer(self)
+        self.syslog = SyslogServer(self)
+        # (host, port) -> (kind, server); kind is "tcp" or "udp"
+        self.endpoints = {}
+
+    # Faults of a device (e.g. "scd4x", "bme680", "radsens", "ssd1306", "pm25")
+    def device(self, name):
+        faults = self.devices.get(name)
+        if faults is None:
+            faults = Faults()
+            self.devices[name] = faults
+        return faults
+
+    # Current value of a signal ("device.field")
+    def value(self, device, field):
+        signal = self.signals.get(device + "." + field)
+        return signal(self.clock.elapsed) if signal is not None else 0
+
+    # One blocking access to a device: costs its latency and may fail
+    def access(self, name):
+        faults = self.device(name)
+        faults.accesses += 1
+        if faults.latency:
+            self.clock.advance(faults.latency)
+            faults.busy_s += faults.latency
+        if in_window(faults.outages, self.clock.elapsed):
+            faults.errors += 1
+            raise OSError(errno.ENODEV, "No such device")
+        failure = faults.due(self.clock.elapsed)
+        if failure is not None:
+            faults.errors += 1
+            raise failure
+        if faults.error_rate and self.random.random() < faults.error_rate:
+            faults.errors += 1
+            raise OSError(errno.EIO, "Input/output error")
+
+    # Make a server reachable at host:port
+    def listen(self, host, port, kind, server):
+        self.endpoints[(host, int(port))] = (kind, server)
+
+    # Endpoint for an address, raising like a failed lookup/unreachable network would
+    def route(self, address, kind):
+        if not self.wifi.connected():
+            raise OSError(errno.EHOSTUNREACH, "No route to host")
+        endpoint = self.endpoints.get((address[0], int(address[1])))
+        if endpoint is None or endpoint[0] != kind:
+            raise OSError(errno.ECONNREFUSED, "Connection refused")
+        return endpoint[1]
@@ -0,0 +1,106 @@
+# EnviroSnoop Windowed Aggregation 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Running statistics per channel over each InfluxDB send window.
+# The sensors are sampled more often than data is sent; instead of shipping only the latest value, every sample
+# is folded into running min/max/mean/last/count as it is stored (O(1) time and memory per channel), and each
+# send cycle flushes them as fields of one line per device:
+#
+#     env,device=scd4x,location=Some-Room co2=812,co2_min=790,co2_max=845,co2_mean=811.4,co2_count=2,...
+#
+# The plain field keeps carrying the latest value, so existing queries and dashboards see the same series.
+# With a ReportFilter, channels it skips are left out of the line and keep accumulating, so the statistics of the
+# next point that is sent cover every sample since the previous one.
+# With a ClockModel, each line is stamped with the time its newest sample was read (converted from the monotonic
+# clock when the line is encoded); a line that only repeats already-sent values (a heartbeat) is stamped with the
+# current time instead, so it shows up as a new point.
+# The mean is updated incrementally (Welford), which stays accurate with CircuitPython's single-precision floats
+# where a running sum of e.g. pressure readings would not.
+
+import time
+
+from reading_store import TICKS_MASK, ticks_diff
+
+# Suffixes of the statistics fields, in the order they are written
+SUFFIXES = ("_min", "_max", "_mean", "_count")
+
+# ------------------------
+# Running Statistics
+# ------------------------
+
+class RunningStats:
+    __slots__ = ("count", "low", "high", "mean")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.low = None
+        self.high = None
+        self.mean = 0.0
+
+    def add(self, value):
+        self.count += 1
+        if self.count == 1:
+            self.low = value
+            self.high = value
+            self.mean = float(value)
+            return
+        if value < self.low:
+            self.low = value
+        elif value > self.high:
+            self.high = value
+        self.mean += (value - self.mean) / self.count
+
+# ------------------------
+# Aggregator
+# ------------------------
+
+class WindowAggregator:
+    # store: ReadingStore whose channels are aggregated (a RunningStats is attached to each channel)
+    # statistics: write the _min/_max/_mean/_count fields (False sends only the latest values)
+    def __init__(self, store, statistics=True):
+        self.store = store
+        self.statistics = statistics
+        # Per device: list of (field, channel, statistics field names)
+        self._devices = {}
+        for device, fields in store.devices.items():
+            entries = []
+            for field, channel in fields:
+                channel.stats = RunningStats()
+                entries.append((field, channel, tuple(field + suffix for suffix in SUFFIXES)))
+            self._devices[device] = entries
+
+    # Add one line per device with the latest value and the window statistics of each channel, then start a new
+    # window. Channels without new samples in the window only contribute their latest value.
+    # clock (optional ClockModel) stamps the lines; they are left unstamped while it isn't synced.
+    # report_filter (optional ReportFilter) leaves out the channels it decides not to send this cycle.
+    def flush(self, batch, clock=None, report_filter=None):
+        now_ns = time.monotonic_ns()
+        now = (now_ns // 1_000_000) & TICKS_MASK
+        for device, entries in self._devices.items():
+            fields = []
+            # Age (ms) of the newest sample that is new in this window
+            newest = None
+            for field, channel, names in entries:
+                if report_filter is not None and not report_filter.should_send(channel, now):
+                    continue
+                fields.append((field, channel.last()))
+                stats = channel.stats
+                if stats.count:
+                    age = ticks_diff(now, channel.last_time())
+                    if newest is None or age < newest:
+                        newest = age
+                    if self.statistics:
+                        fields.append((names[0], stats.low))
+                        fields.append((names[1], stats.high))
+                        fields.append((names[2], stats.mean))
+                        fields.append((names[3], stats.count))
+                    stats.reset()
+            if not fields:
+                continue
+            timestamp_ns = None
+            if clock is not None:
+                timestamp_ns = clock.to_epoch_ns(now_ns if newest is None else now_ns - newest * 1_000_000)
+            batch.add_point(device, fields, timestamp_ns)
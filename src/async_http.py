@@ -0,0 +1,433 @@
+# EnviroSnoop Non-Blocking HTTP Writer 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# This module posts bodies to an HTTP(S) endpoint over non-blocking sockets from socketpool (or the CPython
+# socket module), yielding to the asyncio event loop while it waits on I/O. Each phase of a request
+# (connect, TLS handshake, send, response) has its own timeout, so a slow or unreachable server costs the
+# sensor tasks at most a few milliseconds per poll instead of freezing the loop.
+#
+# Limitations on CircuitPython:
+# - DNS lookups are blocking (there is no async resolver); the resolved address is cached after the first lookup.
+# - CircuitPython's ssl module performs the TLS handshake inside connect() and can't run it non-blocking. For
+#   https, a plain TCP connect to the server is made first without blocking (bounded by the connect timeout, and
+#   closed right away), so an unreachable server doesn't hold up the other tasks. Only once it answers does the
+#   blocking connect+TLS run, bounded by the TLS timeout.
+#
+# Connection reuse: with keep_alive, the connection (and its TLS session) stays open between posts, so a
+# handshake, which takes seconds on the MCU, is only paid when the connection is new. Before each post the
+# connection is checked:
+# - a connection idle for longer than idle_timeout is closed and reopened (servers and NAT boxes drop idle
+#   connections silently; reconnecting first is cheaper than a failed write)
+# - a connection the server has already closed (recv returns EOF) is reopened
+# A post that fails on a reused connection before any response arrives is retried once on a new connection.
+# The connection is closed after a response that asks for it ("Connection: close") or whose body couldn't be read
+# to its end.
+#
+# Counters: requests, handshakes (new connections), reused (posts on an existing connection), stale (connections
+# found closed by the server), idle_reconnects and retries.
+
+import asyncio
+import time
+
+# CPython's ssl module can drive the handshake step by step on a non-blocking socket; CircuitPython's can't
+try:
+    from ssl import SSLWantReadError
+    _STEPPED_HANDSHAKE = True
+except ImportError:
+    _STEPPED_HANDSHAKE = False
+
+try:
+    import errno
+    _EAGAIN = errno.EAGAIN
+    _EINPROGRESS = errno.EINPROGRESS
+    _EALREADY = getattr(errno, "EALREADY", 114)
+    _EISCONN = getattr(errno, "EISCONN", 106)
+    _ETIMEDOUT = errno.ETIMEDOUT
+    _EPIPE = getattr(errno, "EPIPE", 32)
+    _ECONNRESET = getattr(errno, "ECONNRESET", 104)
+    _ENOTCONN = getattr(errno, "ENOTCONN", 128)
+except (ImportError, AttributeError):
+    _EAGAIN = 11
+    _EINPROGRESS = 115
+    _EALREADY = 114
+    _EISCONN = 106
+    _ETIMEDOUT = 110
+    _EPIPE = 32
+    _ECONNRESET = 104
+    _ENOTCONN = 128
+
+# Error numbers that mean "not ready yet, try again" on a non-blocking socket.
+# 116 is ETIMEDOUT as reported by CircuitPython's socketpool for a zero timeout.
+_WOULD_BLOCK = (_EAGAIN, _EINPROGRESS, _EALREADY, _ETIMEDOUT, 116)
+# Error numbers that mean the server dropped the connection
+_DROPPED = (_EPIPE, _ECONNRESET, _ENOTCONN)
+
+# Time (in seconds) to sleep between polls of a socket that isn't ready
+POLL_INTERVAL = 0.01
+# Longest sleep between polls of a connect that hasn't been answered (the interval doubles from POLL_INTERVAL, so a
+# server that is down costs a few polls per second instead of a hundred)
+CONNECT_POLL_MAX = 0.25
+# Size of the buffer used to read responses
+RESPONSE_BUFFER_SIZE = 512
+
+# ------------------------
+# Errors
+# ------------------------
+
+# Raised when one phase of a request exceeds its timeout; phase is "connect", "tls", "send" or "response"
+class HTTPTimeoutError(OSError):
+    def __init__(self, phase, timeout):
+        super().__init__(f"{phase} timed out after {timeout}s")
+        self.phase = phase
+
+# Raised when the server closes the connection without sending a response
+class ConnectionClosedError(OSError):
+    pass
+
+# ------------------------
+# Helpers
+# ------------------------
+
+# Split an http(s) URL into (is_tls, host, port, path_with_query)
+def parse_url(url):
+    if url.startswith("https://"):
+        is_tls, rest, port = True, url[8:], 443
+    elif url.startswith("http://"):
+        is_tls, rest, port = False, url[7:], 80
+    else:
+        raise ValueError(f"Unsupported URL: {url}")
+    slash = rest.find("/")
+    if slash < 0:
+        host, path = rest, "/"
+    else:
+        host, path = rest[:slash], rest[slash:]
+    if ":" in host:
+        host, port_text = host.split(":", 1)
+        port = int(port_text)
+    return is_tls, host, port, path
+
+# True if an exception from a non-blocking socket call just means "not ready yet"
+def _would_block(error):
+    # CPython's ssl module signals this with SSLWantReadError/SSLWantWriteError
+    name = type(error).__name__
+    if name in ("SSLWantReadError", "SSLWantWriteError", "BlockingIOError"):
+        return True
+    return bool(error.args) and error.args[0] in _WOULD_BLOCK
+
+# ------------------------
+# Writer
+# ------------------------
+
+class AsyncHTTPWriter:
+    # pool: socketpool.SocketPool (or the CPython socket module)
+    # ssl_context: required for https URLs
+    # Timeouts are in seconds, one per request phase.
+    # keep_alive: reuse the connection between posts; idle_timeout: seconds after which an idle connection is
+    # reopened before use (0 never)
+    def __init__(self, pool, url, headers, ssl_context=None,
+                 connect_timeout=5, tls_timeout=10, send_timeout=10, response_timeout=10,
+                 keep_alive=True, idle_timeout=30):
+        self.pool = pool
+        self.headers = headers
+        self.ssl_context = ssl_context
+        self.connect_timeout = connect_timeout
+        self.tls_timeout = tls_timeout
+        self.send_timeout = send_timeout
+        self.response_timeout = response_timeout
+        self.is_tls, self.host, self.port, self.path = parse_url(url)
+        if self.is_tls and ssl_context is None:
+            raise ValueError("ssl_context is required for https")
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        # Resolved address, cached after the first (blocking) lookup
+        self._address = None
+        # Open connection kept between posts, and when it was last used (time.monotonic())
+        self._sock = None
+        self._last_used = 0
+        # Counters
+        self.requests = 0
+        self.handshakes = 0
+        self.reused = 0
+        self.stale = 0
+        self.idle_reconnects = 0
+        self.retries = 0
+        # Response buffer, reused for every request
+        self._buffer = bytearray(RESPONSE_BUFFER_SIZE)
+        # Request head without Content-Length, built once
+        head = f"POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\n"
+        for key, value in headers.items():
+            head += f"{key}: {value}\r\n"
+        self._head = head + ("Connection: keep-alive" if keep_alive else "Connection: close") + "\r\nContent-Length: "
+
+    # POST a body (bytes, bytearray, memoryview or str).
+    # Returns (status_code, response_text). Raises HTTPTimeoutError or OSError on failure.
+    async def post(self, body):
+        if isinstance(body, str):
+            body = body.encode()
+        self.requests += 1
+        sock = self._reusable()
+        if sock is not None:
+            self.reused += 1
+            try:
+                return await self._exchange(sock, body)
+            except OSError as e:
+                # The server dropped the connection before answering: retry once on a new connection
+                # (anything else, e.g. a timeout, would fail the same way again)
+                if not isinstance(e, ConnectionClosedError) and not (e.args and e.args[0] in _DROPPED):
+                    raise
+                self.retries += 1
+        sock = await self._connect()
+        self.handshakes += 1
+        return await self._exchange(sock, body)
+
+    # Open the connection ahead of the first post, so its TLS handshake isn't paid in the first write (keep-alive
+    # only; does nothing if a usable connection is already open). Raises HTTPTimeoutError or OSError on failure.
+    async def open(self):
+        if not self.keep_alive or self._reusable() is not None:
+            return
+        sock = await self._connect()
+        self.handshakes += 1
+        self._sock = sock
+        self._last_used = time.monotonic()
+
+    # Fraction of posts sent on a reused connection (None before the first post)
+    @property
+    def reuse_ratio(self):
+        return self.reused / self.requests if self.requests else None
+
+    # Close the kept connection (if any)
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    # Send the request on sock and read the response; keeps sock open afterwards if it can be reused
+    async def _exchange(self, sock, body):
+        self._sock = None
+        try:
+            await self._send_all(sock, (self._head + str(len(body)) + "\r\n\r\n").encode())
+            await self._send_all(sock, body)
+            status, text, reusable = await self._read_response(sock)
+        except BaseException:
+            sock.close()
+            raise
+        if self.keep_alive and reusable:
+            self._sock = sock
+            self._last_used = time.monotonic()
+        else:
+            sock.close()
+        return status, text
+
+    # The kept connection if it is still usable, otherwise None (closing it)
+    def _reusable(self):
+        sock = self._sock
+        if sock is None:
+            return None
+        if self.idle_timeout and time.monotonic() - self._last_used > self.idle_timeout:
+            self.idle_reconnects += 1
+            self.close()
+            return None
+        if self._peer_closed(sock):
+            self.stale += 1
+            self.close()
+            return None
+        return sock
+
+    # True if the server has closed the connection (or sent something unexpected) while it was idle
+    def _peer_closed(self, sock):
+        try:
+            sock.recv_into(memoryview(self._buffer)[:1])
+        except OSError as e:
+            return not _would_block(e)
+        # EOF, or data nobody asked for
+        return True
+
+    # ------------------------
+    # Phases
+    # ------------------------
+
+    # Open a connected (and for https, TLS wrapped) non-blocking socket
+    async def _connect(self):
+        if self._address is None:
+            self._address = self.pool.getaddrinfo(self.host, self.port)[0][4]
+        pool = self.pool
+        sock = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
+        # The head and the body go out in separate sends; without TCP_NODELAY the body waits for the delayed ACK of
+        # the head on a reused connection
+        nodelay = getattr(pool, "TCP_NODELAY", None)
+        if nodelay is not None:
+            try:
+                sock.setsockopt(pool.IPPROTO_TCP, nodelay, 1)
+            except (OSError, AttributeError):
+                pass
+        try:
+            if self.is_tls:
+                return await self._connect_tls(sock)
+            sock.setblocking(False)
+            await self._connect_raw(sock)
+            return sock
+        except BaseException:
+            sock.close()
+            raise
+
+    # Non-blocking TCP connect
+    async def _connect_raw(self, sock):
+        deadline = time.monotonic() + self.connect_timeout
+        interval = POLL_INTERVAL
+        while True:
+            try:
+                sock.connect(self._address)
+                return
+            except OSError as e:
+                if e.args and e.args[0] == _EISCONN:
+                    return
+                if not _would_block(e):
+                    raise
+            if time.monotonic() >= deadline:
+                raise HTTPTimeoutError("connect", self.connect_timeout)
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, CONNECT_POLL_MAX)
+
+    # Connect and run the TLS handshake
+    async def _connect_tls(self, sock):
+        if not _STEPPED_HANDSHAKE:
+            # CircuitPython: the handshake runs inside connect(), bounded by the TLS timeout. Check that the server
+            # answers before blocking on it.
+            await self._probe()
+            tls = self.ssl_context.wrap_socket(sock, server_hostname=self.host)
+            tls.settimeout(self.tls_timeout)
+            try:
+                tls.connect(self._address)
+            except OSError as e:
+                if e.args and e.args[0] in (_ETIMEDOUT, 116):
+                    raise HTTPTimeoutError("tls", self.tls_timeout)
+                raise
+            tls.setblocking(False)
+            return tls
+        # CPython: connect without blocking, then drive the handshake while yielding to the loop
+        sock.setblocking(False)
+        await self._connect_raw(sock)
+        tls = self.ssl_context.wrap_socket(sock, server_hostname=self.host, do_handshake_on_connect=False)
+        deadline = time.monotonic() + self.tls_timeout
+        while True:
+            try:
+                tls.do_handshake()
+                return tls
+            except OSError as e:
+                if not _would_block(e):
+                    raise
+            if time.monotonic() >= deadline:
+                raise HTTPTimeoutError("tls", self.tls_timeout)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    # Open and close a plain TCP connection to the server without blocking (raises like _connect_raw())
+    async def _probe(self):
+        pool = self.pool
+        probe = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
+        try:
+            probe.setblocking(False)
+            await self._connect_raw(probe)
+        finally:
+            probe.close()
+
+    # Send every byte of data, yielding while the socket buffer is full
+    async def _send_all(self, sock, data):
+        view = memoryview(data)
+        deadline = time.monotonic() + self.send_timeout
+        while len(view):
+            try:
+                sent = sock.send(view)
+                view = view[sent:]
+                continue
+            except OSError as e:
+                if not _would_block(e):
+                    raise
+            if time.monotonic() >= deadline:
+                raise HTTPTimeoutError("send", self.send_timeout)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    # Read the status line, headers and (up to the buffer size of) the body.
+    # Returns (status_code, response_text, reusable); reusable is True if the whole response was read and the
+    # server keeps the connection open.
+    async def _read_response(self, sock):
+        buf = self._buffer
+        view = memoryview(buf)
+        length = 0
+        header_end = -1
+        # Total response size once known from the headers, whether the body is chunked, and whether the
+        # connection can be kept afterwards
+        end = None
+        chunked = False
+        reusable = False
+        deadline = time.monotonic() + self.response_timeout
+        while length < len(buf):
+            try:
+                count = sock.recv_into(view[length:])
+            except OSError as e:
+                if not _would_block(e):
+                    raise
+                if time.monotonic() >= deadline:
+                    raise HTTPTimeoutError("response", self.response_timeout)
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            if not count:
+                # Server closed the connection
+                if not length:
+                    raise ConnectionClosedError("Connection closed before the response")
+                reusable = False
+                break
+            length += count
+            if header_end < 0:
+                header_end = buf.find(b"\r\n\r\n", 0, length)
+                if header_end >= 0:
+                    end, chunked, reusable = _framing(buf, header_end)
+            if end is not None and length >= end:
+                break
+            # Last chunk of a chunked body (trailers aren't supported)
+            if chunked and buf.find(b"\r\n0\r\n\r\n", header_end, length) >= 0:
+                break
+        else:
+            # Buffer full before the end of the response: the rest would be read as the next response
+            reusable = False
+        if header_end < 0:
+            header_end = length
+        status_line_end = buf.find(b"\r\n", 0, header_end)
+        status_line = bytes(buf[:status_line_end if status_line_end >= 0 else header_end])
+        parts = status_line.split(b" ", 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise OSError(f"Bad HTTP response: {status_line}")
+        text = bytes(buf[header_end + 4:length]).decode("utf-8", "replace") if length > header_end + 4 else ""
+        return int(parts[1]), text, reusable
+
+# Work out from the header block buf[:header_end] how the response ends.
+# Returns (end, chunked, keep): the total response size if known, whether the body is chunked, and whether the
+# connection stays usable after the response.
+def _framing(buf, header_end):
+    headers = bytes(buf[:header_end]).lower()
+    chunked = False
+    if headers[9:12] in (b"204", b"304") or headers[9:10] == b"1":
+        end = header_end + 4
+    else:
+        length = _content_length(headers)
+        end = None if length is None else header_end + 4 + length
+        chunked = end is None and b"\r\ntransfer-encoding: chunked" in headers
+    keep = (headers.startswith(b"http/1.1") and b"\r\nconnection: close" not in headers
+            and (end is not None or chunked))
+    return end, chunked, keep
+
+# Parse Content-Length out of a lowercased header block
+def _content_length(headers):
+    start = headers.find(b"\r\ncontent-length:")
+    if start < 0:
+        return None
+    start += len(b"\r\ncontent-length:")
+    end = headers.find(b"\r\n", start)
+    if end < 0:
+        end = len(headers)
+    try:
+        return int(headers[start:end].strip())
+    except ValueError:
+        return None
@@ -0,0 +1,73 @@
+# EnviroSnoop BME680 Single-Measurement Sampling 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# In adafruit_bme680 every property (temperature, humidity, pressure, gas, altitude) calls _perform_reading(),
+# which runs a forced measurement and gas heater cycle unless the previous conversion finished less than
+# 1 / refresh_rate seconds ago; within that window the property is computed from the previous conversion's raw
+# data. BME680Sampler creates one logical sample out of one conversion by relying on that window: the sensor is
+# created with REFRESH_RATE, the first property read runs the conversion and the other three reuse it. Altitude is
+# computed from the pressure and the configured sea level pressure instead of another read.
+
+import math
+
+# Refresh rate (Hz) to create the driver with. The properties of one sample are read within a few ms of each other,
+# well inside the 0.5 s this gives them to share a conversion (with room for the coarse time.monotonic() of a
+# long-running board), while BME680_INTERVAL (at least 1 s) still gets a fresh conversion every sample.
+REFRESH_RATE = 2
+
+# ------------------------
+# Reading
+# ------------------------
+
+# One consolidated BME680 sample
+class BME680Reading:
+    __slots__ = ("temperature", "humidity", "pressure", "gas", "altitude", "timestamp")
+
+    def __init__(self):
+        # Degrees Celsius
+        self.temperature = None
+        # Relative humidity in percent
+        self.humidity = None
+        # Pressure in hPa
+        self.pressure = None
+        # Gas resistance in ohms
+        self.gas = None
+        # Altitude in meters, derived from pressure and sea level pressure
+        self.altitude = None
+        # time.monotonic() when the sample was taken
+        self.timestamp = None
+
+# ------------------------
+# Helpers
+# ------------------------
+
+# Standard barometric formula (same as the driver's altitude property), pressures in hPa
+def altitude_from_pressure(pressure, sea_level_pressure):
+    return 44330 * (1.0 - math.pow(pressure / sea_level_pressure, 0.1903))
+
+# ------------------------
+# Sampler
+# ------------------------
+
+class BME680Sampler:
+    # sensor: adafruit_bme680.Adafruit_BME680_I2C instance, created with refresh_rate=REFRESH_RATE
+    # sea_level_pressure: hPa, used for the altitude
+    def __init__(self, sensor, sea_level_pressure):
+        self.sensor = sensor
+        self.sea_level_pressure = sea_level_pressure
+
+    # Run one conversion and return all five values.
+    # Pass a reading to fill it in place (avoids allocating a new object every sample).
+    def sample(self, now, reading=None):
+        if reading is None:
+            reading = BME680Reading()
+        sensor = self.sensor
+        # Runs one forced measurement (and gas heater cycle)
+        reading.temperature = sensor.temperature
+        # Within the driver's refresh window, so these reuse that conversion's raw data
+        reading.humidity = sensor.humidity
+        reading.pressure = sensor.pressure
+        reading.gas = sensor.gas
+        reading.altitude = altitude_from_pressure(reading.pressure, self.sea_level_pressure)
+        reading.timestamp = now
+        return reading
@@ -0,0 +1,29 @@
+# EnviroSnoop Boot Timer 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Times the stages of startup: the setup steps at import time (logging, I2C, sensors, display, ...) and the
+# milestones reached later by the background tasks (first sample, WiFi up, time synced, first write).
+# Each stage is recorded once, the first time it is reached, as milliseconds since the timer was created.
+
+import time
+
+class BootTimer:
+    def __init__(self):
+        self.start_ns = time.monotonic_ns()
+        # (stage, ms since start) in the order the stages were reached
+        self.stages = []
+        self._reached = set()
+
+    # Record a stage. Returns (ms since start, ms since the previous stage) the first time, None afterwards.
+    def mark(self, stage):
+        if stage in self._reached:
+            return None
+        self._reached.add(stage)
+        elapsed = (time.monotonic_ns() - self.start_ns) // 1_000_000
+        previous = self.stages[-1][1] if self.stages else 0
+        self.stages.append((stage, elapsed))
+        return elapsed, elapsed - previous
+
+    # True once a stage has been reached
+    def reached(self, stage):
+        return stage in self._reached
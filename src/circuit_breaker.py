@@ -0,0 +1,102 @@
+# EnviroSnoop Circuit Breaker 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Stops hammering a server that is down.
+# While the breaker is closed every request is attempted. After threshold consecutive failures it opens: requests
+# are refused immediately (no connect, no timeout, no log line) for a cooldown period. When the cooldown has passed
+# the breaker is half-open and lets a single probe request through:
+# - if the probe succeeds the breaker closes and normal sending resumes
+# - if it fails the breaker opens again with twice the cooldown (up to max_delay)
+# Cooldowns are jittered by +/- jitter (a fraction), so devices that lost the same server don't all come back at
+# the same moment.
+#
+# Counters: trips (times opened), short_circuited (requests refused while open).
+
+import time
+
+try:
+    from random import random
+except ImportError:
+    random = None
+
+# States
+CLOSED = 0
+OPEN = 1
+HALF_OPEN = 2
+
+STATE_NAMES = ("closed", "open", "half-open")
+
+# ------------------------
+# Breaker
+# ------------------------
+
+class CircuitBreaker:
+    # threshold: consecutive failures that open the breaker
+    # base_delay / max_delay: first and longest cooldown (seconds)
+    # jitter: random spread of each cooldown (fraction, 0.2 = +/- 20%)
+    def __init__(self, threshold=3, base_delay=30, max_delay=900, jitter=0.2):
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.state = CLOSED
+        # Consecutive failures
+        self.failures = 0
+        # Current cooldown (seconds) and when the breaker may go half-open (monotonic ns)
+        self.delay = base_delay
+        self._retry_ns = 0
+        # Counters
+        self.trips = 0
+        self.short_circuited = 0
+
+    # Name of the current state
+    @property
+    def state_name(self):
+        return STATE_NAMES[self.state]
+
+    # Seconds until a probe is allowed (0 unless open)
+    def remaining(self):
+        if self.state != OPEN:
+            return 0
+        remaining = self._retry_ns - time.monotonic_ns()
+        return remaining / 1_000_000_000 if remaining > 0 else 0
+
+    # True if the cooldown has passed and the next request will be the probe (see allow())
+    def probe_due(self):
+        return self.state == OPEN and time.monotonic_ns() >= self._retry_ns
+
+    # True if a request may be sent now (going half-open once the cooldown has passed; only the first caller
+    # after that gets the probe). Refused requests are counted.
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic_ns() >= self._retry_ns:
+            self.state = HALF_OPEN
+            return True
+        self.short_circuited += 1
+        return False
+
+    # Record a successful request (the server was reachable)
+    def success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.delay = self.base_delay
+
+    # Record a failed request
+    def failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            # The probe failed: back off further
+            self.delay = min(self.delay * 2, self.max_delay)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.threshold:
+            self.delay = self.base_delay
+            self._open()
+
+    def _open(self):
+        delay = self.delay
+        if self.jitter and random is not None:
+            delay *= 1 + self.jitter * (2 * random() - 1)
+        self._retry_ns = time.monotonic_ns() + int(delay * 1_000_000_000)
+        self.state = OPEN
+        self.trips += 1
@@ -0,0 +1,95 @@
+# EnviroSnoop Clock Model 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Maps the monotonic clock to UTC so samples can be stamped with the time they were taken.
+# Samples are stamped on the monotonic clock when they are read (see reading_store.py) and only converted to
+# epoch nanoseconds when they are encoded, so:
+# - samples taken before the first NTP sync are stamped correctly once a sync arrives, instead of being dropped
+# - send latency, retries and the send interval don't move points in the series
+#
+# Each NTP sync gives a (utc, monotonic) pair. The model keeps the latest pair as its reference and estimates the
+# drift of the monotonic clock (the crystal's frequency error) from consecutive syncs, smoothed over several
+# syncs, so times between syncs are extrapolated with the drift corrected:
+#
+#     utc = sync_utc + (mono - sync_mono) * (1 + drift)
+#
+# A drift measurement beyond max_drift (e.g. a bad NTP reply or a step in server time) resets the reference
+# without touching the drift estimate.
+
+import time
+
+# Shortest time between syncs (seconds) that measures the drift: over shorter spans the error of the NTP replies
+# outweighs the drift itself. NTP_MIN_INTERVAL can't be set below this (see config.py).
+MIN_DRIFT_INTERVAL = 60
+
+# ------------------------
+# Clock Model
+# ------------------------
+
+class ClockModel:
+    # max_drift: largest plausible frequency error (ratio; 500e-6 = 500 ppm)
+    # smoothing: weight given to each new drift measurement (0..1)
+    # min_interval: shortest time between syncs (seconds) used for a drift measurement
+    def __init__(self, max_drift=500e-6, smoothing=0.5, min_interval=MIN_DRIFT_INTERVAL):
+        self.max_drift = max_drift
+        self.smoothing = smoothing
+        self.min_interval_ns = min_interval * 1_000_000_000
+        # Reference pair from the latest sync (None until the first sync)
+        self.sync_utc_ns = None
+        self.sync_mono_ns = 0
+        # Estimated drift of the monotonic clock (ratio) and whether it has been measured yet
+        self.drift = 0.0
+        self.drift_known = False
+        # Difference between the latest sync and what the model predicted for it (ns)
+        self.last_error_ns = 0
+        self.syncs = 0
+
+    # True once the model has a reference (at least one sync)
+    @property
+    def synced(self):
+        return self.sync_utc_ns is not None
+
+    # Estimated drift in parts per million
+    @property
+    def drift_ppm(self):
+        return self.drift * 1_000_000
+
+    # Take a sync: utc_ns is UTC (ns since the epoch) at monotonic time mono_ns (defaults to now).
+    # Returns the prediction error in ns (0 for the first sync).
+    def update(self, utc_ns, mono_ns=None):
+        if mono_ns is None:
+            mono_ns = time.monotonic_ns()
+        error = 0
+        if self.synced:
+            error = utc_ns - self.to_epoch_ns(mono_ns)
+            interval = mono_ns - self.sync_mono_ns
+            if interval >= self.min_interval_ns:
+                measured = ((utc_ns - self.sync_utc_ns) - interval) / interval
+                if -self.max_drift <= measured <= self.max_drift:
+                    if self.drift_known:
+                        self.drift += self.smoothing * (measured - self.drift)
+                    else:
+                        self.drift = measured
+                        self.drift_known = True
+        self.sync_utc_ns = utc_ns
+        self.sync_mono_ns = mono_ns
+        self.last_error_ns = error
+        self.syncs += 1
+        return error
+
+    # UTC (ns since the epoch) for a monotonic time, or None before the first sync
+    def to_epoch_ns(self, mono_ns):
+        if self.sync_utc_ns is None:
+            return None
+        elapsed = mono_ns - self.sync_mono_ns
+        return self.sync_utc_ns + elapsed + int(elapsed * self.drift)
+
+    # Current UTC (ns since the epoch), or None before the first sync
+    def now_ns(self):
+        return self.to_epoch_ns(time.monotonic_ns())
+
+# Stand-in for a ClockModel that stamps lines with the monotonic time itself, for batches encoded before the first
+# sync (see spool.restamp_lines(), which converts them once the sync arrives)
+class MonotonicStamps:
+    def to_epoch_ns(self, mono_ns):
+        return mono_ns
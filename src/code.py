@@ -6,82 +6,132 @@
 # ------------------------
 
 # Import minimum necessary libraries and modules
-import os
 import gc
-import struct
 import board
 import digitalio
 import wifi
 import socketpool
-import adafruit_ntp
 import time
 import asyncio
 import supervisor
 import busio
-import adafruit_requests as requests
 import ssl
+from i2c_arbiter import I2CArbiter, PRIORITY_NORMAL, PRIORITY_LOW
+from task_monitor import TaskMonitor
+from memory_manager import MemoryManager
+from logger import Logger
+from line_protocol import make_prefix
+from async_http import AsyncHTTPWriter, HTTPTimeoutError
+from influx_batch import LineBatch
+from spool import RecordSpool, stamp_lines, restamp_lines
+from reading_store import ReadingStore, ticks_ms, ticks_diff
+from aggregator import WindowAggregator
+from clock_model import ClockModel, MonotonicStamps
+from sntp import SNTPClient, next_interval
+from circuit_breaker import CircuitBreaker, CLOSED
+from report_filter import ReportFilter
+from sensor_trace import TraceRecorder, STATUS_TIMEOUT, STATUS_ERROR
+from boot_timer import BootTimer
+from config import load as load_config, load_deadbands
+
+# Startup stage timings (logged as each stage is reached, see boot_stage())
+boot = BootTimer()
+
+# Settings from settings.toml, read, converted and checked once (see config.py). Every problem found is reported
+# together in a ConfigError, which stops the program here, before any hardware is touched.
+config = load_config()
 
 # Syslog
 # Define s so it's always present
 s = None
 # Syslog enabled/disabled
-SYSLOG_SERVER_ENABLED = os.getenv('SYSLOG_SERVER_ENABLED', 'false').lower() == 'true'
-# Try to import usyslog if enabled
+SYSLOG_SERVER_ENABLED = config.SYSLOG_SERVER_ENABLED
+# Try to import usyslog if enabled (only its severity constants are used; messages are sent by syslog_sink.py)
 try:
     if SYSLOG_SERVER_ENABLED:
         import usyslog
 except Exception:
-    # import failed; disable syslog
-    SYSLOG_SERVER_ENABLED = False
+    # import failed; the constants below are used instead
+    pass
 
 # Ensure constants always exist
 if 'usyslog' not in globals():
     class _USyslogShim:
+        S_DEBUG = 7
         S_INFO = 6
+        S_WARN = 4
         S_ERR  = 3
     usyslog = _USyslogShim()
 
 # Syslog server configuration for syslog logging (if enabled)
 if SYSLOG_SERVER_ENABLED:
+    # Queued sink that sends from its own task (only imported when syslog is enabled)
+    from syslog_sink import SyslogSink
     # Syslog server location
-    SYSLOG_SERVER = os.getenv('SYSLOG_SERVER')
+    SYSLOG_SERVER = config.SYSLOG_SERVER
     # Syslog port
-    SYSLOG_PORT = int(os.getenv('SYSLOG_PORT', 514))  # Default to 514 if not set
+    SYSLOG_PORT = config.SYSLOG_PORT
+    # Number of messages that can wait to be sent (more are dropped and counted)
+    SYSLOG_QUEUE_SIZE = config.SYSLOG_QUEUE_SIZE
+    # Pack several queued messages into one datagram, separated by newlines (the receiver must split them)
+    SYSLOG_PACK_MESSAGES = config.SYSLOG_PACK_MESSAGES
 
 # Console logging enabled/disabled
-CONSOLE_LOG_ENABLED = os.getenv('CONSOLE_LOG_ENABLED', 'false').lower() == 'true'
+CONSOLE_LOG_ENABLED = config.CONSOLE_LOG_ENABLED
+
+# Minimum log level (syslog severity name or number; e.g. "INFO" drops DEBUG messages, "ERR" keeps only errors)
+LOG_LEVEL = config.LOG_LEVEL
+# Rate limit per message template: at most LOG_RATE_LIMIT_BURST messages every LOG_RATE_LIMIT_INTERVAL seconds (0 disables)
+LOG_RATE_LIMIT_INTERVAL = config.LOG_RATE_LIMIT_INTERVAL
+LOG_RATE_LIMIT_BURST = config.LOG_RATE_LIMIT_BURST
 
 # Memory monitoring enabled/disabled
-ENABLE_MEMORY_MONITORING = os.getenv('MEMORY_MONITORING', 'false').lower() == 'true'
+ENABLE_MEMORY_MONITORING = config.MEMORY_MONITORING
+
+# Garbage collection policy (see memory_manager.py)
+# Allocation threshold after which the VM collects by itself (0 keeps the VM default of collecting only when an allocation fails)
+GC_THRESHOLD_BYTES = config.GC_THRESHOLD_BYTES
+# The idle task collects when free memory drops below this many bytes
+GC_IDLE_FREE_BYTES = config.GC_IDLE_FREE_BYTES
+# How often (in seconds) the idle task checks free memory
+GC_IDLE_INTERVAL = config.GC_IDLE_INTERVAL
+# Free memory (in bytes) to make sure of before each InfluxDB cycle, so the TLS handshake doesn't run out of memory
+GC_TLS_RESERVE_BYTES = config.GC_TLS_RESERVE_BYTES
+# Report the largest free block (fragmentation) with the memory monitoring output (probes the heap, so it costs time)
+GC_MEASURE_FRAGMENTATION = config.GC_MEASURE_FRAGMENTATION
+
+# Task monitoring (per-task timing, loop lag and error counts published as envirosnoop_internal) enabled/disabled
+ENABLE_TASK_MONITORING = config.TASK_MONITORING
 
 
 # Environment variables to determine if a sensor is enabled
 # BME680
-ENABLE_BME680_SENSOR = os.getenv('ENABLE_BME680_SENSOR', 'true').lower() == 'true'
+ENABLE_BME680_SENSOR = config.ENABLE_BME680_SENSOR
 # Import if enabled
 if ENABLE_BME680_SENSOR:
     import adafruit_bme680
+    from bme680_sample import REFRESH_RATE as BME680_REFRESH_RATE, BME680Reading, BME680Sampler
 
 # SCD4X
-ENABLE_SCD4X_SENSOR = os.getenv('ENABLE_SCD4X_SENSOR', 'true').lower() == 'true'
+ENABLE_SCD4X_SENSOR = config.ENABLE_SCD4X_SENSOR
 # Import if enabled
 if ENABLE_SCD4X_SENSOR:
     import adafruit_scd4x
 
 #RadSens
-ENABLE_RADSENS_SENSOR = os.getenv('ENABLE_RADSENS_SENSOR', 'true').lower() == 'true'
+ENABLE_RADSENS_SENSOR = config.ENABLE_RADSENS_SENSOR
 # Import if enabled
 if ENABLE_RADSENS_SENSOR:
     from RadSens import CG_RadSens
 
 # PMS7003
-ENABLE_PM25_SENSOR = os.getenv('ENABLE_PM25_SENSOR', 'true').lower() == 'true'
+ENABLE_PM25_SENSOR = config.ENABLE_PM25_SENSOR
 # Import if enabled
 if ENABLE_PM25_SENSOR:
-    from adafruit_pm25.uart import PM25_UART
+    from pms_parser import FIELD_NAMES as PM25_FIELD_NAMES, PMSReader
 
 # SSD1306
-ENABLE_DISPLAY = os.getenv('ENABLE_DISPLAY', 'true').lower() == 'true'
+ENABLE_DISPLAY = config.ENABLE_DISPLAY
 # Display OK flag set to false to begin with
 DISPLAY_OK = False
 # Import if enabled
@@ -90,6 +140,8 @@ if ENABLE_DISPLAY:
     import adafruit_displayio_ssd1306
     import terminalio
     from adafruit_display_text import label
+    from display_renderer import DisplayRenderer
+    from sparkline import SparklineGraph
     # CP 9+: I2CDisplay moved/renamed. Fall back for CP 8.x.
     try:
         from i2cdisplaybus import I2CDisplayBus
@@ -98,27 +150,30 @@ if ENABLE_DISPLAY:
 
 
     # ---- SSD1306 contrast / power helpers (experimental) ----
-    OLED_ADDR = int(os.getenv('OLED_I2C_ADDR', '0x3C'), 16)
+    OLED_ADDR = config.OLED_I2C_ADDR
 
-    def _oled_send_cmds(cmd_bytes: bytes) -> None:
+    # Send raw SSD1306 commands. Runs as a low priority bus transaction and yields (instead of sleeping)
+    # while displayio's background refresh holds the bus lock.
+    async def _oled_send_cmds(cmd_bytes: bytes) -> None:
         if not (ENABLE_DISPLAY and DISPLAY_OK):
             return
-        for _ in range(5):
-            if i2c.try_lock():
-                try:
-                    i2c.writeto(OLED_ADDR, b"\x00" + cmd_bytes)
-                finally:
-                    i2c.unlock()
-                return
-            time.sleep(0.005)
-
-    def set_oled_contrast(level: float) -> None:
+        async with i2c_bus.transaction("ssd1306", PRIORITY_LOW):
+            for _ in range(5):
+                if i2c.try_lock():
+                    try:
+                        i2c.writeto(OLED_ADDR, b"\x00" + cmd_bytes)
+                    finally:
+                        i2c.unlock()
+                    return
+                await asyncio.sleep(0.005)
+
+    async def set_oled_contrast(level: float) -> None:
         level = 0.0 if level < 0.0 else 1.0 if level > 1.0 else level
         val = int(level * 255)
-        _oled_send_cmds(bytes((0x81, val)))  # 0x81 = SETCONTRAST
+        await _oled_send_cmds(bytes((0x81, val)))  # 0x81 = SETCONTRAST
 
-    def oled_sleep(sleep: bool = True) -> None:
-        _oled_send_cmds(bytes((0xAE if sleep else 0xAF,)))  # 0xAE=OFF 0xAF=ON
+    async def oled_sleep(sleep: bool = True) -> None:
+        await _oled_send_cmds(bytes((0xAE if sleep else 0xAF,)))  # 0xAE=OFF 0xAF=ON
 
 
 # ------------------------
@@ -126,68 +181,53 @@ if ENABLE_DISPLAY:
 # ------------------------
 
 # Load WiFi credentials from settings.toml for network connection
-ssid = os.getenv('SSID')
-psk = os.getenv('PSK')
+ssid = config.SSID
+psk = config.PSK
 
 # SSL context (verify or skip verification of the cert)
-SSL_VERIFY_HOSTNAME = os.getenv('SSL_VERIFY_HOSTNAME', 'true').lower() == 'true'
+SSL_VERIFY_HOSTNAME = config.SSL_VERIFY_HOSTNAME
 
 # Initialize socketpool for network operations
 pool = socketpool.SocketPool(wifi.radio)
 
-# Synchronous version of wifi_connect for initial setup
-# This function will attempt to connect to WiFi using the provided SSID and password.
-# It is designed to be called before the main asynchronous loop of the program starts.
-def wifi_connect_sync():
-    # Check if the device is already connected to WiFi.
-    # If not, proceed to attempt a connection.
-    if not wifi.radio.connected:
-        try:
-            # Attempt to connect to WiFi using the global SSID and PSK (password) variables.
-            # These should be defined earlier in the code, read from the settings.toml file.
-            wifi.radio.connect(ssid, psk)
-
-            # If the connection is successful, print a confirmation message to the console.
-            print("Connected to WiFi")
-
-        # If the WiFi connection fails, catch the exception.
-        # This could be due to incorrect credentials, network issues, or other WiFi-related errors.
-        except ConnectionError as e:
-            # Print an error message with the exception details.
-            # This helps in diagnosing why the connection attempt failed.
-            print(f"WiFi connection failed: {e}")
-
-# Call wifi_connect_sync in initial operations
-wifi_connect_sync()
+# WiFi is brought up by the wifi_connect() task once sampling has started, so a slow access point doesn't delay
+# the sensors
 
 # ------------------------
 # Diagnostics
 # ------------------------
 
 # Structured logging (logs messages to both the console and syslog server based on configuration)
-def structured_log(message, level=None):
-    # Fallback 
-    if level is None:
-        level = usyslog.S_INFO
-    # If enabled, log via appropriate method(s)
-    if CONSOLE_LOG_ENABLED:
-        # Console output
-        print(message)
-    if SYSLOG_SERVER_ENABLED and s is not None:
-        # Syslog attempt
-        try:
-            s.log(level, message)
-        except RuntimeError:
-            pass
+# Usage: structured_log(template, level, *args), e.g. structured_log("CO2: %s ppm", usyslog.S_INFO, co2)
+# The template is only formatted if the message passes LOG_LEVEL and the rate limit and a sink is enabled,
+# so with console and syslog logging both off a call costs one comparison.
+logger = Logger(LOG_LEVEL, LOG_RATE_LIMIT_INTERVAL, LOG_RATE_LIMIT_BURST)
+structured_log = logger.log
+
+# Record a startup stage (the first time it is reached) and log how long it took since the previous one
+def boot_stage(stage):
+    timing = boot.mark(stage)
+    if timing is not None:
+        structured_log("Boot: %s at %d ms (+%d ms)", usyslog.S_INFO, stage, timing[0], timing[1])
+
+# Console sink
+def console_sink(level, message):
+    print(message)
+
+# If enabled, log via appropriate method(s)
+if CONSOLE_LOG_ENABLED:
+    logger.add_sink(console_sink)
 
 # Initialize syslog server if enabled
+# Messages are queued by the sink and sent by its own task (started in main()), so logging never waits on the network
 if SYSLOG_SERVER_ENABLED and SYSLOG_SERVER:
     try:
-        s = usyslog.UDPClient(pool, SYSLOG_SERVER, SYSLOG_PORT)
+        s = SyslogSink(pool, SYSLOG_SERVER, SYSLOG_PORT, SYSLOG_QUEUE_SIZE, SYSLOG_PACK_MESSAGES)
+        logger.add_sink(s.enqueue)
         structured_log("Syslog enabled", usyslog.S_INFO)
     except Exception as e:
         SYSLOG_SERVER_ENABLED = False     # flip first
-        structured_log(f"Syslog disabled: {e}", usyslog.S_ERR)  # safe logging now
+        structured_log("Syslog disabled: %s", usyslog.S_ERR, e)  # safe logging now
 
 # This function is designed to monitor and log the current memory usage of the program.
 # It can be used to track memory consumption at various points in the code.
@@ -196,53 +236,59 @@ def monitor_memory(tag=""):
     # Check if memory monitoring is enabled by the ENABLE_MEMORY_MONITORING flag.
     # This allows the memory monitoring feature to be toggled on or off as needed.
     if ENABLE_MEMORY_MONITORING:
-        # Run garbage collection to free up unused memory and get a more accurate reading of memory usage.
-        # This is useful in a constrained environment like microcontrollers where memory is limited.
-        gc.collect()
-
-        # Determine the amount of free memory available on the system.
-        free_memory = gc.mem_free()
-
-        # Determine the amount of memory currently allocated and in use.
-        used_memory = gc.mem_alloc()
-
-        # Calculate the total memory by adding free and used memory.
-        total_memory = free_memory + used_memory
-
-        # Calculate the percentage of free memory relative to the total memory.
-        free_memory_pct = 100 * (free_memory / total_memory)
-
-        # Log the memory usage details using the structured_log function.
+        # Log the memory usage details (free/used/total, lowest free seen, collections, per-task allocation
+        # high-water marks and, if enabled, the largest free block) using the structured_log function.
+        # No collection is forced here, so the numbers show the heap as the tasks actually see it.
         # The tag parameter can be used to specify where in the code this function was called
         # for easier identification in the logs.
-        structured_log((f"[Memory] {tag} - Free: {free_memory} bytes and {free_memory_pct}%, Used: {used_memory} bytes, Total: {total_memory} bytes"))
+        if logger.enabled_for(usyslog.S_INFO):
+            structured_log("[Memory] %s - %s", usyslog.S_INFO, tag, memory_manager.report())
+
+# Memory manager: applies the collection threshold now; the idle collection task is started in main()
+memory_manager = MemoryManager(GC_THRESHOLD_BYTES, GC_IDLE_FREE_BYTES, GC_MEASURE_FRAGMENTATION)
+if GC_THRESHOLD_BYTES and not memory_manager.configure():
+    structured_log("gc.threshold() is not available; GC_THRESHOLD_BYTES ignored", usyslog.S_ERR)
 
 # Print ENABLE_MEMORY_MONITORING to the log for diagnostic purposes
-structured_log("Memory Monitoring Enabled = " + str(ENABLE_MEMORY_MONITORING))
+structured_log("Memory Monitoring Enabled = %s", usyslog.S_INFO, ENABLE_MEMORY_MONITORING)
 
 # Print SYSLOG_SERVER_ENABLED to the log for diagnostic purposes
-structured_log('Syslog Server Enabled = ' + str(SYSLOG_SERVER_ENABLED))
-
-# Manually trigger garbage collection
-gc.collect()
+structured_log("Syslog Server Enabled = %s", usyslog.S_INFO, SYSLOG_SERVER_ENABLED)
+boot_stage("settings and logging")
 
 # ------------------------
 # Main Configuration
 # ------------------------
 
-# Default NTP offset and sync interval configuration
-DEFAULT_NTP_OFFSET = -8 # Pacific time
-DEFAULT_NTP_SYNC_INTERVAL = 3600  # in seconds (1 hour)
 # Read settings.toml for NTP offset
-ntp_offset = int(os.getenv('NTP_OFFSET', DEFAULT_NTP_OFFSET))
+ntp_offset = config.NTP_OFFSET
 # Print that to the log for diagnostic purposes
-structured_log('Loaded NTP offset value of ' + str(ntp_offset))
+structured_log("Loaded NTP offset value of %s", usyslog.S_INFO, ntp_offset)
 # Read settings.toml for NTP sync interval
-ntp_sync_interval = int(os.getenv('NTP_SYNC_INTERVAL', DEFAULT_NTP_SYNC_INTERVAL))
+ntp_sync_interval = config.NTP_SYNC_INTERVAL
 # Print that to the log for diagnostic purposes
-structured_log('Loaded NTP sync interval value of ' + str(ntp_sync_interval))
+structured_log("Loaded NTP sync interval value of %s", usyslog.S_INFO, ntp_sync_interval)
+# NTP server and port (point these at a local responder for testing)
+NTP_SERVER = config.NTP_SERVER
+NTP_PORT = config.NTP_PORT
+# Bounds (in seconds) for the adaptive sync interval (set both to NTP_SYNC_INTERVAL for a fixed interval)
+NTP_MIN_INTERVAL = config.NTP_MIN_INTERVAL
+NTP_MAX_INTERVAL = config.NTP_MAX_INTERVAL
+# Clock error (in ms) the sync interval is adapted to stay within
+NTP_TOLERANCE_MS = config.NTP_TOLERANCE_MS
+# Requests per sync (the reply with the shortest round trip is used) and the longest round trip accepted (in ms)
+NTP_SAMPLES = config.NTP_SAMPLES
+NTP_MAX_DELAY_MS = config.NTP_MAX_DELAY_MS
+# A sync this far (in ms) from the predicted time is only accepted once the next sync confirms it
+NTP_SPIKE_MS = config.NTP_SPIKE_MS
 # Global flag to indicate if time has been synchronized
 time_synced = False
+# Maps the monotonic clock (used to stamp every reading) to UTC; updated with offset and drift at each NTP sync
+clock = ClockModel()
+# Non-blocking SNTP client feeding the clock model, and the current (adaptive) sync interval in seconds
+ntp_client = SNTPClient(pool, NTP_SERVER, NTP_PORT, samples=NTP_SAMPLES, max_delay_ms=NTP_MAX_DELAY_MS,
+                        spike_ms=NTP_SPIKE_MS)
+ntp_interval = ntp_sync_interval
 # If display is enabled, release_displays (to not hold bus during soft reboots)
 if ENABLE_DISPLAY:
     try:
@@ -251,7 +297,7 @@ if ENABLE_DISPLAY:
     # Catch any exceptions
     except Exception as e:
         # Log the failed display release attempt
-        structured_log(f"displayio.release_displays() failed: {e}", usyslog.S_ERR)
+        structured_log("displayio.release_displays() failed: %s", usyslog.S_ERR, e)
 # Print I2C initializing to the log for diagnostic purposes
 structured_log('Initializing I2C')
 # Initialize I2C for the main program
@@ -260,7 +306,7 @@ try:
     i2c = busio.I2C(sda=board.GP20, scl=board.GP21)
 except ValueError as e:
     # Likely a stale owner; try to recover once
-    structured_log(f"I2C init failed ({e}); retrying after releasing displays", usyslog.S_ERR)
+    structured_log("I2C init failed (%s); retrying after releasing displays", usyslog.S_ERR, e)
     # If display is enabled, release_displays
     if ENABLE_DISPLAY:
         try:
@@ -273,108 +319,159 @@ except ValueError as e:
     # Create i2c
     i2c = busio.I2C(sda=board.GP20, scl=board.GP21)
 
+# Arbiter that schedules the sensor and display tasks' turns on the shared I2C bus and accounts for bus time
+i2c_bus = I2CArbiter(i2c)
+boot_stage("i2c")
+
 # Load sea level pressure calibration value from settings.toml
-SEA_LEVEL_PRESSURE = float(os.getenv('SEA_LEVEL_PRESSURE', '1013.25'))  # Default to 1013.25 hPa if not set
+SEA_LEVEL_PRESSURE = config.SEA_LEVEL_PRESSURE
 # Print SEA_LEVEL_PRESSURE to the log for diagnostic purposes
-structured_log('SEA_LEVEL_PRESSURE loaded as ' + str(SEA_LEVEL_PRESSURE))
+structured_log("SEA_LEVEL_PRESSURE loaded as %s", usyslog.S_INFO, SEA_LEVEL_PRESSURE)
+
+# Reading store: every sensor value goes into a fixed-size ring buffer per channel (device and field), with the
+# time it was read. The sensor tasks write to it; the send and display tasks read from it.
+# Number of samples kept per channel (each sample takes 8 bytes)
+READING_BUFFER_SIZE = config.READING_BUFFER_SIZE
+store = ReadingStore(READING_BUFFER_SIZE)
 
 # If the sensor is enabled, continue configuration
 if ENABLE_PM25_SENSOR:
     # Print PM2.5 UART initializing to the log for diagnostic purposes
     structured_log('Initializing PM2.5 UART')
     # Read settings.toml for PM2.5 interval
-    pm25_interval = int(os.getenv('PM25_INTERVAL', 5))
-    # Initialize UART with TX on GP12 and RX on GP13 for the PMS3003
-    uart = busio.UART(tx=board.GP12, rx=board.GP13, baudrate=9600)
-    # If you have a GPIO, its not a bad idea to connect it to the RESET pin
-    # reset_pin = DigitalInOut(board.G0)
-    # reset_pin.direction = Direction.OUTPUT
-    # reset_pin.value = False
-    reset_pin = None
-    pm25 = PM25_UART(uart, reset_pin)
-    # Global variables to store PM2.5 readings
-    pm10_standard = None
-    pm25_standard = None
-    pm100_standard = None
-    pm10_env = None
-    pm25_env = None
-    pm100_env = None
-    particles_03um = None
-    particles_05um = None
-    particles_10um = None
-    particles_25um = None
-    particles_50um = None
-    particles_100um = None
+    pm25_interval = config.PM25_INTERVAL
+    # Seconds to wait for a frame before reporting the sensor as not responding (it sends one every 1-2.3 s)
+    pm25_frame_timeout = max(3 * pm25_interval, 10)
+    # Initialize UART with TX on GP12 and RX on GP13 for the PMS sensor.
+    # The receive buffer holds a few seconds of frames (~32 bytes/s) between reads.
+    uart = busio.UART(tx=board.GP12, rx=board.GP13, baudrate=9600, timeout=0, receiver_buffer_size=256)
+    # Non-blocking frame reader: drains only the bytes already received and assembles them into frames
+    pm25_reader = PMSReader(uart)
+    # Channels for the 12 readings of a frame, in PM25_FIELD_NAMES order
+    pm25_channels = store.add_device("pm25", PM25_FIELD_NAMES)
 
 # If the sensor is enabled, continue configuration
 if ENABLE_SCD4X_SENSOR:
     # Print SCD4X initializing to the log for diagnostic purposes
     structured_log('Initializing SCD4X')
     # Read settings.toml for SCD4X interval
-    scd4x_interval = int(os.getenv('SCD4X_INTERVAL', 5))
+    scd4x_interval = config.SCD4X_INTERVAL
     # Create an instance of the SCD4X class and pass it the i2c object
     scd4x = adafruit_scd4x.SCD4X(i2c)
     # Print serial number debug info on SCD4X sensor (uncomment next line if desired for testing)
     #print("Serial number:", [hex(i) for i in scd4x.serial_number])
     # Start periodic measurements on the SCD41 sensor
     scd4x.start_periodic_measurement()
-    # Global variables to store SCD41 readings
-    scd4x_co2 = None
-    scd4x_temperature = None
-    scd4x_humidity = None
-    # Log the memory monitor post-initialization
-    monitor_memory("Post SCD4X Initialization")
+    # Channels for the SCD41 readings
+    scd4x_co2, scd4x_temperature, scd4x_humidity = store.add_device("scd4x", ("co2", "temperature", "humidity"))
 
 # If the sensor is enabled, continue configuration
 if ENABLE_RADSENS_SENSOR:
     # Print RadSens initializing to the log for diagnostic purposes
     structured_log('Initializing RadSens')
     # Read settings.toml for RadSens interval
-    radsens_interval = int(os.getenv('RADSENS_INTERVAL', 5))
+    radsens_interval = config.RADSENS_INTERVAL
     # Create an instance of the CG_RadSens class and pass the i2c object
     sensor = CG_RadSens(i2c)
-    # Global variables to store radiation readings
-    rad_intensy_dynamic = None
-    rad_intensy_static = None
-    number_of_pulses = None
-    # Log the memory monitor post-initialization
-    monitor_memory("Post RadSens Initialization")
+    # Channels for the radiation readings (the pulse count is kept as an exact integer)
+    rad_intensy_dynamic, rad_intensy_static = store.add_device("radsens", ("radiation_intensity_dynamic", "radiation_intensity_static"))
+    number_of_pulses = store.add("radsens", "number_of_pulses", "I")
 
 # If the sensor is enabled, continue configuration
 if ENABLE_BME680_SENSOR:
     # Print BE680 initializing to the log for diagnostic purposes
     structured_log('Initializing BME680')
     # Read settings.toml for BME680 interval
-    bme680_interval = int(os.getenv('BME680_INTERVAL', 5))
-    # Initialize the BME680 sensor.
-    bme680_sensor = adafruit_bme680.Adafruit_BME680_I2C(i2c)
+    bme680_interval = config.BME680_INTERVAL
+    # Initialize the BME680 sensor (the refresh rate lets one sample's properties share a conversion).
+    bme680_sensor = adafruit_bme680.Adafruit_BME680_I2C(i2c, refresh_rate=BME680_REFRESH_RATE)
     bme680_sensor.sea_level_pressure = SEA_LEVEL_PRESSURE
-    # Global variables to store BME680 readings
-    bme680_temperature = None
-    bme680_humidity = None
-    bme680_pressure = None
-    bme680_gas = None
-    bme680_altitude = None
-    # Log the memory monitor post-initialization
-    monitor_memory("Post BME680 Initialization")
+    # Sampler that takes all five values from a single conversion
+    bme680_sampler = BME680Sampler(bme680_sensor, SEA_LEVEL_PRESSURE)
+    # Reading each sample is taken into before it is stored (reused, so sampling doesn't allocate)
+    bme680_reading = BME680Reading()
+    # Channels for the BME680 readings
+    bme680_temperature, bme680_humidity, bme680_pressure, bme680_gas, bme680_altitude = store.add_device(
+        "bme680", ("temperature", "humidity", "pressure", "gas_resistance", "altitude"))
+
+# Print the reading store size to the log for diagnostic purposes
+structured_log("Reading store: %d channels, %d samples each, %d bytes", usyslog.S_INFO, len(store), READING_BUFFER_SIZE, store.footprint())
+boot_stage("sensors")
 
 # Read location from settings.toml file
-LOCATION = os.getenv('LOCATION', 'Unknown').replace(" ", "-")  # Remove spaces by changing them to a dash and default to 'Unknown' if not set
+LOCATION = config.LOCATION.replace(" ", "-")  # Spaces are changed to dashes
 # Print location to the log for diagnostic purposes
-structured_log('Loaded location - ' + str(LOCATION))
+structured_log("Loaded location - %s", usyslog.S_INFO, LOCATION)
+
+# Task instrumentation (records nothing and just sleeps when disabled)
+# With memory monitoring enabled, it also tracks each task's allocation high-water mark
+task_monitor = TaskMonitor(ENABLE_TASK_MONITORING, LOCATION,
+                           memory=memory_manager if ENABLE_MEMORY_MONITORING else None)
+# Print ENABLE_TASK_MONITORING to the log for diagnostic purposes
+structured_log("Task Monitoring Enabled = %s", usyslog.S_INFO, ENABLE_TASK_MONITORING)
 
 # Load InfluxDB configuration details from settings.toml for send interval
-influxdb_send_interval = int(os.getenv('INFLUXDB_SEND_INTERVAL', 10))
+influxdb_send_interval = config.INFLUXDB_SEND_INTERVAL
+# Measurement name used for every batched line (device and location are tags)
+INFLUXDB_MEASUREMENT = config.INFLUXDB_MEASUREMENT
+# Maximum size (in bytes) of a single batched write body
+INFLUXDB_BATCH_MAX_BYTES = config.INFLUXDB_BATCH_MAX_BYTES
+# Number of decimal places written for float readings
+INFLUXDB_FLOAT_DECIMALS = config.INFLUXDB_FLOAT_DECIMALS
+# Encode the lines into one preallocated buffer (FALSE formats them as strings instead; see line_protocol.py)
+INFLUXDB_PREALLOCATED_ENCODER = config.INFLUXDB_PREALLOCATED_ENCODER
+# Also send min/max/mean/count of every reading over each send interval (not just the latest value)
+INFLUXDB_AGGREGATE = config.INFLUXDB_AGGREGATE
+# Flushes the store once per send cycle: latest values (plus running statistics if enabled), stamped with the
+# time the readings were taken
+aggregator = WindowAggregator(store, INFLUXDB_AGGREGATE)
+# Only send readings that are new and changed by more than their deadband (plus a periodic heartbeat)
+REPORT_ON_CHANGE = config.REPORT_ON_CHANGE
+# Seconds after which an unchanged reading is sent anyway (0 disables)
+REPORT_HEARTBEAT = config.REPORT_HEARTBEAT
+# Seconds after which a reading is stale and no longer sent (0 disables)
+REPORT_MAX_AGE = config.REPORT_MAX_AGE
+report_filter = None
+if REPORT_ON_CHANGE:
+    report_filter = ReportFilter(REPORT_HEARTBEAT, REPORT_MAX_AGE)
+    # Per reading deadbands from settings.toml, e.g. DEADBAND_BME680_PRESSURE = "0.1" or "0.05%"
+    deadbands = load_deadbands({device: [field for field, _ in fields] for device, fields in store.devices.items()})
+    for device, fields in store.devices.items():
+        for field, channel in fields:
+            absolute, percent = deadbands.get((device, field), (0.0, 0.0))
+            report_filter.set_deadband(channel, absolute, percent)
 # Load InfluxDB configuration details from settings.toml for time series data storage target
-INFLUXDB_URL_BASE = os.getenv('INFLUXDB_URL')
-INFLUXDB_ORG = os.getenv('INFLUXDB_ORG')
-INFLUXDB_BUCKET = os.getenv('INFLUXDB_BUCKET')
-INFLUXDB_TOKEN = os.getenv('INFLUXDB_TOKEN')
+INFLUXDB_URL_BASE = config.INFLUXDB_URL
+INFLUXDB_ORG = config.INFLUXDB_ORG
+INFLUXDB_BUCKET = config.INFLUXDB_BUCKET
+INFLUXDB_TOKEN = config.INFLUXDB_TOKEN
 INFLUXDB_URL = f"{INFLUXDB_URL_BASE}?org={INFLUXDB_ORG}&bucket={INFLUXDB_BUCKET}"
 HEADERS = {
     "Authorization": f"Token {INFLUXDB_TOKEN}",
     "Content-Type": "text/plain; charset=utf-8"   # not JSON
 }
+# Per-phase timeouts (in seconds) for InfluxDB writes
+INFLUXDB_CONNECT_TIMEOUT = config.INFLUXDB_CONNECT_TIMEOUT
+INFLUXDB_TLS_TIMEOUT = config.INFLUXDB_TLS_TIMEOUT
+INFLUXDB_SEND_TIMEOUT = config.INFLUXDB_SEND_TIMEOUT
+INFLUXDB_RESPONSE_TIMEOUT = config.INFLUXDB_RESPONSE_TIMEOUT
+# Keep the HTTPS connection open between writes (saves a TLS handshake per write), and reopen it before a write
+# when it has been idle for longer than this many seconds (0 never)
+INFLUXDB_KEEP_ALIVE = config.INFLUXDB_KEEP_ALIVE
+INFLUXDB_IDLE_TIMEOUT = config.INFLUXDB_IDLE_TIMEOUT
+# Circuit breaker: stop writing after this many consecutive failures, for a cooldown (in seconds) that doubles
+# (with jitter) up to the maximum while the server stays unreachable
+INFLUXDB_BREAKER_THRESHOLD = config.INFLUXDB_BREAKER_THRESHOLD
+INFLUXDB_BREAKER_DELAY = config.INFLUXDB_BREAKER_DELAY
+INFLUXDB_BREAKER_MAX_DELAY = config.INFLUXDB_BREAKER_MAX_DELAY
+breaker = CircuitBreaker(INFLUXDB_BREAKER_THRESHOLD, INFLUXDB_BREAKER_DELAY, INFLUXDB_BREAKER_MAX_DELAY)
+# Store-and-forward spool for writes that fail (kept on flash if writable, otherwise in RAM)
+SPOOL_ENABLED = config.SPOOL_ENABLED
+SPOOL_PATH = config.SPOOL_PATH
+SPOOL_MAX_BYTES = config.SPOOL_MAX_BYTES
+SPOOL_RAM_MAX_BYTES = config.SPOOL_RAM_MAX_BYTES
+# Maximum size (in bytes) of a single bulk write when draining the spool
+SPOOL_DRAIN_MAX_BYTES = config.SPOOL_DRAIN_MAX_BYTES
 # Determine if all of the config elements are there and then set a flag (note: just conducts a basic validity check of them)
 INFLUX_READY = all([INFLUXDB_URL_BASE, INFLUXDB_ORG, INFLUXDB_BUCKET, INFLUXDB_TOKEN])
 # If elements are missing, let's log it
@@ -382,6 +479,38 @@ if not INFLUX_READY:
     # Log the incomplete InfluxDB config issue
     structured_log("InfluxDB config incomplete; metrics disabled.", usyslog.S_ERR)
 
+# Open the spool (picks up anything left over from before a reboot when stored on flash)
+spool = None
+if INFLUX_READY and SPOOL_ENABLED:
+    spool = RecordSpool(SPOOL_PATH, SPOOL_MAX_BYTES, SPOOL_RAM_MAX_BYTES)
+    # Log where the spool lives and how much it holds
+    structured_log("Spool on %s: %s records, %s bytes (cap %s)", usyslog.S_INFO, 'flash' if spool.on_flash else 'RAM', len(spool), spool.size, spool.max_bytes)
+
+# Readings taken before the first NTP sync can't be stamped in UTC yet. Each send cycle's lines are stamped on the
+# monotonic clock instead and held in RAM (up to this many bytes), then converted to UTC and sent once the time is
+# known. When the backlog is full, the readings keep accumulating in the aggregator's window.
+BOOT_BACKLOG_MAX_BYTES = config.BOOT_BACKLOG_MAX_BYTES
+backlog = RecordSpool(None, BOOT_BACKLOG_MAX_BYTES, BOOT_BACKLOG_MAX_BYTES)
+# Stamps lines with the monotonic time for the backlog
+monotonic_stamps = MonotonicStamps()
+# Size of the largest cycle held so far
+backlog_cycle_bytes = 0
+
+# Record-and-replay trace: readings, sensor errors and write outcomes appended to flash (see sensor_trace.py)
+TRACE_ENABLED = config.TRACE_ENABLED
+TRACE_PATH = config.TRACE_PATH
+TRACE_MAX_BYTES = config.TRACE_MAX_BYTES
+TRACE_BUFFER_BYTES = config.TRACE_BUFFER_BYTES
+# Seconds between captures of the new readings (must be shorter than the time a channel's ring buffer covers)
+TRACE_INTERVAL = config.TRACE_INTERVAL
+trace = TraceRecorder(TRACE_ENABLED, store, TRACE_PATH, TRACE_MAX_BYTES, TRACE_BUFFER_BYTES)
+if TRACE_ENABLED:
+    if trace.enabled:
+        structured_log("Trace recording to %s (rotated at %s bytes)", usyslog.S_INFO, TRACE_PATH, TRACE_MAX_BYTES)
+    else:
+        structured_log("Trace disabled: %s is not writable", usyslog.S_WARN, TRACE_PATH)
+boot_stage("influxdb, spool and trace")
+
 
 # If display is enabled, setup the display
 if ENABLE_DISPLAY:
@@ -389,7 +518,13 @@ if ENABLE_DISPLAY:
     # If display is enabled, release the display
     #displayio.release_displays() # Commented out due to being somewhat duplicative
     # Load display update interval from settings.toml
-    display_update_interval = int(os.getenv('DISPLAY_UPDATE_INTERVAL', 1))
+    display_update_interval = config.DISPLAY_UPDATE_INTERVAL
+    # Display mode: "text" shows the current readings; "graph" rotates between them and a trend graph per sensor
+    DISPLAY_MODE = config.DISPLAY_MODE
+    # Seconds each page is shown for in graph mode
+    DISPLAY_PAGE_INTERVAL = config.DISPLAY_PAGE_INTERVAL
+    # Seconds between graph samples (one column each, so the graphs cover 128 times this)
+    DISPLAY_GRAPH_SAMPLE_INTERVAL = config.DISPLAY_GRAPH_SAMPLE_INTERVAL
     #oled_reset = board.GP28 # If your display has a reset pin connected.
     WIDTH = 128
     HEIGHT = 64
@@ -402,9 +537,8 @@ if ENABLE_DISPLAY:
         # Set display OK flag to true
         DISPLAY_OK = True
         
-        # Apply experimental contrast from settings
-        OLED_CONTRAST = float(os.getenv('OLED_CONTRAST', '1.0'))
-        set_oled_contrast(OLED_CONTRAST)
+        # Load experimental contrast from settings (applied when the display task starts)
+        OLED_CONTRAST = config.OLED_CONTRAST
 
         # Create a bitmap with two colors
         bitmap = displayio.Bitmap(WIDTH, HEIGHT, 2)
@@ -421,7 +555,16 @@ if ENABLE_DISPLAY:
     # Catch any exceptions
     except Exception as e:
         # Log the failed display init
-        structured_log(f"OLED init failed: {e}", usyslog.S_ERR)
+        structured_log("OLED init failed: %s", usyslog.S_ERR, e)
+
+# Show a group on the display
+# Note: CP 9+: .show() removed in favor of root_group
+def show_group(shown):
+    try:
+        display.root_group = shown
+    except AttributeError:
+        # Back-compat for CP 8.x
+        display.show(shown)
 
 # Conditional label creation based on whether sensors are enabled or disabled
 if ENABLE_DISPLAY and DISPLAY_OK and ENABLE_BME680_SENSOR:
@@ -447,53 +590,186 @@ if ENABLE_DISPLAY and DISPLAY_OK and ENABLE_RADSENS_SENSOR:
 if ENABLE_DISPLAY and DISPLAY_OK:
     # Show the group on the Display
     # Note: CP 9+: .show() removed in favor of root_group
-    try:
-        display.root_group = group
-    except AttributeError:
-        # Back-compat for CP 8.x
-        display.show(group)
+    show_group(group)
+
+    # Renderer that updates only the labels whose text changed and refreshes the display (auto_refresh is turned
+    # off) once per changed frame, as a low priority transaction on the shared I2C bus
+    renderer = DisplayRenderer(display, i2c_bus)
+    if ENABLE_BME680_SENSOR:
+        temperature_slot = renderer.add(temperature_label, "Temp: %.2fC", "Temp: --")
+        humidity_slot = renderer.add(humidity_label, "Humid: %.2f%%", "Humid: --")
+        pressure_slot = renderer.add(pressure_label, "Press: %.2fhPa", "Press: --")
+    if ENABLE_SCD4X_SENSOR:
+        # %d truncates like int() for a compact display; switch to %.1f for one decimal place if preferred
+        co2_slot = renderer.add(co2_label, "CO2: %d ppm", "CO2: --")
+    if ENABLE_RADSENS_SENSOR:
+        radiation_slot = renderer.add(radiation_label, "Rad: %d uR/h", "Rad: --")
 
-# Manually trigger garbage collection
+    # Graph mode: one trend page per sensor, each paired with a function returning its current value
+    graph = None
+    graph_sources = []
+    if DISPLAY_MODE == 'graph':
+        graph = SparklineGraph(terminalio.FONT, label.Label, WIDTH, HEIGHT - 12, 12)
+        if ENABLE_SCD4X_SENSOR:
+            graph_sources.append((graph.add_page("CO2: %d ppm", "CO2: --", 50), scd4x_co2.last))
+        if ENABLE_BME680_SENSOR:
+            graph_sources.append((graph.add_page("Temp: %.2fC", "Temp: --", 1), bme680_temperature.last))
+        if ENABLE_RADSENS_SENSOR:
+            graph_sources.append((graph.add_page("Rad: %d uR/h", "Rad: --", 10), rad_intensy_dynamic.last))
+
+if ENABLE_DISPLAY:
+    boot_stage("display")
+
+# Manually trigger garbage collection (once, before the tasks start allocating)
 gc.collect()
 
 # Log the memory
 monitor_memory("Initialization/Setup END")
+boot_stage("setup")
 
 # ------------------------
 # Data Transfer
 # ------------------------
 
-# This function is an asynchronous helper function designed to send individual data points to an InfluxDB instance.
-# It uses an HTTP session to post the data and logs the outcome of the operation.
-async def send_data(data, http_session):
+# Outcomes of a write attempt
+# WRITE_OK: accepted by InfluxDB
+# WRITE_RETRY: network error or a server-side/temporary problem; worth keeping the data and retrying later
+# WRITE_REJECTED: InfluxDB refused the data itself (e.g. HTTP 400); retrying the same body will never succeed
+WRITE_OK = 0
+WRITE_RETRY = 1
+WRITE_REJECTED = 2
+
+# This function is an asynchronous helper function designed to send a batch of data points to an InfluxDB instance.
+# It uses the non-blocking HTTP writer to post the data (the other tasks keep running while it waits on the network),
+# logs the outcome of the operation and returns one of the WRITE_* outcomes.
+# While the circuit breaker is open it returns WRITE_RETRY right away, without touching the network.
+async def send_data(data, http_writer):
     # Check if there is any data to send.
     # This is a safeguard to prevent unnecessary network calls if there's no data.
-    if data:
-        try:
-            # Send the data to InfluxDB using an HTTP POST request.
-            # INFLUXDB_URL is the URL of the InfluxDB instance, and HEADERS contains any necessary headers for the request,
-            # such as authorization tokens and content type.
-            response = http_session.post(INFLUXDB_URL, headers=HEADERS, data=data)
-
-            # Check the HTTP response status code to determine if the data was successfully sent.
-            # HTTP 204 is typically returned by InfluxDB to indicate successful data ingestion without a response body.
-            if response.status_code == 204:
-                # Log a success message using the structured_log function.
-                structured_log("Data sent to InfluxDB successfully!", usyslog.S_INFO)
-            else:
-                # If the status code is not 204, log the server's response as an error.
-                # This can help in diagnosing why the data was not accepted by the server.
-                structured_log("Failed to send data to InfluxDB:" + response.text, usyslog.S_ERR)
+    if not data:
+        return WRITE_OK
+    # Once the breaker's cooldown has passed, probe with the first line alone; the rest of the body only follows if
+    # the probe gets through (so the batch and the spool drain wait for the breaker to close)
+    if breaker.probe_due():
+        cut = bytes(data).find(b"\n")
+        if cut > 0:
+            view = memoryview(data)
+            outcome = await send_data(view[:cut], http_writer)
+            if outcome == WRITE_RETRY:
+                return outcome
+            data = view[cut + 1:]
+    if not breaker.allow():
+        return WRITE_RETRY
+    state = breaker.state
+    outcome = await post_data(data, http_writer)
+    # A rejected body still means the server is up; only retryable failures count against it
+    if outcome == WRITE_RETRY:
+        breaker.failure()
+    else:
+        breaker.success()
+    # Log the breaker's state changes
+    if breaker.state != state:
+        if breaker.state == CLOSED:
+            structured_log("InfluxDB reachable again; resuming writes", usyslog.S_INFO)
+        else:
+            structured_log("InfluxDB unreachable (%d failures); pausing writes for %d s", usyslog.S_WARN,
+                           breaker.failures, breaker.remaining())
+    return outcome
 
-            # Close the response. This is important to free up system resources.
-            response.close()
+# Post one write body and classify the result (see send_data())
+async def post_data(data, http_writer):
+    started = ticks_ms()
+    try:
+        # Send the data to InfluxDB using an HTTP POST request.
+        # The writer was created with INFLUXDB_URL and HEADERS, which contain any necessary headers for the request,
+        # such as authorization tokens and content type.
+        status, text = await http_writer.post(data)
+        trace.write(status, len(data), ticks_diff(ticks_ms(), started))
+
+        # Check the HTTP response status code to determine if the data was successfully sent.
+        # HTTP 204 is typically returned by InfluxDB to indicate successful data ingestion without a response body.
+        if status == 204:
+            # Log a success message using the structured_log function.
+            structured_log("Data sent to InfluxDB successfully!", usyslog.S_INFO)
+            boot_stage("first write")
+            outcome = WRITE_OK
+        else:
+            # If the status code is not 204, log the server's response as an error.
+            # This can help in diagnosing why the data was not accepted by the server.
+            structured_log("Failed to send data to InfluxDB:%s", usyslog.S_ERR, text)
+            task_monitor.error("send_data_to_influxdb")
+            # 4xx means the request itself is bad (except timeouts/rate limiting, which are temporary)
+            outcome = WRITE_REJECTED if 400 <= status < 500 and status not in (408, 429) else WRITE_RETRY
 
-        # Catch any exceptions that occur during the HTTP request.
-        # These could be network issues, InfluxDB server problems, etc.
-        except Exception as e:
-            # Log the exception details as an error for troubleshooting.
-            structured_log("Error sending data to InfluxDB:" + str(e), usyslog.S_ERR)
+        return outcome
 
+    # Catch any exceptions that occur during the HTTP request.
+    # These could be network issues, InfluxDB server problems, a phase timeout, etc.
+    except Exception as e:
+        # Log the exception details as an error for troubleshooting.
+        structured_log("Error sending data to InfluxDB:%s", usyslog.S_ERR, e)
+        task_monitor.error("send_data_to_influxdb")
+        trace.write(STATUS_TIMEOUT if isinstance(e, HTTPTimeoutError) else STATUS_ERROR, len(data),
+                    ticks_diff(ticks_ms(), started))
+        return WRITE_RETRY
+
+# This function drains the store-and-forward spool, oldest records first, in bulk writes of up to
+# SPOOL_DRAIN_MAX_BYTES. It stops at the first failed write and leaves the rest queued for the next cycle.
+async def drain_spool(http_writer):
+    structured_log("Draining spool: %s records, %s bytes", usyslog.S_INFO, len(spool), spool.size)
+    while len(spool):
+        # Oldest records that fit in one bulk write
+        records = spool.peek(SPOOL_DRAIN_MAX_BYTES)
+        # Lines are normally stamped already; records that were stored with a time get it added to their lines
+        body = b"\n".join(stamp_lines(payload, timestamp_ns) for timestamp_ns, payload in records)
+        outcome = await send_data(body, http_writer)
+        if outcome == WRITE_RETRY:
+            break
+        # Remove records once InfluxDB accepted them (or rejected them outright, since they can never succeed)
+        if outcome == WRITE_REJECTED:
+            structured_log("Dropping %s spooled records rejected by InfluxDB", usyslog.S_ERR, len(records))
+        spool.discard(len(records))
+        # Let the sensor tasks run between bulk writes
+        await asyncio.sleep(0)
+
+# One send cycle before the first NTP sync: encode the readings stamped on the monotonic clock and hold them in the
+# backlog. If the backlog has no room left, the cycle is skipped and the readings stay in the aggregator's window
+# (its statistics and latest values come out in the next cycle that fits).
+def hold_for_sync(batch):
+    global backlog_cycle_bytes
+    if backlog.size + backlog_cycle_bytes <= backlog.max_bytes:
+        aggregator.flush(batch, monotonic_stamps, report_filter)
+        size = 0
+        for body in batch.bodies():
+            backlog.append(0, body)
+            size += len(body)
+        # Largest cycle so far, used to tell whether the next one will fit
+        backlog_cycle_bytes = max(size, backlog_cycle_bytes)
+
+# Open the HTTPS connection once WiFi is up (before the first NTP sync), so the first write doesn't wait for a
+# handshake
+async def open_session(http_writer):
+    if wifi.radio.connected and not boot.reached("http session"):
+        try:
+            await http_writer.open()
+            boot_stage("http session")
+        except Exception as e:
+            structured_log("Opening the InfluxDB connection failed: %s", usyslog.S_WARN, e)
+
+# Convert the lines held since boot to UTC now that the clock is synced, and queue them in the spool (or, without a
+# spool, send them right away)
+async def release_backlog(http_writer):
+    records = backlog.peek(backlog.size)
+    structured_log("Releasing %s cycles (%s bytes) of readings taken before the time was synced", usyslog.S_INFO,
+                   len(records), backlog.size)
+    for _, payload in records:
+        body = restamp_lines(payload, clock)
+        if spool is not None:
+            if not spool.append(0, body):
+                structured_log("Spool append failed; data dropped", usyslog.S_ERR)
+        elif await send_data(body, http_writer) == WRITE_RETRY:
+            structured_log("Readings taken before the time was synced could not be sent; data dropped", usyslog.S_ERR)
+    backlog.clear()
 
 # ------------------------
 # Asynchronous Tasks
@@ -502,186 +778,211 @@ async def send_data(data, http_session):
 # Asynchronous function to continuously read data from the PM2.5 sensor (PMS7003) and update global variables.
 # This function runs indefinitely in the background (as part of an asyncio event loop) and updates air quality data.
 async def read_pm25():
-    # Declare global variables to store sensor data so they can be accessed elsewhere in the program.
-    global pm10_standard, pm25_standard, pm100_standard
-    global pm10_env, pm25_env, pm100_env
-    global particles_03um, particles_05um, particles_10um
-    global particles_25um, particles_50um, particles_100um
-
     while True:  # Infinite loop to continuously read sensor data.
         try:
-            # Attempt to read data from the PM2.5 sensor.
-            aqdata = pm25.read()
-
-            # Update global variables with the sensor data.
-            # These variables store concentrations of different particulate matter sizes.
-            pm10_standard = aqdata["pm10 standard"]
-            pm25_standard = aqdata["pm25 standard"]
-            pm100_standard = aqdata["pm100 standard"]
-            pm10_env = aqdata["pm10 env"]
-            pm25_env = aqdata["pm25 env"]
-            pm100_env = aqdata["pm100 env"]
-            particles_03um = aqdata["particles 03um"]
-            particles_05um = aqdata["particles 05um"]
-            particles_10um = aqdata["particles 10um"]
-            particles_25um = aqdata["particles 25um"]
-            particles_50um = aqdata["particles 50um"]
-            particles_100um = aqdata["particles 100um"]
+            # Wait for a complete, checksum-verified frame without blocking the event loop.
+            # Frames that arrived while this task slept are skipped in favour of the newest one.
+            frame = await pm25_reader.read_frame(latest=True, timeout=pm25_frame_timeout)
+
+            # Store the sensor data (all readings of the frame share one timestamp).
+            # The frame holds concentrations of different particulate matter sizes and particle counts.
+            now = ticks_ms()
+            for channel, value in zip(pm25_channels, frame):
+                channel.append(value, now)
+            boot_stage("first sample")
 
             # Log the fetched data for debugging or monitoring purposes.
             # This uses the structured_log function to log the data in a structured format.
-            structured_log(f"PM2.5 Data - PM 1.0 (Standard): {pm10_standard}, PM2.5 (Standard): {pm25_standard}, PM10 (Standard): {pm100_standard}, PM 1.0 (Env): {pm10_env}, PM2.5 (Env): {pm25_env}, PM10 (Env): {pm100_env}, Particles > 0.3um: {particles_03um}, Particles > 0.5um: {particles_05um}, Particles > 1.0um: {particles_10um}, Particles > 2.5um: {particles_25um}, Particles > 5.0um: {particles_50um}, Particles > 10um: {particles_100um}", usyslog.S_INFO)
+            structured_log("PM2.5 Data - PM 1.0 (Standard): %s, PM2.5 (Standard): %s, PM10 (Standard): %s, PM 1.0 (Env): %s, PM2.5 (Env): %s, PM10 (Env): %s, Particles > 0.3um: %s, Particles > 0.5um: %s, Particles > 1.0um: %s, Particles > 2.5um: %s, Particles > 5.0um: %s, Particles > 10um: %s", usyslog.S_INFO, *frame)
 
         # If there's an error in reading from the sensor, log the error and then retry after a delay.
         # This is important for resilience, especially if the sensor temporarily fails or is disconnected.
         except IOError as io_error:
             # Handle I2C communication errors specifically
-            structured_log(f"PM2.5 sensor I/O error: {io_error}", usyslog.S_ERR)
-            await asyncio.sleep(10)  # Longer sleep for I/O errors
+            structured_log("PM2.5 sensor I/O error: %s", usyslog.S_ERR, io_error)
+            task_monitor.error("read_pm25")
+            trace.error("pm25", io_error)
+            await task_monitor.sleep("read_pm25", 10)  # Longer sleep for I/O errors
 
         except RuntimeError as runtime_error:
             # Handle other runtime errors
-            structured_log(f"PM2.5 sensor runtime error: {runtime_error}", usyslog.S_ERR)
-            await asyncio.sleep(5)
+            structured_log("PM2.5 sensor runtime error: %s", usyslog.S_ERR, runtime_error)
+            task_monitor.error("read_pm25")
+            trace.error("pm25", runtime_error)
+            await task_monitor.sleep("read_pm25", 5)
 
         except Exception as e:
             # Catch-all for any other exceptions
-            structured_log(f"Unexpected error reading PM2.5 sensor: {e}", usyslog.S_ERR)
-            await asyncio.sleep(10)
+            structured_log("Unexpected error reading PM2.5 sensor: %s", usyslog.S_ERR, e)
+            task_monitor.error("read_pm25")
+            trace.error("pm25", e)
+            await task_monitor.sleep("read_pm25", 10)
         
         # Await for pm25_interval amount before the next sensor read to limit the rate of data acquisition.
         # This interval can be adjusted based on how frequently the sensor data needs to be updated.
-        await asyncio.sleep(pm25_interval)
+        await task_monitor.sleep("read_pm25", pm25_interval)
 
 # Asynchronous function to continuously read data from the SCD4X sensor and update global variables.
 # The SCD4X sensor typically measures CO2 concentration, temperature, and humidity.
 async def read_scd4x():
-    # Declare global variables to store the CO2, temperature, and humidity data.
-    # This allows these values to be accessed from other parts of the program.
-    global scd4x_co2, scd4x_temperature, scd4x_humidity
-
     while True:  # An infinite loop to continuously check and read from the sensor.
         try:
-            # Check if new data is ready to be read from the sensor.
-            # The data_ready check is a non-blocking operation to see if the sensor has new data.
-            if scd4x.data_ready:
-                # Read the CO2 concentration (in parts per million), temperature (in degrees Celsius),
-                # and relative humidity (in percent) from the sensor.
-                scd4x_co2 = scd4x.CO2
-                scd4x_temperature = scd4x.temperature
-                scd4x_humidity = scd4x.relative_humidity
+            # Wait for a turn on the shared I2C bus, then check and read the sensor in one transaction.
+            async with i2c_bus.transaction("scd4x", PRIORITY_NORMAL):
+                # Check if new data is ready to be read from the sensor.
+                # The data_ready check is a non-blocking operation to see if the sensor has new data.
+                data_ready = scd4x.data_ready
+                if data_ready:
+                    # Read the CO2 concentration (in parts per million), temperature (in degrees Celsius),
+                    # and relative humidity (in percent) from the sensor.
+                    co2 = scd4x.CO2
+                    temperature = scd4x.temperature
+                    humidity = scd4x.relative_humidity
+
+            if data_ready:
+                # Store the readings (sharing one timestamp) for the send and display tasks.
+                now = ticks_ms()
+                scd4x_co2.append(co2, now)
+                scd4x_temperature.append(temperature, now)
+                scd4x_humidity.append(humidity, now)
+                boot_stage("first sample")
 
                 # Log the read sensor data using structured logging for monitoring or debugging.
                 # This helps to keep track of sensor readings over time.
-                structured_log(f"SCD4X Data - CO2: {scd4x_co2} ppm, Temp: {scd4x_temperature:.2f} deg C, Humidity: {scd4x_humidity:.2f}%", usyslog.S_INFO)
+                structured_log("SCD4X Data - CO2: %s ppm, Temp: %.2f deg C, Humidity: %.2f%%", usyslog.S_INFO, co2, temperature, humidity)
 
         # Catch and handle any runtime errors during sensor reading.
         # This could happen due to communication issues with the sensor or hardware malfunctions.
         except IOError as io_error:
-            structured_log(f"SCD4X sensor I/O error: {io_error}", usyslog.S_ERR)
-            await asyncio.sleep(10)
+            structured_log("SCD4X sensor I/O error: %s", usyslog.S_ERR, io_error)
+            task_monitor.error("read_scd4x")
+            trace.error("scd4x", io_error)
+            await task_monitor.sleep("read_scd4x", 10)
 
         except RuntimeError as runtime_error:
-            structured_log(f"SCD4X sensor runtime error: {runtime_error}", usyslog.S_ERR)
-            await asyncio.sleep(5)
+            structured_log("SCD4X sensor runtime error: %s", usyslog.S_ERR, runtime_error)
+            task_monitor.error("read_scd4x")
+            trace.error("scd4x", runtime_error)
+            await task_monitor.sleep("read_scd4x", 5)
 
         except Exception as e:
-            structured_log(f"Unexpected error reading SCD4X sensor: {e}", usyslog.S_ERR)
-            await asyncio.sleep(10)
+            structured_log("Unexpected error reading SCD4X sensor: %s", usyslog.S_ERR, e)
+            task_monitor.error("read_scd4x")
+            trace.error("scd4x", e)
+            await task_monitor.sleep("read_scd4x", 10)
 
         # Await for scd4x_interval amount before the next sensor read to limit the rate of data acquisition.
         # This interval can be adjusted based on how frequently the sensor data needs to be updated.
-        await asyncio.sleep(scd4x_interval)
+        await task_monitor.sleep("read_scd4x", scd4x_interval)
 
 # Asynchronous function to continuously read data from the BME680 sensor and update global variables.
 # The BME680 sensor provides environmental data such as temperature, humidity, air pressure, gas resistance, and altitude.
 async def read_bme680():
-    # Declare global variables to store sensor data.
-    # This allows these values to be accessed and used elsewhere in the program.
-    global bme680_temperature, bme680_humidity, bme680_pressure, bme680_gas, bme680_altitude
-
     while True:  # Infinite loop to keep reading sensor data.
         try:
-            # Read and store the temperature in degrees Celsius from the BME680 sensor.
-            bme680_temperature = bme680_sensor.temperature
-
-            # Read and store the relative humidity in percent from the sensor.
-            bme680_humidity = bme680_sensor.humidity
-
-            # Read and store the air pressure in hectopascals from the sensor.
-            bme680_pressure = bme680_sensor.pressure
-
-            # Read and store the gas resistance in ohms from the sensor.
-            # This can be used to measure indoor air quality.
-            bme680_gas = bme680_sensor.gas
-
-            # Read and store the altitude in meters from the sensor.
-            # The altitude is calculated based on air pressure.
-            bme680_altitude = bme680_sensor.altitude
+            # Take one sample: a single forced measurement from which temperature (degrees Celsius),
+            # relative humidity (percent), air pressure (hectopascals) and gas resistance (ohms) are all derived.
+            # Gas resistance can be used to measure indoor air quality.
+            # Altitude (meters) is calculated from that pressure and SEA_LEVEL_PRESSURE without another read.
+            async with i2c_bus.transaction("bme680", PRIORITY_NORMAL):
+                reading = bme680_sampler.sample(time.monotonic(), bme680_reading)
+
+            # Store the readings (sharing one timestamp) for the send and display tasks.
+            now = ticks_ms()
+            bme680_temperature.append(reading.temperature, now)
+            bme680_humidity.append(reading.humidity, now)
+            bme680_pressure.append(reading.pressure, now)
+            bme680_gas.append(reading.gas, now)
+            bme680_altitude.append(reading.altitude, now)
+            boot_stage("first sample")
 
             # Log the read sensor data for monitoring or debugging purposes.
             # This structured log provides a consistent format for viewing or analyzing the sensor data.
-            structured_log(f"Temperature: {bme680_temperature} deg C, Humidity: {bme680_humidity}%, Pressure: {bme680_pressure} hPa, Gas Resistance: {bme680_gas} ohms, Altitude: {bme680_altitude} meters", usyslog.S_INFO)
+            structured_log("Temperature: %s deg C, Humidity: %s%%, Pressure: %s hPa, Gas Resistance: %s ohms, Altitude: %s meters", usyslog.S_INFO, reading.temperature, reading.humidity, reading.pressure, reading.gas, reading.altitude)
 
         # Catch and handle any runtime errors during sensor reading.
         # This could be due to communication issues or sensor malfunctions.
         except IOError as io_error:
-            structured_log(f"BME680 sensor I/O error: {io_error}", usyslog.S_ERR)
-            await asyncio.sleep(10)
+            structured_log("BME680 sensor I/O error: %s", usyslog.S_ERR, io_error)
+            task_monitor.error("read_bme680")
+            trace.error("bme680", io_error)
+            await task_monitor.sleep("read_bme680", 10)
 
         except RuntimeError as runtime_error:
-            structured_log(f"BME680 sensor runtime error: {runtime_error}", usyslog.S_ERR)
-            await asyncio.sleep(5)
+            structured_log("BME680 sensor runtime error: %s", usyslog.S_ERR, runtime_error)
+            task_monitor.error("read_bme680")
+            trace.error("bme680", runtime_error)
+            await task_monitor.sleep("read_bme680", 5)
 
         except Exception as e:
-            structured_log(f"Unexpected error reading BME680 sensor: {e}", usyslog.S_ERR)
-            await asyncio.sleep(10)
+            structured_log("Unexpected error reading BME680 sensor: %s", usyslog.S_ERR, e)
+            task_monitor.error("read_bme680")
+            trace.error("bme680", e)
+            await task_monitor.sleep("read_bme680", 10)
 
         # Await for 1 second before the next sensor read to regulate the data acquisition rate.
-        await asyncio.sleep(bme680_interval)
+        await task_monitor.sleep("read_bme680", bme680_interval)
 
 # Asynchronous function to continuously read data from the RadSens sensor and update global variables.
 # The RadSens sensor is used for measuring radiation intensity and the number of radiation pulses.
 async def read_radsens():
-    # Declare global variables for storing radiation intensity and number of pulses.
-    # These variables allow the radiation data to be accessed from other parts of the program.
-    global rad_intensy_dynamic, rad_intensy_static, number_of_pulses
-
     while True:  # Infinite loop for continuous data reading.
         try:
-            # Read and store the dynamic radiation intensity.
-            # This might represent real-time or frequently updated radiation levels.
-            rad_intensy_dynamic = sensor.get_rad_intensy_dynamic()
-
-            # Read and store the static radiation intensity.
-            # This could represent a less frequently updated or averaged radiation level.
-            rad_intensy_static = sensor.get_rad_intensy_static()
-
-            # Read and store the number of radiation pulses detected by the sensor.
-            # This count can be useful for assessing radiation events over time.
-            number_of_pulses = sensor.get_number_of_pulses()
+            # Wait for a turn on the shared I2C bus and do all three reads in one transaction.
+            async with i2c_bus.transaction("radsens", PRIORITY_NORMAL):
+                # Read the dynamic radiation intensity.
+                # This might represent real-time or frequently updated radiation levels.
+                dynamic = sensor.get_rad_intensy_dynamic()
+
+                # Read the static radiation intensity.
+                # This could represent a less frequently updated or averaged radiation level.
+                static = sensor.get_rad_intensy_static()
+
+                # Read the number of radiation pulses detected by the sensor.
+                # This count can be useful for assessing radiation events over time.
+                pulses = sensor.get_number_of_pulses()
+
+            # Store the readings (sharing one timestamp) for the send and display tasks.
+            now = ticks_ms()
+            rad_intensy_dynamic.append(dynamic, now)
+            rad_intensy_static.append(static, now)
+            number_of_pulses.append(pulses, now)
+            boot_stage("first sample")
 
             # Log the fetched radiation data for monitoring, analysis, or debugging.
             # This structured logging provides a consistent format for the radiation sensor data.
-            structured_log(f"Radiation Intensity (Dynamic): {rad_intensy_dynamic} uR/h, Radiation Intensity (Static): {rad_intensy_static} uR/h, Number of Pulses: {number_of_pulses}", usyslog.S_INFO)
+            structured_log("Radiation Intensity (Dynamic): %s uR/h, Radiation Intensity (Static): %s uR/h, Number of Pulses: %s", usyslog.S_INFO, dynamic, static, pulses)
 
         # Catch and handle any runtime errors that occur during data retrieval from the sensor.
         # Errors might arise from communication issues with the sensor or other hardware-related problems.
         except IOError as io_error:
-            structured_log(f"RadSens sensor I/O error: {io_error}", usyslog.S_ERR)
-            await asyncio.sleep(10)
+            structured_log("RadSens sensor I/O error: %s", usyslog.S_ERR, io_error)
+            task_monitor.error("read_radsens")
+            trace.error("radsens", io_error)
+            await task_monitor.sleep("read_radsens", 10)
 
         except RuntimeError as runtime_error:
-            structured_log(f"RadSens sensor runtime error: {runtime_error}", usyslog.S_ERR)
-            await asyncio.sleep(5)
+            structured_log("RadSens sensor runtime error: %s", usyslog.S_ERR, runtime_error)
+            task_monitor.error("read_radsens")
+            trace.error("radsens", runtime_error)
+            await task_monitor.sleep("read_radsens", 5)
 
         except Exception as e:
-            structured_log(f"Unexpected error reading RadSens sensor: {e}", usyslog.S_ERR)
-            await asyncio.sleep(10)
+            structured_log("Unexpected error reading RadSens sensor: %s", usyslog.S_ERR, e)
+            task_monitor.error("read_radsens")
+            trace.error("radsens", e)
+            await task_monitor.sleep("read_radsens", 10)
 
         # Await for radsens_interval amount before the next sensor read to limit the rate of data acquisition.
         # This interval can be adjusted based on how frequently the sensor data needs to be updated.
-        await asyncio.sleep(radsens_interval)
+        await task_monitor.sleep("read_radsens", radsens_interval)
+
+# Asynchronous function to record the readings stored since its last run to the trace.
+# The records are buffered in RAM and appended to flash whenever the buffer fills up.
+async def record_trace():
+    while True:
+        trace.capture()
+        await task_monitor.sleep("record_trace", TRACE_INTERVAL)
 
 # Asynchronous function to manage the WiFi connection.
 # This function continuously checks and maintains the WiFi connection in the background.
@@ -697,209 +998,377 @@ async def wifi_connect():
 
                 # If the connection is successful, log a message with the device's IP address.
                 # This is useful for network troubleshooting and confirming successful connections.
-                structured_log("Connected! Device IP Address: " + str(wifi.radio.ipv4_address), usyslog.S_INFO)
+                structured_log("Connected! Device IP Address: %s", usyslog.S_INFO, wifi.radio.ipv4_address)
+                boot_stage("wifi")
 
             # Catch exceptions that occur if the WiFi connection fails.
             # This could be due to incorrect credentials, signal issues, or other WiFi-related problems.
             except ConnectionError as e:
                 # Log the failed attempt and any associated information.
-                structured_log(f"WiFi connection attempt failed: {e}", usyslog.S_ERR)
+                structured_log("WiFi connection attempt failed: %s", usyslog.S_ERR, e)
+                task_monitor.error("wifi_connect")
                 # Log the memory
                 monitor_memory("Post WiFi Connection Attempt")
                 # If an error occurs, the function will pause for 10 seconds before retrying.
                 # This prevents the function from attempting to reconnect too frequently.
-                await asyncio.sleep(10)
+                await task_monitor.sleep("wifi_connect", 10)
 
         # If the device is already connected to WiFi,
         # the function will pause for 60 seconds before checking the connection again.
         # This is a less aggressive check to maintain the connection without constant polling.
         else:
-            await asyncio.sleep(60)
+            await task_monitor.sleep("wifi_connect", 60)
 
-# Asynchronous function to synchronize the device's time using the Network Time Protocol (NTP) at regular intervals.
+# Asynchronous function to synchronize the device's time using the Network Time Protocol (NTP).
+# The interval adapts to how well the clock model predicts each sync (see sntp.py).
 async def ntp_time_sync():
-    global time_synced
+    global time_synced, ntp_interval
     # Wait until the device is connected to WiFi before attempting time synchronization.
     # This loop ensures that there is an active network connection for NTP communication.
     while not wifi.radio.connected:
-        await asyncio.sleep(1)  # Pause for 1 second between each connection check.
-
-    # Initialize the NTP client with the provided socket pool and timezone offset.
-    # The timezone offset (ntp_offset) adjusts the time to the local timezone.
-    ntp = adafruit_ntp.NTP(pool, tz_offset=ntp_offset)
+        await task_monitor.sleep("ntp_time_sync", 1)  # Pause for 1 second between each connection check.
 
     while True:  # Infinite loop to continuously synchronize time.
+        # Retry sooner if this sync fails
+        delay = NTP_MIN_INTERVAL
         try:
             # Log the start of the time synchronization process.
             structured_log("Syncing time...", usyslog.S_INFO)
 
-            # Fetch the current time from an NTP server.
-            # This updates the device's internal clock to the current time.
-            current_time_struct = ntp.datetime
+            # Query the NTP server (without blocking the other tasks) and feed the result to the clock model
+            # (offset and drift of the monotonic clock) so readings can be timestamped.
+            # Readings taken before the first sync are stamped from it too, when they are sent.
+            error_ns = await ntp_client.sync(clock)
 
-            # Format the fetched time into a human-readable string.
-            formatted_time = f"{current_time_struct.tm_year}-{current_time_struct.tm_mon:02d}-{current_time_struct.tm_mday:02d} {current_time_struct.tm_hour:02d}:{current_time_struct.tm_min:02d}:{current_time_struct.tm_sec:02d}"
-
-            # Log the successful time synchronization with the formatted time.
-            structured_log(f"Time synchronized: {formatted_time}", usyslog.S_INFO)
-
-            # Set the flag to True after successful sync
-            time_synced = True
+            if error_ns is None:
+                structured_log("No usable NTP reply (%d timeouts, %d rejected, %d spikes)", usyslog.S_WARN,
+                               ntp_client.timeouts, ntp_client.rejected, ntp_client.spikes)
+            else:
+                # Measure the drift at the shortest interval first, then stretch/shrink the interval to keep the
+                # clock error around NTP_TOLERANCE_MS
+                if clock.drift_known:
+                    ntp_interval = next_interval(ntp_interval, error_ns, NTP_TOLERANCE_MS * 1_000_000,
+                                                 NTP_MIN_INTERVAL, NTP_MAX_INTERVAL)
+                    delay = ntp_interval
+                structured_log("Clock model: %d syncs, drift %.1f ppm, error %d ms, delay %d ms, next sync in %d s",
+                               usyslog.S_DEBUG, clock.syncs, clock.drift_ppm, error_ns // 1_000_000,
+                               ntp_client.delay_ns // 1_000_000, delay)
+
+                # Convert to local time using the configured timezone offset.
+                current_time_struct = time.localtime(clock.now_ns() // 1_000_000_000 + ntp_offset * 3600)
+
+                # Log the successful time synchronization with the time in a human-readable format.
+                structured_log("Time synchronized: %d-%02d-%02d %02d:%02d:%02d", usyslog.S_INFO,
+                               current_time_struct.tm_year, current_time_struct.tm_mon, current_time_struct.tm_mday,
+                               current_time_struct.tm_hour, current_time_struct.tm_min, current_time_struct.tm_sec)
+
+                # Set the flag to True after successful sync
+                time_synced = True
+                boot_stage("time synced")
 
         # Catch any exceptions that might occur during the time synchronization process.
         # Exceptions can arise from network issues or NTP server unavailability.
         except Exception as e:
             # Log any errors encountered during time synchronization for troubleshooting.
-            structured_log("Failed to sync time:" + str(e), usyslog.S_ERR)
+            structured_log("Failed to sync time:%s", usyslog.S_ERR, e)
+            task_monitor.error("ntp_time_sync")
 
-        # Manually trigger garbage collection to manage memory usage effectively.
-        gc.collect()
-
-        # Pause the function based on the configured NTP sync interval (ntp_sync_interval).
-        # This interval determines how frequently the device synchronizes its time with the NTP server.
-        await asyncio.sleep(ntp_sync_interval)
+        # Pause until the next sync.
+        await task_monitor.sleep("ntp_time_sync", delay)
 
+# This function sends the readings to InfluxDB, one batch per cycle. It starts at boot, without waiting for the
+# network: until the first NTP sync, each cycle's batch goes to the backlog (see hold_for_sync()), and the HTTPS
+# connection is opened as soon as WiFi is up (see open_session()).
 async def send_data_to_influxdb():
-    # Send data to InfluxDB
-    global rad_intensy_dynamic, rad_intensy_static, number_of_pulses
-    global bme680_temperature, bme680_humidity, bme680_pressure, bme680_gas, bme680_altitude
-    global scd4x_co2, scd4x_temperature, scd4x_humidity
-    global pm10_standard, pm25_standard, pm100_standard, pm10_env, pm25_env, pm100_env
-    global particles_03um, particles_05um, particles_10um, particles_25um, particles_50um, particles_100um
-
-    # Wait until the device is connected to WiFi and has synchronized time.
-    while not (wifi.radio.connected and time_synced):
-        await asyncio.sleep(1)
-
     # Create SSL context for secure HTTP communication.
     ssl_context = ssl.create_default_context()
     ssl_context.check_hostname = SSL_VERIFY_HOSTNAME
     
-    # Initialize an HTTP session for sending data.
-    http_session = requests.Session(pool, ssl_context)
+    # Initialize a non-blocking HTTP writer for sending data, with a timeout for each phase of a request.
+    # With keep-alive the connection (and its TLS session) is reused across cycles.
+    http_writer = AsyncHTTPWriter(pool, INFLUXDB_URL, HEADERS, ssl_context,
+                                  INFLUXDB_CONNECT_TIMEOUT, INFLUXDB_TLS_TIMEOUT,
+                                  INFLUXDB_SEND_TIMEOUT, INFLUXDB_RESPONSE_TIMEOUT,
+                                  INFLUXDB_KEEP_ALIVE, INFLUXDB_IDLE_TIMEOUT)
+
+    # Batch that collects every ready reading for one cycle (one line per device).
+    # With INFLUXDB_PREALLOCATED_ENCODER (the default), lines are encoded into one preallocated buffer that is
+    # reused every cycle; otherwise each line is formatted as a string.
+    batch = LineBatch(INFLUXDB_MEASUREMENT, LOCATION, INFLUXDB_BATCH_MAX_BYTES, INFLUXDB_FLOAT_DECIMALS,
+                      INFLUXDB_PREALLOCATED_ENCODER)
+    # Line prefixes for the internal metrics that aren't per task (I2C bus usage per device, monitor overhead)
+    i2c_prefixes = {}
+    monitor_prefix = make_prefix(task_monitor.measurement, (("location", LOCATION), ("task", "task_monitor")))
+    syslog_prefix = make_prefix(task_monitor.measurement, (("location", LOCATION), ("task", "syslog")))
+    ntp_prefix = make_prefix(task_monitor.measurement, (("location", LOCATION), ("task", "ntp")))
+    breaker_prefix = make_prefix(task_monitor.measurement, (("location", LOCATION), ("task", "influxdb_writer")))
+    display_prefix = make_prefix(task_monitor.measurement, (("location", LOCATION), ("display", "ssd1306")))
+    report_prefix = make_prefix(task_monitor.measurement, (("location", LOCATION), ("task", "report_filter")))
+    # Lines larger than INFLUXDB_BATCH_MAX_BYTES seen so far (logged when the count grows)
+    oversize_logged = 0
+    # Spool flash errors already logged
+    spool_flash_errors_logged = 0
 
     while True:
-        # Send RadSens sensor data
-        if ENABLE_RADSENS_SENSOR and rad_intensy_dynamic is not None:
-            await send_data(f"radiation_intensity_dynamic,device=radsens,location={LOCATION} value={rad_intensy_dynamic}", http_session)
-        if ENABLE_RADSENS_SENSOR and rad_intensy_static is not None:
-            await send_data(f"radiation_intensity_static,device=radsens,location={LOCATION} value={rad_intensy_static}", http_session)
-        if ENABLE_RADSENS_SENSOR and number_of_pulses is not None:
-            await send_data(f"number_of_pulses,device=radsens,location={LOCATION} value={number_of_pulses}", http_session)
-
-        # Send BME680 sensor data
-        if ENABLE_BME680_SENSOR and bme680_temperature is not None:
-            await send_data(f"temperature,device=bme680,location={LOCATION} value={bme680_temperature}", http_session)
-        if ENABLE_BME680_SENSOR and bme680_humidity is not None:
-            await send_data(f"humidity,device=bme680,location={LOCATION} value={bme680_humidity}", http_session)
-        if ENABLE_BME680_SENSOR and bme680_pressure is not None:
-            await send_data(f"pressure,device=bme680,location={LOCATION} value={bme680_pressure}", http_session)
-        if ENABLE_BME680_SENSOR and bme680_gas is not None:
-            await send_data(f"gas_resistance,device=bme680,location={LOCATION} value={bme680_gas}", http_session)
-        if ENABLE_BME680_SENSOR and bme680_altitude is not None:
-            await send_data(f"altitude,device=bme680,location={LOCATION} value={bme680_altitude}", http_session)
-
-        # Send SCD4X sensor data
-        if ENABLE_SCD4X_SENSOR and scd4x_co2 is not None:
-            await send_data(f"co2,device=scd4x,location={LOCATION} value={scd4x_co2}", http_session)
-        if ENABLE_SCD4X_SENSOR and scd4x_temperature is not None:
-            await send_data(f"temperature_scd4x,device=scd4x,location={LOCATION} value={scd4x_temperature}", http_session)
-        if ENABLE_SCD4X_SENSOR and scd4x_humidity is not None:
-            await send_data(f"humidity_scd4x,device=scd4x,location={LOCATION} value={scd4x_humidity}", http_session)
-
-        # Send PM2.5 sensor data
-        if ENABLE_PM25_SENSOR and pm10_standard is not None:
-            await send_data(f"pm10_standard,device=pm25,location={LOCATION} value={pm10_standard}", http_session)
-        if ENABLE_PM25_SENSOR and pm25_standard is not None:
-            await send_data(f"pm25_standard,device=pm25,location={LOCATION} value={pm25_standard}", http_session)
-        if ENABLE_PM25_SENSOR and pm100_standard is not None:
-            await send_data(f"pm100_standard,device=pm25,location={LOCATION} value={pm100_standard}", http_session)
-        if ENABLE_PM25_SENSOR and pm10_env is not None:
-            await send_data(f"pm10_env,device=pm25,location={LOCATION} value={pm10_env}", http_session)
-        if ENABLE_PM25_SENSOR and pm25_env is not None:
-            await send_data(f"pm25_env,device=pm25,location={LOCATION} value={pm25_env}", http_session)
-        if ENABLE_PM25_SENSOR and pm100_env is not None:
-            await send_data(f"pm100_env,device=pm25,location={LOCATION} value={pm100_env}", http_session)
-        # Continue with other particulate data if desired/necessary.
+        # Start a fresh batch for this cycle
+        batch.clear()
+
+        # Before the first NTP sync: keep the readings for later and bring up the HTTP session
+        if not time_synced:
+            hold_for_sync(batch)
+            # Check every second, so the first write follows the sync instead of waiting out a whole interval
+            waited = 0
+            while not time_synced and waited < influxdb_send_interval:
+                await open_session(http_writer)
+                await task_monitor.sleep("send_data_to_influxdb", 1)
+                waited += 1
+            continue
+
+        # Hand the readings held since boot over to the spool (or send them) now that they can be stamped
+        if len(backlog):
+            await release_backlog(http_writer)
+
+        # Make sure there is room for a TLS handshake before writing (collects only when memory is short)
+        memory_manager.ensure_free(GC_TLS_RESERVE_BYTES)
+
+        # Time of this cycle (UTC ns), used to stamp the internal metrics
+        cycle_ns = clock.now_ns()
+
+        # Add the readings of every channel in the reading store, one line per device, stamped with the time the
+        # newest reading was taken (PM2.5 exports all 12 fields of the frame: mass concentrations (standard and
+        # environmental) and particle counts). With INFLUXDB_AGGREGATE, min/max/mean/count of the samples taken
+        # since the previous cycle are added.
+        aggregator.flush(batch, clock, report_filter)
+
+        # Add the internal metrics (per-task timing, I2C bus usage and the monitor's own overhead)
+        if ENABLE_TASK_MONITORING:
+            task_monitor.publish(batch, cycle_ns)
+            for device, stats in i2c_bus.stats.items():
+                prefix = i2c_prefixes.get(device)
+                if prefix is None:
+                    prefix = make_prefix(task_monitor.measurement, (("location", LOCATION), ("i2c", device)))
+                    i2c_prefixes[device] = prefix
+                batch.add_prefixed(prefix, (
+                    ("transactions", stats.transactions),
+                    ("busy_ms", stats.busy_ns // 1_000_000),
+                    ("wait_ms", stats.wait_ns // 1_000_000),
+                    ("max_wait_ms", stats.max_wait_ns // 1_000_000),
+                ), cycle_ns)
+            batch.add_prefixed(monitor_prefix, (
+                ("overhead_us", task_monitor.overhead_us),
+                ("mem_free", memory_manager.free()),
+                ("gc_collections", memory_manager.collections),
+                ("gc_ms", memory_manager.collect_ns // 1_000_000),
+            ), cycle_ns)
+            batch.add_prefixed(ntp_prefix, (
+                ("drift_ppm", clock.drift_ppm),
+                ("error_ms", clock.last_error_ns / 1_000_000),
+                ("delay_ms", ntp_client.delay_ns / 1_000_000),
+                ("interval", ntp_interval),
+                ("timeouts", ntp_client.timeouts),
+                ("rejected", ntp_client.rejected),
+                ("spikes", ntp_client.spikes),
+            ), cycle_ns)
+            batch.add_prefixed(breaker_prefix, (
+                ("breaker_state", breaker.state),
+                ("consecutive_failures", breaker.failures),
+                ("breaker_trips", breaker.trips),
+                ("short_circuited", breaker.short_circuited),
+                ("open_remaining_s", breaker.remaining()),
+                ("requests", http_writer.requests),
+                ("handshakes", http_writer.handshakes),
+                ("reused", http_writer.reused),
+                ("stale", http_writer.stale),
+                ("idle_reconnects", http_writer.idle_reconnects),
+                ("retries", http_writer.retries),
+            ), cycle_ns)
+            if s is not None:
+                batch.add_prefixed(syslog_prefix, (
+                    ("queued", len(s)),
+                    ("sent", s.sent),
+                    ("dropped", s.dropped),
+                    ("send_errors", s.send_errors),
+                    ("latency_ms_mean", s.latency_ms_mean),
+                    ("latency_ms_max", s.latency_max_ns / 1_000_000),
+                ), cycle_ns)
+            if ENABLE_DISPLAY and DISPLAY_OK:
+                batch.add_prefixed(display_prefix, (
+                    ("frames_pushed", renderer.frames_pushed),
+                    ("frames_skipped", renderer.frames_skipped),
+                    ("refresh_errors", renderer.refresh_errors),
+                    ("refresh_ms_max", renderer.refresh_max_ns / 1_000_000),
+                ), cycle_ns)
+            if report_filter is not None:
+                batch.add_prefixed(report_prefix, (
+                    ("fields_sent", report_filter.sent),
+                    ("fields_skipped", report_filter.skipped),
+                ), cycle_ns)
+
+        # Send the whole cycle as one write (split only if it exceeds INFLUXDB_BATCH_MAX_BYTES).
+        # With the preallocated encoder the last body is a memoryview over its buffer, so nothing is copied on the way
+        # to the socket.
+        # While the circuit breaker is open the bodies go straight to the spool; once its cooldown has passed the
+        # first line is sent alone as the probe and the rest follow only if it succeeds (see send_data()). A body
+        # that fails after its probe line went through is spooled whole; InfluxDB overwrites the repeated line.
+        cycle_ok = True
+        for body in batch.bodies():
+            if await send_data(body, http_writer) == WRITE_RETRY:
+                cycle_ok = False
+                # Keep the failed body for a later retry (its lines already carry their timestamps)
+                if spool is not None and not spool.append(0, body):
+                    structured_log("Spool append failed; data dropped", usyslog.S_ERR)
+
+        if batch.oversize > oversize_logged:
+            structured_log("%d line(s) larger than INFLUXDB_BATCH_MAX_BYTES (%d) sent in writes of their own",
+                           usyslog.S_WARN, batch.oversize - oversize_logged, INFLUXDB_BATCH_MAX_BYTES)
+            oversize_logged = batch.oversize
+
+        # Once writes succeed again, drain the spool oldest-first in bulk writes
+        if cycle_ok and spool is not None and len(spool):
+            await drain_spool(http_writer)
+
+        # A flash error moves the spool to RAM (see spool.py); say so once
+        if spool is not None and spool.flash_errors > spool_flash_errors_logged:
+            structured_log("Spool flash error; spooling in RAM from now on (%s records, cap %s bytes)",
+                           usyslog.S_ERR, len(spool), spool.max_bytes)
+            spool_flash_errors_logged = spool.flash_errors
+
+        # Log the per-device I2C bus occupancy and wait times
+        if logger.enabled_for(usyslog.S_INFO):
+            structured_log("I2C bus usage - %s", usyslog.S_INFO, i2c_bus.summary())
+
+        # Emit the "suppressed N" summaries for rate-limited messages that haven't repeated since
+        logger.flush_suppressed()
 
         # Log the memory
         monitor_memory("InfluxDB Send")
 
-        # Manually trigger garbage collection to manage memory usage
-        gc.collect()
-
         # Wait for the influx_send_interval amount before sending the next batch of data.
         # This interval can be adjusted based on how frequently the sensor data needs to be sent.
-        await asyncio.sleep(influxdb_send_interval)
+        await task_monitor.sleep("send_data_to_influxdb", influxdb_send_interval)
 
 # Asynchronous function to continuously update the display with sensor readings.
 async def update_display():
+    # Apply the configured contrast (waits for a turn on the shared I2C bus)
+    try:
+        await set_oled_contrast(OLED_CONTRAST)
+    except (OSError, RuntimeError) as e:
+        structured_log("Setting the display contrast failed: %s", usyslog.S_WARN, e)
+
+    # Graph mode state: page 0 is the text page, page n is graph page n - 1
+    page = 0
+    next_page = time.monotonic() + DISPLAY_PAGE_INTERVAL
+    next_sample = time.monotonic()
+
     while True:  # Infinite loop for continuous updates.
+        if graph is not None:
+            now = time.monotonic()
+            # Add one column to every graph (only the page on screen is drawn)
+            if now >= next_sample:
+                next_sample = now + DISPLAY_GRAPH_SAMPLE_INTERVAL
+                for index, source in graph_sources:
+                    if graph.sample(index, source()):
+                        renderer.mark_dirty()
+            # Rotate to the next page
+            if now >= next_page:
+                next_page = now + DISPLAY_PAGE_INTERVAL
+                page = (page + 1) % (len(graph.pages) + 1)
+                if page:
+                    graph.show(page - 1)
+                    show_group(graph.group)
+                else:
+                    show_group(group)
+                renderer.mark_dirty()
+
+        # The labels below are only updated while the text page is on screen
+        text_page = page == 0
+
         # Update the display only if BME680 sensor is enabled
-        if ENABLE_BME680_SENSOR:
+        if ENABLE_BME680_SENSOR and text_page:
             # Only update the display if the sensor data is available; otherwise show fallback
-            temperature_label.text = f"Temp: {bme680_temperature:.2f}C" if bme680_temperature is not None else "Temp: --"
-            humidity_label.text = f"Humid: {bme680_humidity:.2f}%" if bme680_humidity is not None else "Humid: --"
-            pressure_label.text = f"Press: {bme680_pressure:.2f}hPa" if bme680_pressure is not None else "Press: --"
+            # (labels whose value hasn't changed are left alone)
+            temperature = bme680_temperature.last()
+            humidity = bme680_humidity.last()
+            pressure = bme680_pressure.last()
+            renderer.set(temperature_slot, temperature)
+            renderer.set(humidity_slot, humidity)
+            renderer.set(pressure_slot, pressure)
 
             # Log the updated BME680 sensor readings for diagnostics
-            structured_log(f"Updating Display - Temp: {bme680_temperature}, Humidity: {bme680_humidity}, Pressure: {bme680_pressure}", usyslog.S_INFO)
+            structured_log("Updating Display - Temp: %s, Humidity: %s, Pressure: %s", usyslog.S_INFO, temperature, humidity, pressure)
 
         # Update the display only if SCD4X sensor is enabled
-        if ENABLE_SCD4X_SENSOR:
+        if ENABLE_SCD4X_SENSOR and text_page:
             # Only update if a valid reading is present; otherwise show fallback to match pattern
-            co2_label.text = f"CO2: {int(scd4x_co2)} ppm" if scd4x_co2 is not None else "CO2: --"
+            co2 = scd4x_co2.last()
+            renderer.set(co2_slot, co2)
 
             # Log the updated SCD4X CO2 reading for diagnostics
-            structured_log(f"Updating Display - CO2: {scd4x_co2}", usyslog.S_INFO)
+            structured_log("Updating Display - CO2: %s", usyslog.S_INFO, co2)
 
         # Update the display only if RadSens sensor is enabled
-        if ENABLE_RADSENS_SENSOR:
+        if ENABLE_RADSENS_SENSOR and text_page:
             # Only update if a valid reading is present; otherwise show fallback to match pattern
-            # Use int() for compact display; switch to :.1f for one decimal place if preferred
-            radiation_label.text = f"Rad: {int(rad_intensy_dynamic)} uR/h" if rad_intensy_dynamic is not None else "Rad: --"
+            radiation = rad_intensy_dynamic.last()
+            renderer.set(radiation_slot, radiation)
 
             # Log the updated RadSens radiation reading for diagnostics
-            structured_log(f"Updating Display - Radiation: {rad_intensy_dynamic}", usyslog.S_INFO)
+            structured_log("Updating Display - Radiation: %s", usyslog.S_INFO, radiation)
 
-        # Refreshing the display is not needed in every environment, hence it's commented out.
-        # If your display requires manual refreshing after changing label texts, uncomment the next line.
-        # display.refresh()
-
-        # Manually trigger garbage collection to manage memory usage effectively.
-        gc.collect()
+        # Push one frame if any label changed (waits for a turn on the shared I2C bus); otherwise skip the refresh.
+        # A bus error leaves the frame pending for the next pass.
+        await renderer.render()
+        if renderer.last_error is not None:
+            structured_log("Display refresh error: %s", usyslog.S_ERR, renderer.last_error)
+            task_monitor.error("update_display")
 
         # Wait for display_update_interval amount before updating the display again.
-        await asyncio.sleep(display_update_interval)
+        await task_monitor.sleep("update_display", display_update_interval)
 
 # The main asynchronous function that orchestrates and runs all other asynchronous tasks.
 async def main():
     # Define a list of tasks that need to be run concurrently.
     # Each task is created using asyncio.create_task from the respective asynchronous function.
-    tasks = [
-        # Create a task for managing the WiFi connection.
-        asyncio.create_task(wifi_connect()),
-        # Create a task for synchronizing the device's time with an NTP server.
-        asyncio.create_task(ntp_time_sync()),
-    ]
-    
-    # Create a task for sending sensor data to an InfluxDB database (if it is ready).
-    if INFLUX_READY:
-        tasks.append(asyncio.create_task(send_data_to_influxdb()))
+    # Each task is wrapped by the task monitor so a crash is counted before it propagates.
+    # Tasks run in the order they are created, so the sensors take their first samples before the network tasks
+    # start bringing up WiFi (which blocks while joining), NTP, syslog and the HTTP session.
+    tasks = []
 
-    # Create a task for continuously updating the display with the latest sensor readings.
-    if ENABLE_DISPLAY and DISPLAY_OK:
-        tasks.append(asyncio.create_task(update_display()))
-
-    # Create tasks for reading data from the SCD4X, BME680, and RadSens sensors.
+    # Create tasks for reading data from the SCD4X, BME680, PM2.5 and RadSens sensors.
     if ENABLE_SCD4X_SENSOR:
-        tasks.append(asyncio.create_task(read_scd4x()))
+        tasks.append(asyncio.create_task(task_monitor.wrap("read_scd4x", read_scd4x())))
     if ENABLE_BME680_SENSOR:
-        tasks.append(asyncio.create_task(read_bme680()))
+        tasks.append(asyncio.create_task(task_monitor.wrap("read_bme680", read_bme680())))
     if ENABLE_PM25_SENSOR:
-        tasks.append(asyncio.create_task(read_pm25()))
+        tasks.append(asyncio.create_task(task_monitor.wrap("read_pm25", read_pm25())))
     if ENABLE_RADSENS_SENSOR:
-        tasks.append(asyncio.create_task(read_radsens()))
+        tasks.append(asyncio.create_task(task_monitor.wrap("read_radsens", read_radsens())))
+
+    # Create a task for continuously updating the display with the latest sensor readings.
+    if ENABLE_DISPLAY and DISPLAY_OK:
+        tasks.append(asyncio.create_task(task_monitor.wrap("update_display", update_display())))
+
+    # Create a task recording the readings to the trace (if recording is possible).
+    if trace.enabled:
+        tasks.append(asyncio.create_task(task_monitor.wrap("record_trace", record_trace())))
+
+    # Create a task for managing the WiFi connection.
+    tasks.append(asyncio.create_task(task_monitor.wrap("wifi_connect", wifi_connect())))
+    # Create a task for synchronizing the device's time with an NTP server.
+    tasks.append(asyncio.create_task(task_monitor.wrap("ntp_time_sync", ntp_time_sync())))
+    # Create a task that collects garbage in idle windows when free memory runs low.
+    tasks.append(asyncio.create_task(task_monitor.wrap("memory_manager", memory_manager.idle_task(GC_IDLE_INTERVAL))))
+
+    # Create a task that sends the queued syslog messages (they queue up until WiFi is connected).
+    if s is not None:
+        tasks.append(asyncio.create_task(task_monitor.wrap("syslog", s.run())))
+
+    # Create a task for sending sensor data to an InfluxDB database (if it is ready).
+    # It holds the readings taken before the first NTP sync and sends them afterwards.
+    if INFLUX_READY:
+        tasks.append(asyncio.create_task(task_monitor.wrap("send_data_to_influxdb", send_data_to_influxdb())))
+
+    boot_stage("tasks started")
 
     # Use asyncio.gather to run all the tasks concurrently.
     # This allows the program to handle multiple operations in parallel.
@@ -908,7 +1377,7 @@ async def main():
     except Exception as e:
         # If an exception occurs in any of the tasks, log the error for debugging.
         # This is important for understanding and resolving issues that may arise during execution.
-        structured_log(f"An error occurred in the main task: {e}", usyslog.S_ERR)
+        structured_log("An error occurred in the main task: %s", usyslog.S_ERR, e)
         # Additional exception handling logic can be added here as needed.
 
 # ------------------------
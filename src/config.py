@@ -0,0 +1,245 @@
+# EnviroSnoop Config 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Loads settings.toml once at boot: every known key is read with os.getenv(), converted to its type and checked
+# against its range, and the result is an immutable Settings object (config.SCD4X_INTERVAL, config.LOG_LEVEL, ...).
+# Every problem found is collected and reported at once in a ConfigError, so a typo stops the device before it
+# starts instead of crashing it partway through boot.
+#
+# Settings of a disabled subsystem (e.g. the display settings with ENABLE_DISPLAY = "FALSE") are not read or
+# checked; they keep their defaults.
+#
+# CircuitPython's os.getenv() returns strings, or integers for unquoted numbers, so both are accepted.
+
+import os
+
+from clock_model import MIN_DRIFT_INTERVAL
+from logger import parse_level
+from report_filter import parse_deadband
+
+# Setting types
+BOOL = 0     # "TRUE"/"FALSE" (any case)
+INT = 1
+FLOAT = 2
+STR = 3
+HEX = 4      # integer in hex, e.g. "0x3C"
+LEVEL = 5    # syslog severity name or number (see logger.parse_level())
+CHOICE = 6   # one of the strings in low (case-insensitive, stored lowercase)
+
+# Default of a setting that must be present
+REQUIRED = object()
+
+# Every known setting: (key, type, default, low, high, enabled by)
+# low/high: inclusive range of INT/FLOAT/HEX values (None for no bound); the allowed values of a CHOICE
+# enabled by: BOOL setting (listed before it) the setting only applies with, or None
+SCHEMA = (
+    # WiFi, TLS and location
+    ("SSID", STR, REQUIRED, None, None, None),
+    ("PSK", STR, None, None, None, None),
+    ("SSL_VERIFY_HOSTNAME", BOOL, True, None, None, None),
+    ("LOCATION", STR, "Unknown", None, None, None),
+    # Logging and diagnostics
+    ("SYSLOG_SERVER_ENABLED", BOOL, False, None, None, None),
+    ("SYSLOG_SERVER", STR, REQUIRED, None, None, "SYSLOG_SERVER_ENABLED"),
+    ("SYSLOG_PORT", INT, 514, 1, 65535, "SYSLOG_SERVER_ENABLED"),
+    ("SYSLOG_QUEUE_SIZE", INT, 32, 1, None, "SYSLOG_SERVER_ENABLED"),
+    ("SYSLOG_PACK_MESSAGES", BOOL, False, None, None, "SYSLOG_SERVER_ENABLED"),
+    ("CONSOLE_LOG_ENABLED", BOOL, False, None, None, None),
+    ("LOG_LEVEL", LEVEL, "INFO", None, None, None),
+    ("LOG_RATE_LIMIT_INTERVAL", INT, 60, 0, None, None),
+    ("LOG_RATE_LIMIT_BURST", INT, 20, 1, None, None),
+    ("MEMORY_MONITORING", BOOL, False, None, None, None),
+    ("TASK_MONITORING", BOOL, False, None, None, None),
+    # Memory management
+    ("GC_THRESHOLD_BYTES", INT, 0, 0, None, None),
+    ("GC_IDLE_FREE_BYTES", INT, 40000, 0, None, None),
+    ("GC_IDLE_INTERVAL", FLOAT, 1.0, 0.1, None, None),
+    ("GC_TLS_RESERVE_BYTES", INT, 32768, 0, None, None),
+    ("GC_MEASURE_FRAGMENTATION", BOOL, False, None, None, None),
+    # NTP
+    ("NTP_OFFSET", INT, -8, -12, 14, None),
+    ("NTP_SYNC_INTERVAL", INT, 3600, 1, None, None),
+    ("NTP_SERVER", STR, "pool.ntp.org", None, None, None),
+    ("NTP_PORT", INT, 123, 1, 65535, None),
+    # Syncs closer together than MIN_DRIFT_INTERVAL never measure the drift, so the interval could never adapt
+    ("NTP_MIN_INTERVAL", INT, 300, MIN_DRIFT_INTERVAL, None, None),
+    ("NTP_MAX_INTERVAL", INT, 86400, 1, None, None),
+    ("NTP_TOLERANCE_MS", INT, 50, 1, None, None),
+    ("NTP_SAMPLES", INT, 4, 1, 16, None),
+    ("NTP_MAX_DELAY_MS", INT, 500, 1, None, None),
+    ("NTP_SPIKE_MS", INT, 1000, 0, None, None),
+    # Sensors
+    ("ENABLE_SCD4X_SENSOR", BOOL, True, None, None, None),
+    ("SCD4X_INTERVAL", INT, 5, 1, None, "ENABLE_SCD4X_SENSOR"),
+    ("ENABLE_BME680_SENSOR", BOOL, True, None, None, None),
+    ("BME680_INTERVAL", INT, 5, 1, None, "ENABLE_BME680_SENSOR"),
+    ("SEA_LEVEL_PRESSURE", FLOAT, 1013.25, 800.0, 1200.0, "ENABLE_BME680_SENSOR"),
+    ("ENABLE_RADSENS_SENSOR", BOOL, True, None, None, None),
+    ("RADSENS_INTERVAL", INT, 5, 1, None, "ENABLE_RADSENS_SENSOR"),
+    ("ENABLE_PM25_SENSOR", BOOL, True, None, None, None),
+    ("PM25_INTERVAL", INT, 5, 1, None, "ENABLE_PM25_SENSOR"),
+    ("READING_BUFFER_SIZE", INT, 32, 1, None, None),
+    # Display
+    ("ENABLE_DISPLAY", BOOL, True, None, None, None),
+    ("DISPLAY_UPDATE_INTERVAL", INT, 1, 1, None, "ENABLE_DISPLAY"),
+    ("DISPLAY_MODE", CHOICE, "text", ("text", "graph"), None, "ENABLE_DISPLAY"),
+    ("DISPLAY_PAGE_INTERVAL", INT, 10, 1, None, "ENABLE_DISPLAY"),
+    ("DISPLAY_GRAPH_SAMPLE_INTERVAL", INT, 10, 1, None, "ENABLE_DISPLAY"),
+    ("OLED_I2C_ADDR", HEX, 0x3C, 0x08, 0x77, "ENABLE_DISPLAY"),
+    ("OLED_CONTRAST", FLOAT, 1.0, 0.0, 1.0, "ENABLE_DISPLAY"),
+    # InfluxDB (the connection settings are optional: without them, metrics are disabled)
+    ("INFLUXDB_URL", STR, None, None, None, None),
+    ("INFLUXDB_ORG", STR, None, None, None, None),
+    ("INFLUXDB_BUCKET", STR, None, None, None, None),
+    ("INFLUXDB_TOKEN", STR, None, None, None, None),
+    ("INFLUXDB_SEND_INTERVAL", INT, 10, 1, None, None),
+    ("INFLUXDB_MEASUREMENT", STR, "env", None, None, None),
+    ("INFLUXDB_BATCH_MAX_BYTES", INT, 4096, 256, None, None),
+    ("INFLUXDB_FLOAT_DECIMALS", INT, 3, 0, 9, None),
+    ("INFLUXDB_PREALLOCATED_ENCODER", BOOL, True, None, None, None),
+    ("INFLUXDB_AGGREGATE", BOOL, True, None, None, None),
+    ("INFLUXDB_CONNECT_TIMEOUT", FLOAT, 5.0, 0.1, None, None),
+    ("INFLUXDB_TLS_TIMEOUT", FLOAT, 10.0, 0.1, None, None),
+    ("INFLUXDB_SEND_TIMEOUT", FLOAT, 10.0, 0.1, None, None),
+    ("INFLUXDB_RESPONSE_TIMEOUT", FLOAT, 10.0, 0.1, None, None),
+    ("INFLUXDB_KEEP_ALIVE", BOOL, True, None, None, None),
+    ("INFLUXDB_IDLE_TIMEOUT", FLOAT, 30.0, 0.0, None, None),
+    ("INFLUXDB_BREAKER_THRESHOLD", INT, 3, 1, None, None),
+    ("INFLUXDB_BREAKER_DELAY", FLOAT, 30.0, 0.0, None, None),
+    ("INFLUXDB_BREAKER_MAX_DELAY", FLOAT, 900.0, 0.0, None, None),
+    ("REPORT_ON_CHANGE", BOOL, True, None, None, None),
+    ("REPORT_HEARTBEAT", INT, 300, 0, None, "REPORT_ON_CHANGE"),
+    ("REPORT_MAX_AGE", INT, 600, 0, None, "REPORT_ON_CHANGE"),
+    # Spool and boot backlog
+    ("SPOOL_ENABLED", BOOL, True, None, None, None),
+    ("SPOOL_PATH", STR, "/envirosnoop_spool.bin", None, None, "SPOOL_ENABLED"),
+    ("SPOOL_MAX_BYTES", INT, 32768, 256, None, "SPOOL_ENABLED"),
+    ("SPOOL_RAM_MAX_BYTES", INT, 8192, 256, None, "SPOOL_ENABLED"),
+    ("SPOOL_DRAIN_MAX_BYTES", INT, 8192, 256, None, "SPOOL_ENABLED"),
+    ("BOOT_BACKLOG_MAX_BYTES", INT, 8192, 0, None, None),
+    # Trace
+    ("TRACE_ENABLED", BOOL, False, None, None, None),
+    ("TRACE_PATH", STR, "/envirosnoop_trace.bin", None, None, "TRACE_ENABLED"),
+    ("TRACE_MAX_BYTES", INT, 262144, 1024, None, "TRACE_ENABLED"),
+    ("TRACE_BUFFER_BYTES", INT, 512, 64, None, "TRACE_ENABLED"),
+    ("TRACE_INTERVAL", INT, 5, 1, None, "TRACE_ENABLED"),
+)
+
+# Pairs of settings where the first must not be larger than the second
+ORDERED = (
+    ("NTP_MIN_INTERVAL", "NTP_MAX_INTERVAL"),
+    ("INFLUXDB_BREAKER_DELAY", "INFLUXDB_BREAKER_MAX_DELAY"),
+)
+
+class ConfigError(ValueError):
+    def __init__(self, errors):
+        super().__init__("%d problem(s) in settings.toml:\n  %s" % (len(errors), "\n  ".join(errors)))
+        self.errors = errors
+
+# ------------------------
+# Settings
+# ------------------------
+
+# The loaded settings, one attribute per key of SCHEMA (read-only once loaded)
+class Settings:
+    __slots__ = tuple(entry[0] for entry in SCHEMA)
+
+    def __init__(self, values):
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("settings are read-only")
+
+# ------------------------
+# Loader
+# ------------------------
+
+# Convert one raw os.getenv() value; returns the value, or raises ValueError with the reason
+def _convert(raw, kind, low, high):
+    if kind == BOOL:
+        text = str(raw).strip().lower()
+        if text not in ("true", "false"):
+            raise ValueError("expected TRUE or FALSE, got %r" % raw)
+        return text == "true"
+    if kind == STR:
+        return str(raw)
+    if kind == LEVEL:
+        level = parse_level(raw, None)
+        if level is None:
+            raise ValueError("unknown log level %r" % raw)
+        return level
+    if kind == CHOICE:
+        text = str(raw).strip().lower()
+        if text not in low:
+            raise ValueError("expected one of %s, got %r" % ("/".join(low), raw))
+        return text
+    try:
+        if kind == INT:
+            value = int(raw)
+        elif kind == HEX:
+            value = raw if isinstance(raw, int) else int(raw, 16)
+        else:
+            value = float(raw)
+    except ValueError:
+        raise ValueError("expected %s, got %r" % ("a number" if kind == FLOAT else "an integer", raw))
+    if low is not None and value < low:
+        raise ValueError("%s is below the minimum of %s" % (raw, low))
+    if high is not None and value > high:
+        raise ValueError("%s is above the maximum of %s" % (raw, high))
+    return value
+
+# Read and check every setting; returns a Settings object or raises ConfigError listing every problem
+def load():
+    values = {}
+    errors = []
+    for key, kind, default, low, high, enabled_by in SCHEMA:
+        raw = None
+        # Settings of a disabled subsystem aren't read (an enabling setting that failed counts as disabled)
+        if enabled_by is None or values.get(enabled_by):
+            raw = os.getenv(key)
+        if raw is None or raw == "":
+            if default is REQUIRED:
+                if enabled_by is None or values.get(enabled_by):
+                    errors.append("%s: missing" % key)
+                default = None
+            elif kind == LEVEL:
+                default = parse_level(default)
+            values[key] = default
+            continue
+        try:
+            values[key] = _convert(raw, kind, low, high)
+        except ValueError as e:
+            errors.append("%s: %s" % (key, e))
+            values[key] = None
+    for first, second in ORDERED:
+        if values[first] is not None and values[second] is not None and values[first] > values[second]:
+            errors.append("%s (%s) is larger than %s (%s)" % (first, values[first], second, values[second]))
+    if errors:
+        raise ConfigError(errors)
+    return Settings(values)
+
+# Read and check the deadbands of the given readings, e.g. {"bme680": ("temperature", ...)} reads
+# DEADBAND_BME680_TEMPERATURE. Returns {(device, field): (absolute, percent)} for the deadbands that are set, or
+# raises ConfigError listing every problem.
+def load_deadbands(devices):
+    deadbands = {}
+    errors = []
+    for device, fields in devices.items():
+        for field in fields:
+            key = ("DEADBAND_%s_%s" % (device, field)).upper()
+            raw = os.getenv(key)
+            if raw is None or raw == "":
+                continue
+            try:
+                absolute, percent = parse_deadband(str(raw))
+            except ValueError:
+                errors.append("%s: expected a number or a percentage, got %r" % (key, raw))
+                continue
+            if absolute < 0 or percent < 0:
+                errors.append("%s: %s is negative" % (key, raw))
+                continue
+            deadbands[(device, field)] = (absolute, percent)
+    if errors:
+        raise ConfigError(errors)
+    return deadbands
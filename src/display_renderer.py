@@ -0,0 +1,102 @@
+# EnviroSnoop Display Renderer 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Dirty-tracking renderer for the SSD1306 labels.
+# With auto_refresh on, displayio pushes a full 128x64 frame over the shared I2C bus whenever anything in the
+# group changes, even if a label was set to the text it already had. The renderer turns auto_refresh off, keeps
+# the last value and text per label, and only touches labels whose text actually changed:
+#
+#     slot = renderer.add(co2_label, "CO2: %d ppm", "CO2: --")
+#     renderer.set(slot, scd4x_co2)      # formats and updates the label only if the value changed
+#     await renderer.render()            # one refresh, and only if something changed
+#
+# The refresh runs as a low priority transaction on the I2C arbiter, so a frame push never lands in the middle
+# of a sensor read. Frames pushed and skipped (nothing changed) are counted. A refresh that fails on the bus
+# (OSError/RuntimeError from the I2C write) is counted in refresh_errors and leaves the renderer dirty, so the frame
+# is pushed again on the next render() instead of the error ending the display task.
+
+import time
+
+from i2c_arbiter import PRIORITY_LOW
+
+# ------------------------
+# Renderer
+# ------------------------
+
+class DisplayRenderer:
+    # display: displayio display (e.g. adafruit_displayio_ssd1306.SSD1306)
+    # bus: I2CArbiter the display shares with the sensors (None to refresh without arbitration)
+    def __init__(self, display, bus=None, device="ssd1306"):
+        self.display = display
+        self.bus = bus
+        self.device = device
+        # Refresh only when render() asks for it
+        display.auto_refresh = False
+        # Per label: [label, template, fallback text, last value, last text]
+        self._slots = []
+        # Set when a label (or anything else shown, see mark_dirty()) changed since the last frame
+        self.dirty = True
+        # Counters
+        self.frames_pushed = 0
+        self.frames_skipped = 0
+        self.refresh_errors = 0
+        self.refresh_max_ns = 0
+        # Error from the last refresh attempt (None if it didn't fail)
+        self.last_error = None
+
+    # Register a label. template is %-formatted with the value; fallback is shown while the value is None.
+    # Returns the slot number used with set().
+    def add(self, label, template, fallback):
+        self._slots.append([label, template, fallback, None, None])
+        return len(self._slots) - 1
+
+    # Show a value in a label. Formatting is skipped if the value hasn't changed, and the label is only
+    # touched if the resulting text differs from what it already shows.
+    def set(self, slot, value):
+        entry = self._slots[slot]
+        if value == entry[3] and entry[4] is not None:
+            return False
+        entry[3] = value
+        text = entry[2] if value is None else entry[1] % value
+        if text == entry[4]:
+            return False
+        entry[0].text = text
+        entry[4] = text
+        self.dirty = True
+        return True
+
+    # Flag a change made outside set() (e.g. drawing into a bitmap)
+    def mark_dirty(self):
+        self.dirty = True
+
+    # Push one frame if anything changed. Returns True if a frame was pushed; a failed push stays dirty.
+    async def render(self):
+        if not self.dirty:
+            self.frames_skipped += 1
+            return False
+        if self.bus is not None:
+            async with self.bus.transaction(self.device, PRIORITY_LOW):
+                pushed = self._refresh()
+        else:
+            pushed = self._refresh()
+        return pushed
+
+    def _refresh(self):
+        start = time.monotonic_ns()
+        self.last_error = None
+        try:
+            refreshed = self.display.refresh()
+        except (OSError, RuntimeError) as e:
+            # Bus error while pushing the frame; stay dirty and retry next time
+            self.refresh_errors += 1
+            self.last_error = e
+            return False
+        # refresh() returns False if displayio decided not to push the frame; stay dirty and retry next time
+        if refreshed is False:
+            return False
+        elapsed = time.monotonic_ns() - start
+        if elapsed > self.refresh_max_ns:
+            self.refresh_max_ns = elapsed
+        self.frames_pushed += 1
+        self.dirty = False
+        return True
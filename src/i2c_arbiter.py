@@ -0,0 +1,139 @@
+# EnviroSnoop Shared I2C Bus Arbiter 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# The SCD4X, BME680, RadSens and SSD1306 all share one busio.I2C object. This module lets each task await its
+# turn on the bus instead of busy-spinning on try_lock(): waiting tasks are queued by priority (FIFO within a
+# priority) and the other tasks keep running while they wait.
+#
+# The arbiter is cooperative. It doesn't hold the busio lock itself, because the sensor drivers lock the bus
+# on every transfer; a task simply runs its driver calls inside a transaction:
+#
+#     async with i2c_bus.transaction("bme680"):
+#         reading = bme680_sampler.sample(...)
+#
+# Per-device bus occupancy (time spent holding the bus) and wait time (time spent queued) are recorded so bus
+# contention can be measured.
+
+import asyncio
+import time
+
+# ------------------------
+# Priorities
+# ------------------------
+
+# Lower numbers are served first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# ------------------------
+# Statistics
+# ------------------------
+
+# Bus usage counters for one device
+class DeviceStats:
+    __slots__ = ("transactions", "busy_ns", "wait_ns", "max_wait_ns", "max_busy_ns")
+
+    def __init__(self):
+        self.transactions = 0
+        # Total time holding the bus
+        self.busy_ns = 0
+        # Total time queued waiting for the bus
+        self.wait_ns = 0
+        # Longest single wait and hold
+        self.max_wait_ns = 0
+        self.max_busy_ns = 0
+
+# ------------------------
+# Arbiter
+# ------------------------
+
+class I2CArbiter:
+    def __init__(self, i2c):
+        # The shared bus (kept for tasks that need raw access inside a transaction)
+        self.i2c = i2c
+        # Device currently holding the bus (None when free)
+        self.owner = None
+        # Queued waiters: lists of [priority, sequence, device, event]
+        self._waiters = []
+        self._sequence = 0
+        # Per-device statistics, keyed by device name
+        self.stats = {}
+        # When the current owner got the bus
+        self._granted_ns = 0
+
+    # Async context manager for one transaction on the bus
+    def transaction(self, device, priority=PRIORITY_NORMAL):
+        return _Transaction(self, device, priority)
+
+    # Wait for the bus. Prefer transaction(), which always releases it.
+    async def acquire(self, device, priority=PRIORITY_NORMAL):
+        stats = self.stats.get(device)
+        if stats is None:
+            stats = DeviceStats()
+            self.stats[device] = stats
+        start = time.monotonic_ns()
+        if self.owner is not None:
+            event = asyncio.Event()
+            self._sequence += 1
+            waiter = [priority, self._sequence, device, event]
+            self._waiters.append(waiter)
+            try:
+                await event.wait()
+            except BaseException:
+                # Cancelled while queued: leave the queue, or pass the bus on if it was just granted to us
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif self.owner == device:
+                    self.release()
+                raise
+        else:
+            self.owner = device
+        self._granted_ns = time.monotonic_ns()
+        waited = self._granted_ns - start
+        stats.transactions += 1
+        stats.wait_ns += waited
+        if waited > stats.max_wait_ns:
+            stats.max_wait_ns = waited
+
+    # Release the bus and hand it to the highest priority waiter
+    def release(self):
+        stats = self.stats.get(self.owner)
+        if stats is not None:
+            held = time.monotonic_ns() - self._granted_ns
+            stats.busy_ns += held
+            if held > stats.max_busy_ns:
+                stats.max_busy_ns = held
+        if not self._waiters:
+            self.owner = None
+            return
+        # Pick the waiter with the lowest (priority, sequence)
+        best = self._waiters[0]
+        for waiter in self._waiters:
+            if waiter[0] < best[0] or (waiter[0] == best[0] and waiter[1] < best[1]):
+                best = waiter
+        self._waiters.remove(best)
+        # Ownership passes directly, so nobody can jump the queue before the waiter runs
+        self.owner = best[2]
+        best[3].set()
+
+    # One-line summary of per-device bus usage (times in ms)
+    def summary(self):
+        parts = []
+        for device, stats in self.stats.items():
+            parts.append(f"{device}: {stats.transactions} tx, busy {stats.busy_ns // 1_000_000} ms (max {stats.max_busy_ns // 1_000_000}), wait {stats.wait_ns // 1_000_000} ms (max {stats.max_wait_ns // 1_000_000})")
+        return "; ".join(parts)
+
+class _Transaction:
+    def __init__(self, arbiter, device, priority):
+        self.arbiter = arbiter
+        self.device = device
+        self.priority = priority
+
+    async def __aenter__(self):
+        await self.arbiter.acquire(self.device, self.priority)
+        return self.arbiter.i2c
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.arbiter.release()
+        return False
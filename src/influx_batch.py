@@ -0,0 +1,128 @@
+# EnviroSnoop InfluxDB Line Protocol Batching 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# This module collects every reading that is ready during one send cycle and turns them into
+# newline-separated InfluxDB line protocol bodies, so a whole cycle can go out in a single HTTP POST
+# instead of one POST per field. Lines are written into a reusable LineEncoder buffer, or, with
+# preallocated=False, formatted one at a time (format_line()).
+
+from line_protocol import LineEncoder, float_format, format_line, make_prefix
+
+# ------------------------
+# Line Batch
+# ------------------------
+
+# A line batch holds the lines for one send cycle.
+# Each call to add_point() produces one line for one device, with all of that device's ready fields
+# sharing the line, e.g. "env,device=bme680,location=Some-Room temperature=21.5,humidity=40.1".
+# A line larger than max_bytes on its own is sent as a body by itself (counted in oversize).
+class LineBatch:
+    def __init__(self, measurement, location, max_bytes=4096, decimals=3, preallocated=True):
+        # Measurement name and location tag shared by every line in the batch
+        self.measurement = measurement
+        self.location = location
+        # Maximum size (in bytes) of a single POST body produced by bodies() (except for an oversize line)
+        self.max_bytes = max_bytes
+        self._float_format = float_format(decimals)
+        # Reusable buffer the current body is encoded into (preallocated mode), or the formatted lines of the
+        # current body and their total size with separators
+        self.encoder = LineEncoder(max_bytes, decimals) if preallocated else None
+        self._lines = []
+        self._size = 0
+        # Precomputed "measurement,device=...,location=... " prefix per device
+        self._prefixes = {}
+        # Bodies completed earlier in this cycle (only used when a cycle exceeds max_bytes)
+        self._full = []
+        # Lines larger than max_bytes (each sent in a body of its own)
+        self.oversize = 0
+
+    # Number of lines currently in the batch
+    def __len__(self):
+        current = self.encoder.lines if self.encoder is not None else len(self._lines)
+        return current + sum(body.count(b"\n") + 1 for body in self._full)
+
+    # Drop all collected lines (call at the start of each send cycle)
+    def clear(self):
+        if self.encoder is not None:
+            self.encoder.reset()
+        self._lines = []
+        self._size = 0
+        self._full = []
+
+    # Return the cached line prefix for a device
+    def prefix(self, device):
+        prefix = self._prefixes.get(device)
+        if prefix is None:
+            prefix = make_prefix(self.measurement, (("device", device), ("location", self.location)))
+            self._prefixes[device] = prefix
+        return prefix
+
+    # Add one line for a device.
+    # fields is a sequence of (name, value) pairs; pairs whose value is None are skipped.
+    # timestamp_ns optionally stamps the line (ns since the epoch).
+    # Returns True if a line was added (i.e. at least one field was ready).
+    def add_point(self, device, fields, timestamp_ns=None):
+        return self.add_prefixed(self.prefix(device), fields, timestamp_ns)
+
+    # Add one line with a prefix built by line_protocol.make_prefix() (used for other measurements,
+    # such as the internal metrics, that don't follow the measurement/device/location layout)
+    def add_prefixed(self, prefix, fields, timestamp_ns=None):
+        encoder = self.encoder
+        if encoder is None:
+            line = format_line(prefix, fields, timestamp_ns, self._float_format)
+            if line is None:
+                return False
+            self._add_line(line)
+            return True
+        for _ in range(2):
+            encoder.begin(prefix)
+            for name, value in fields:
+                encoder.field(name, value)
+            if encoder.end(timestamp_ns):
+                return True
+            if not encoder.overflow:
+                # Nothing ready for this line
+                return False
+            if not encoder.lines:
+                # A single line larger than the whole buffer
+                line = format_line(prefix, fields, timestamp_ns, self._float_format)
+                self.oversize += 1
+                self._full.append(line)
+                return True
+            # The buffer is full: set the current body aside and retry the line in an empty buffer
+            self._set_aside()
+        return False
+
+    # Yield the bodies for this cycle, each at most max_bytes long (unless it is a single oversize line).
+    # In preallocated mode the last body is a memoryview over the encoder buffer and is only valid until the batch
+    # is cleared.
+    def bodies(self):
+        for body in self._full:
+            yield body
+        if self.encoder is not None:
+            if self.encoder.lines:
+                yield self.encoder.view()
+        elif self._lines:
+            yield b"\n".join(self._lines)
+
+    # Add a formatted line to the current body, starting a new body if it doesn't fit
+    def _add_line(self, line):
+        size = len(line)
+        if size > self.max_bytes:
+            self.oversize += 1
+            self._full.append(line)
+            return
+        if self._lines and self._size + 1 + size > self.max_bytes:
+            self._set_aside()
+        self._size += size + 1 if self._lines else size
+        self._lines.append(line)
+
+    # Move the current body to the completed bodies and start a new one
+    def _set_aside(self):
+        if self.encoder is not None:
+            self._full.append(bytes(self.encoder.view()))
+            self.encoder.reset()
+        else:
+            self._full.append(b"\n".join(self._lines))
+            self._lines = []
+            self._size = 0
@@ -0,0 +1,246 @@
+# EnviroSnoop Line Protocol Encoder 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# This module turns readings into InfluxDB line protocol. Measurement + tag prefixes (e.g.
+# "env,device=bme680,location=Some-Room ") are built once and reused. Two ways of writing the lines produce the
+# same output:
+# - LineEncoder (the default, INFLUXDB_PREALLOCATED_ENCODER): writes lines straight into one preallocated
+#   bytearray, numbers digit by digit, and hands the body to the HTTP layer as a memoryview over the buffer.
+#   It doesn't build str/bytes objects per field (float fields still allocate).
+# - format_line(): str formatting, one bytes object per line. Also used for a line too large for the buffer.
+#
+# On CPython (bench/bench_line_protocol.py, one 17-field cycle) the encoder is the slowest way of encoding a cycle:
+# about 10-12 us per point, against 8-10 for format_line() and 6 for the old per-field f-strings. Its peak transient
+# allocation (764 bytes per cycle) is under half of format_line()'s (1638) but above the f-strings' (454), which
+# send one line per field and keep no body (993 bytes on the wire per cycle instead of 448). It is the default for
+# the smaller heap peak of the two batch paths; there are no gc.mem_alloc() figures from a device yet, so check with
+# the benchmark on the board before relying on it there.
+
+# ------------------------
+# Helpers
+# ------------------------
+
+# Escape a tag key/value or measurement name per the InfluxDB line protocol rules.
+# Commas, equals signs and spaces must be backslash-escaped in tags.
+def escape_tag(value):
+    value = str(value)
+    # Fast path: most tags (device names, locations) need no escaping at all
+    if "," not in value and "=" not in value and " " not in value:
+        return value
+    return value.replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+# Build the reusable "measurement,tag=value,... " prefix for a series.
+# tags is a sequence of (key, value) pairs. The trailing space separates the prefix from the fields.
+def make_prefix(measurement, tags):
+    parts = [escape_tag(measurement)]
+    for key, value in tags:
+        parts.append(f"{escape_tag(key)}={escape_tag(value)}")
+    return (",".join(parts) + " ").encode()
+
+# printf format writing a float with decimals decimal places
+def float_format(decimals):
+    return "%." + str(decimals) + "f"
+
+# Format a field value the way LineEncoder writes it (floats rounded to the format's decimals with trailing zeros
+# trimmed, ints as plain digits). Returns None for values that can't be written (None, NaN, inf).
+def format_value(value, float_fmt="%.3f"):
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value or value == _INF or value == -_INF:
+            return None
+        text = float_fmt % value
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        return "0" if text == "-0" else text
+    return str(int(value))
+
+# Format one line: prefix (from make_prefix()), fields as (name, value) pairs and an optional timestamp (ns since
+# the epoch). Returns the line as bytes, or None if none of the fields could be written.
+def format_line(prefix, fields, timestamp_ns=None, float_fmt="%.3f"):
+    parts = []
+    for name, value in fields:
+        text = format_value(value, float_fmt)
+        if text is not None:
+            parts.append(escape_tag(name) + "=" + text)
+    if not parts:
+        return None
+    if timestamp_ns is not None:
+        return prefix + (",".join(parts) + " " + str(timestamp_ns)).encode()
+    return prefix + ",".join(parts).encode()
+
+# Largest value written with the integer digit routine.
+# Kept below 2**30 so it stays a small int on CircuitPython (larger ints are heap allocated).
+_SMALL_INT_LIMIT = 1 << 30
+# Larger ints (the ns timestamps) are written in chunks of this many digits, each of which is a small int
+_CHUNK_DIGITS = 9
+_CHUNK = 10 ** _CHUNK_DIGITS
+# ASCII codes used while encoding
+_MINUS = 0x2D
+_DOT = 0x2E
+_ZERO = 0x30
+_COMMA = 0x2C
+_SPACE = 0x20
+_NEWLINE = 0x0A
+# Infinity, for rejecting values InfluxDB can't store
+_INF = float("inf")
+
+# ------------------------
+# Encoder
+# ------------------------
+
+class LineEncoder:
+    # capacity: size of the preallocated buffer in bytes
+    # decimals: number of decimal places written for float fields (trailing zeros are trimmed)
+    def __init__(self, capacity=4096, decimals=3):
+        self.buf = bytearray(capacity)
+        self._view = memoryview(self.buf)
+        self.capacity = capacity
+        self.decimals = decimals
+        self._scale = 10 ** decimals
+        # Number of bytes written so far
+        self.length = 0
+        # Number of complete lines in the buffer
+        self.lines = 0
+        # Set when a write didn't fit; the caller should roll back the partial line
+        self.overflow = False
+        # Start of the line currently being written and the number of fields in it
+        self._line_start = 0
+        self._fields = 0
+        # Cache of encoded field keys ("name=") so each is only encoded once
+        self._keys = {}
+
+    # Drop everything written so far (the buffer itself is reused)
+    def reset(self):
+        self.length = 0
+        self.lines = 0
+        self.overflow = False
+        self._line_start = 0
+        self._fields = 0
+
+    # Start a new line with a prefix built by make_prefix()
+    def begin(self, prefix):
+        self.overflow = False
+        self._line_start = self.length
+        self._fields = 0
+        if self.lines:
+            self._put_byte(_NEWLINE)
+        self._put_bytes(prefix)
+
+    # Add one field to the current line. int and float values are supported; NaN/inf are skipped.
+    # Returns True if the field was written.
+    def field(self, name, value):
+        if value is None:
+            return False
+        if isinstance(value, float) and (value != value or value == _INF or value == -_INF):
+            return False
+        key = self._keys.get(name)
+        if key is None:
+            key = (escape_tag(name) + "=").encode()
+            self._keys[name] = key
+        if self._fields:
+            self._put_byte(_COMMA)
+        self._put_bytes(key)
+        if isinstance(value, float):
+            self._put_float(value)
+        else:
+            self._put_int(int(value))
+        self._fields += 1
+        return True
+
+    # Finish the current line, optionally with a timestamp (ns since the epoch).
+    # Returns False (and removes the partial line) if the line had no fields or didn't fit.
+    def end(self, timestamp_ns=None):
+        if self._fields and timestamp_ns is not None:
+            self._put_byte(_SPACE)
+            self._put_int(timestamp_ns)
+        if not self._fields or self.overflow:
+            self.length = self._line_start
+            return False
+        self.lines += 1
+        return True
+
+    # memoryview of the encoded body (valid until the encoder is reset or written again)
+    def view(self):
+        return self._view[:self.length]
+
+    # ------------------------
+    # Low-level writers
+    # ------------------------
+
+    def _put_byte(self, byte):
+        if self.length >= self.capacity:
+            self.overflow = True
+            return
+        self.buf[self.length] = byte
+        self.length += 1
+
+    def _put_bytes(self, data):
+        end = self.length + len(data)
+        if end > self.capacity:
+            self.overflow = True
+            return
+        self._view[self.length:end] = data
+        self.length = end
+
+    # Write an integer in decimal without building a string.
+    # A large int (e.g. a 19-digit ns timestamp) is split into 9-digit chunks first, so only the split allocates
+    # (every step of the digit loop on a large int would allocate a new one on CircuitPython).
+    def _put_int(self, value):
+        if value < 0:
+            self._put_byte(_MINUS)
+            value = -value
+        if value >= _SMALL_INT_LIMIT:
+            high, low = divmod(value, _CHUNK)
+            self._put_int(high)
+            self._put_digits(low, _CHUNK_DIGITS)
+            return
+        self._put_digits(value, 1)
+
+    # Write a small non-negative int, most significant digit first, zero-padded to at least width digits
+    def _put_digits(self, value, width):
+        digits = 1
+        probe = value
+        while probe >= 10:
+            probe //= 10
+            digits += 1
+        if digits < width:
+            digits = width
+        end = self.length + digits
+        if end > self.capacity:
+            self.overflow = True
+            return
+        pos = end - 1
+        buf = self.buf
+        while True:
+            buf[pos] = _ZERO + value % 10
+            value //= 10
+            if pos == self.length:
+                break
+            pos -= 1
+        self.length = end
+
+    # Write a float with up to self.decimals decimal places, trimming trailing zeros
+    def _put_float(self, value):
+        scaled = value * self._scale
+        if scaled >= _SMALL_INT_LIMIT or scaled <= -_SMALL_INT_LIMIT:
+            # Too large for the small-int routine; rare, so fall back to the (allocating) str() form
+            self._put_bytes(str(value).encode())
+            return
+        scaled = int(round(scaled))
+        if scaled < 0:
+            self._put_byte(_MINUS)
+            scaled = -scaled
+        whole = scaled // self._scale
+        frac = scaled - whole * self._scale
+        self._put_int(whole)
+        if not frac:
+            return
+        # Trim trailing zeros from the fractional part
+        places = self.decimals
+        while frac % 10 == 0:
+            frac //= 10
+            places -= 1
+        self._put_byte(_DOT)
+        # Padded with the leading zeros of the fractional part (e.g. the 0 in 1.05)
+        self._put_digits(frac, places)
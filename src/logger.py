@@ -0,0 +1,153 @@
+# EnviroSnoop Structured Logger 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Level-filtered logging with deferred formatting and rate limiting.
+# Messages are passed as a %-style template plus arguments, e.g.
+#
+#     structured_log("SCD4X Data - CO2: %s ppm, Temp: %.2f deg C", usyslog.S_INFO, co2, temperature)
+#
+# and the template is only formatted once the message has passed the level filter and the rate limiter and at
+# least one sink is going to receive it. With no sinks configured (console and syslog both off) every call
+# returns after a single comparison.
+#
+# Rate limiting is per template: at most `burst` messages per template are emitted in each `interval` seconds.
+# The rest are counted, and a "suppressed N" summary is emitted with the next message from that template once
+# its window has passed (or by flush_suppressed()). Because it keys on the template rather than the formatted
+# text, repeated errors with changing details are collapsed too. When more templates are in use than the table
+# holds, the one used least recently is dropped (after emitting its pending summary) to make room.
+
+import time
+
+# ------------------------
+# Severity Levels
+# ------------------------
+
+# Syslog severities (the same values as the usyslog constants; lower is more severe)
+S_EMERG = 0
+S_ALERT = 1
+S_CRIT = 2
+S_ERR = 3
+S_WARN = 4
+S_NOTICE = 5
+S_INFO = 6
+S_DEBUG = 7
+
+# Names accepted by parse_level()
+LEVEL_NAMES = {
+    "EMERG": S_EMERG, "ALERT": S_ALERT, "CRIT": S_CRIT,
+    "ERR": S_ERR, "ERROR": S_ERR, "WARN": S_WARN, "WARNING": S_WARN,
+    "NOTICE": S_NOTICE, "INFO": S_INFO, "DEBUG": S_DEBUG,
+}
+
+# Turn a level name ("INFO") or number ("6") into a severity, falling back to default if it isn't recognised
+def parse_level(text, default=S_INFO):
+    if text is None:
+        return default
+    text = str(text).strip().upper()
+    if text in LEVEL_NAMES:
+        return LEVEL_NAMES[text]
+    try:
+        level = int(text)
+    except ValueError:
+        return default
+    return level if S_EMERG <= level <= S_DEBUG else default
+
+# ------------------------
+# Logger
+# ------------------------
+
+class Logger:
+    # min_level: most verbose severity that is emitted (S_INFO drops S_DEBUG)
+    # interval/burst: rate limit per template (interval 0 disables rate limiting)
+    # max_templates: number of templates tracked by the rate limiter. code.py has about 70; the table is sized
+    # above that so none are evicted in normal use (entries are only created for templates that are logged).
+    def __init__(self, min_level=S_INFO, interval=60, burst=20, max_templates=128):
+        self.min_level = min_level
+        self.interval = interval
+        self.burst = burst
+        self.max_templates = max_templates
+        # Callables taking (level, message)
+        self.sinks = []
+        # Effective threshold: -1 while there are no sinks, so every call is rejected by one comparison
+        self._threshold = -1
+        # Rate limiter state per template:
+        # [window start (s), messages in window, suppressed count, level, last used (s)]
+        self._windows = {}
+        # Counters
+        self.emitted = 0
+        self.suppressed = 0
+
+    # Add a sink that receives (level, message) for every emitted message
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        self._threshold = self.min_level
+
+    # Remove a sink (e.g. after the syslog client fails)
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+        if not self.sinks:
+            self._threshold = -1
+
+    # True if a message at this level would reach a sink (use to skip building expensive arguments)
+    def enabled_for(self, level):
+        return level <= self._threshold
+
+    # Log a message. level defaults to S_INFO; args are only applied to the template if the message is emitted.
+    def log(self, template, level=None, *args):
+        if level is None:
+            level = S_INFO
+        if level > self._threshold:
+            return
+        if self.interval:
+            now = time.monotonic()
+            window = self._windows.get(template)
+            if window is None:
+                if len(self._windows) >= self.max_templates:
+                    self._evict()
+                window = [now, 0, 0, level, now]
+                self._windows[template] = window
+            else:
+                window[4] = now
+            if now - window[0] >= self.interval:
+                if window[2]:
+                    self._emit(window[3], "suppressed %d similar messages: %s" % (window[2], template))
+                window[0] = now
+                window[1] = 0
+                window[2] = 0
+            if window[1] >= self.burst:
+                window[2] += 1
+                window[3] = level
+                self.suppressed += 1
+                return
+            window[1] += 1
+        if args:
+            try:
+                message = template % args
+            except (TypeError, ValueError):
+                message = template + " " + repr(args)
+        else:
+            message = template
+        self._emit(level, message)
+
+    # Emit the "suppressed N" summaries for every template that has suppressed messages pending
+    def flush_suppressed(self):
+        for template, window in self._windows.items():
+            if window[2]:
+                self._emit(window[3], "suppressed %d similar messages: %s" % (window[2], template))
+                window[2] = 0
+
+    # Drop the template used least recently (dicts aren't ordered on CircuitPython, so this is a scan)
+    def _evict(self):
+        oldest = None
+        for template, window in self._windows.items():
+            if oldest is None or window[4] < self._windows[oldest][4]:
+                oldest = template
+        window = self._windows.pop(oldest)
+        if window[2]:
+            self._emit(window[3], "suppressed %d similar messages: %s" % (window[2], oldest))
+
+    def _emit(self, level, message):
+        self.emitted += 1
+        for sink in self.sinks:
+            sink(level, message)
@@ -0,0 +1,146 @@
+# EnviroSnoop Memory Manager 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Replaces the unconditional gc.collect() calls that used to run after every display update, InfluxDB cycle and
+# NTP sync with a policy:
+# - an allocation threshold (gc.threshold) so the VM collects on its own after a set amount of allocation
+# - collection in idle windows from a low-rate background task, only when free memory is getting low and the
+#   event loop isn't running behind
+# - ensure_free() before memory-hungry operations (the TLS handshake needs a large contiguous block)
+# - per-task allocation high-water marks (the most a single iteration of a task allocated)
+# - optional fragmentation reporting (largest allocatable block), which is probed and therefore costs time
+#
+# gc.mem_free()/gc.mem_alloc()/gc.threshold() are CircuitPython/MicroPython APIs; on CPython the manager
+# degrades to plain gc.collect() calls and reports nothing.
+
+import asyncio
+import gc
+import time
+
+# ------------------------
+# Manager
+# ------------------------
+
+class MemoryManager:
+    # threshold_bytes: allocation amount after which the VM collects by itself (0 leaves the VM default)
+    # idle_free_bytes: collect from the idle task when free memory drops below this
+    # measure_fragmentation: probe for the largest free block when reporting (slow; diagnostics only)
+    def __init__(self, threshold_bytes=0, idle_free_bytes=40000, measure_fragmentation=False):
+        self.threshold_bytes = threshold_bytes
+        self.idle_free_bytes = idle_free_bytes
+        self.measure_fragmentation = measure_fragmentation
+        # gc.mem_free/mem_alloc are only available on CircuitPython/MicroPython
+        self.supported = hasattr(gc, "mem_free") and hasattr(gc, "mem_alloc")
+        # Counters
+        self.collections = 0
+        self.collect_ns = 0
+        self.collect_max_ns = 0
+        self.min_free = None
+        # Per-task allocation tracking: name -> [mem_alloc at wake, high-water bytes per iteration]
+        self.tasks = {}
+
+    # Apply the allocation threshold. Returns False if the VM has no gc.threshold().
+    def configure(self):
+        if not hasattr(gc, "threshold"):
+            return False
+        if self.threshold_bytes:
+            gc.threshold(self.threshold_bytes)
+        return True
+
+    # Run a collection and account for the time it took
+    def collect(self):
+        start = time.monotonic_ns()
+        gc.collect()
+        elapsed = time.monotonic_ns() - start
+        self.collections += 1
+        self.collect_ns += elapsed
+        if elapsed > self.collect_max_ns:
+            self.collect_max_ns = elapsed
+
+    # Current free heap in bytes (None where unsupported)
+    def free(self):
+        if not self.supported:
+            return None
+        free = gc.mem_free()
+        if self.min_free is None or free < self.min_free:
+            self.min_free = free
+        return free
+
+    # Collect only if fewer than reserve_bytes are free (call before TLS handshakes and other big allocations)
+    def ensure_free(self, reserve_bytes):
+        free = self.free()
+        if free is None or free < reserve_bytes:
+            self.collect()
+            return True
+        return False
+
+    # Background task: collect during idle windows when free memory is low.
+    # A wakeup that fires late means other tasks are busy, so the collection waits for a quieter moment.
+    async def idle_task(self, interval=1.0, max_lag=0.05):
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            if time.monotonic() - expected > max_lag:
+                continue
+            free = self.free()
+            if free is not None and free < self.idle_free_bytes:
+                self.collect()
+
+    # Mark the start of a task iteration (called when the task wakes up)
+    def begin(self, name):
+        if not self.supported:
+            return
+        entry = self.tasks.get(name)
+        if entry is None:
+            entry = [0, 0]
+            self.tasks[name] = entry
+        entry[0] = gc.mem_alloc()
+
+    # Mark the end of a task iteration and update its allocation high-water mark.
+    # A collection during the iteration makes the delta meaningless, so negative deltas are ignored.
+    def end(self, name):
+        if not self.supported:
+            return
+        entry = self.tasks.get(name)
+        if entry is None or not entry[0]:
+            return
+        allocated = gc.mem_alloc() - entry[0]
+        if allocated > entry[1]:
+            entry[1] = allocated
+
+    # Allocation high-water mark of a task (bytes allocated by its largest iteration), or None
+    def high_water(self, name):
+        entry = self.tasks.get(name)
+        return entry[1] if entry is not None else None
+
+    # Largest block that can currently be allocated, found by binary search (None where unsupported).
+    # Only probes when measure_fragmentation is enabled, since each probe is a real allocation.
+    def largest_free_block(self):
+        if not (self.supported and self.measure_fragmentation):
+            return None
+        low = 0
+        high = gc.mem_free()
+        while low < high:
+            size = (low + high + 1) // 2
+            try:
+                probe = bytearray(size)
+                del probe
+                low = size
+            except MemoryError:
+                high = size - 1
+        return low
+
+    # One-line memory report
+    def report(self):
+        if not self.supported:
+            return f"collections: {self.collections}"
+        free = self.free()
+        used = gc.mem_alloc()
+        total = free + used
+        text = f"Free: {free} bytes and {100 * free / total:.1f}%, Used: {used} bytes, Total: {total} bytes, Min free: {self.min_free} bytes, Collections: {self.collections} ({self.collect_ns // 1_000_000} ms, max {self.collect_max_ns // 1_000_000} ms)"
+        largest = self.largest_free_block()
+        if largest is not None:
+            text += f", Largest free block: {largest} bytes ({100 * largest / free:.1f}% of free)"
+        if self.tasks:
+            text += ", Task high-water: " + ", ".join(f"{name} {entry[1]}" for name, entry in self.tasks.items())
+        return text
@@ -0,0 +1,184 @@
+# EnviroSnoop PMS Frame Parser 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Incremental parser for the 32-byte frames sent by Plantower PMS5003/PMS7003 style PM2.5 sensors.
+# Instead of waiting on the UART for a whole frame (which blocks the event loop), PMSReader drains only the
+# bytes that are already waiting and PMSFrameParser assembles them into frames across as many calls as needed.
+# The parser resynchronises on the 0x42 0x4D header, checks the frame length and checksum, and skips
+# corrupted data without losing a following good frame.
+#
+# Frame layout (big-endian):
+#   0x42 0x4D | frame length (2 bytes, 28) | 13 data words (12 readings + reserved) | checksum (2 bytes)
+# The checksum is the sum of every byte before it.
+
+import asyncio
+import struct
+import time
+
+# ------------------------
+# Frame Format
+# ------------------------
+
+# Start-of-frame bytes
+START_1 = 0x42
+START_2 = 0x4D
+# Total frame size and the value of the frame length field (bytes after the length field)
+FRAME_SIZE = 32
+FRAME_LENGTH = FRAME_SIZE - 4
+
+# Names of the 12 readings, in frame order (also used as the InfluxDB field names)
+FIELD_NAMES = (
+    "pm10_standard", "pm25_standard", "pm100_standard",
+    "pm10_env", "pm25_env", "pm100_env",
+    "particles_03um", "particles_05um", "particles_10um",
+    "particles_25um", "particles_50um", "particles_100um",
+)
+# struct format for the 12 readings
+_FIELDS_FORMAT = ">12H"
+
+# ------------------------
+# Parser
+# ------------------------
+
+class PMSFrameParser:
+    # max_frames: number of complete frames kept for the consumer; the oldest is dropped when full
+    def __init__(self, max_frames=4):
+        # Assembly buffer: room for one frame plus one incoming chunk
+        self._buf = bytearray(FRAME_SIZE * 2)
+        self._view = memoryview(self._buf)
+        self._len = 0
+        # Complete frames (tuples of 12 ints, in FIELD_NAMES order), oldest first
+        self.frames = []
+        self.max_frames = max_frames
+        # Counters for diagnostics
+        self.frame_count = 0
+        self.checksum_errors = 0
+        self.skipped_bytes = 0
+        self.dropped_frames = 0
+
+    # Feed any number of received bytes. Returns the number of complete frames found.
+    def feed(self, data):
+        found = 0
+        data = memoryview(data)
+        while len(data):
+            # Copy as much as fits in the assembly buffer
+            room = len(self._buf) - self._len
+            take = min(room, len(data))
+            self._view[self._len:self._len + take] = data[:take]
+            self._len += take
+            data = data[take:]
+            found += self._scan()
+        return found
+
+    # Oldest complete frame, or None
+    def pop(self):
+        if self.frames:
+            return self.frames.pop(0)
+        return None
+
+    # Newest complete frame (discarding any older ones), or None
+    def latest(self):
+        if not self.frames:
+            return None
+        frame = self.frames[-1]
+        self.frames.clear()
+        return frame
+
+    # Extract every complete frame from the assembly buffer
+    def _scan(self):
+        buf = self._buf
+        found = 0
+        while True:
+            length = self._len
+            # Find the first possible start of frame
+            start = 0
+            while start < length and buf[start] != START_1:
+                start += 1
+            # A lone 0x42 at the very end may be the start of the next frame
+            if start < length - 1 and buf[start + 1] != START_2:
+                start += 1
+                self.skipped_bytes += start
+                self._discard(start)
+                continue
+            if start:
+                self.skipped_bytes += start
+                self._discard(start)
+                length = self._len
+            if length < 4:
+                return found
+            if (buf[2] << 8 | buf[3]) != FRAME_LENGTH:
+                # Not a real header (or a frame type we don't support); resync past this 0x42
+                self.skipped_bytes += 1
+                self._discard(1)
+                continue
+            if length < FRAME_SIZE:
+                return found
+            checksum = 0
+            for i in range(FRAME_SIZE - 2):
+                checksum += buf[i]
+            if checksum != (buf[FRAME_SIZE - 2] << 8 | buf[FRAME_SIZE - 1]):
+                # Corrupted frame: resync from the next byte so a good frame inside it isn't lost
+                self.checksum_errors += 1
+                self.skipped_bytes += 1
+                self._discard(1)
+                continue
+            self._push(struct.unpack_from(_FIELDS_FORMAT, buf, 4))
+            self._discard(FRAME_SIZE)
+            found += 1
+
+    # Queue a complete frame for the consumer
+    def _push(self, frame):
+        if len(self.frames) >= self.max_frames:
+            self.frames.pop(0)
+            self.dropped_frames += 1
+        self.frames.append(frame)
+        self.frame_count += 1
+
+    # Drop count bytes from the front of the assembly buffer
+    def _discard(self, count):
+        remaining = self._len - count
+        if remaining > 0:
+            self._view[0:remaining] = self._view[count:self._len]
+        self._len = max(remaining, 0)
+
+# ------------------------
+# Reader
+# ------------------------
+
+class PMSReader:
+    # uart: busio.UART (or anything with in_waiting and readinto)
+    # poll_interval: seconds to sleep between checks while waiting for a frame
+    def __init__(self, uart, parser=None, poll_interval=0.05, chunk_size=64):
+        self.uart = uart
+        self.parser = parser if parser is not None else PMSFrameParser()
+        self.poll_interval = poll_interval
+        # Preallocated receive buffer
+        self._chunk = bytearray(chunk_size)
+        self._chunk_view = memoryview(self._chunk)
+
+    # Drain the bytes currently waiting on the UART (never waits for more). Returns frames found.
+    def poll(self):
+        found = 0
+        while True:
+            waiting = self.uart.in_waiting
+            if not waiting:
+                return found
+            count = self.uart.readinto(self._chunk_view[:min(waiting, len(self._chunk))])
+            if not count:
+                return found
+            found += self.parser.feed(self._chunk_view[:count])
+
+    # Wait (yielding to the event loop) for a complete frame and return it.
+    # With latest=True, older queued frames are skipped and the newest one is returned.
+    # Raises RuntimeError if no frame arrives within timeout seconds (None waits forever), e.g. when the sensor
+    # is unplugged or has stopped sending.
+    async def read_frame(self, latest=False, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.poll()
+            frame = self.parser.latest() if latest else self.parser.pop()
+            if frame is not None:
+                return frame
+            if deadline is not None and time.monotonic() >= deadline:
+                raise RuntimeError("no frame received from the PM2.5 sensor in %s s" % timeout)
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,166 @@
+# EnviroSnoop Reading Store 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Bounded in-memory time series for every sensor reading.
+# Each channel (one field of one device, e.g. scd4x/co2) is a ring buffer made of two preallocated arrays:
+# the values (array('f'), or another typecode such as 'I' for counters that must stay exact) and the time each
+# value was stored (array('I'), milliseconds on the monotonic clock). Appending is O(1) and never allocates, and
+# the total footprint is fixed when the channels are created at boot.
+#
+# The sensor tasks append to their channels; the send and display tasks read the latest value or query a window
+# (the last N samples, or the samples since a point in time) for count/min/max/mean.
+#
+# Millisecond timestamps are stored modulo 2**32 (they wrap after about 49.7 days); ages are computed with
+# wrap-around arithmetic, so windows shorter than that are always correct.
+
+import time
+
+from array import array
+
+# Timestamps are kept modulo 2**32 ms
+TICKS_MASK = 0xFFFFFFFF
+
+# Current monotonic time in ms, modulo 2**32
+def ticks_ms():
+    return (time.monotonic_ns() // 1_000_000) & TICKS_MASK
+
+# Milliseconds from then to now (both from ticks_ms())
+def ticks_diff(now, then):
+    return (now - then) & TICKS_MASK
+
+# ------------------------
+# Channel
+# ------------------------
+
+class Channel:
+    __slots__ = ("device", "field", "size", "values", "times", "head", "count", "seq", "stats")
+
+    def __init__(self, device, field, size, typecode="f"):
+        self.device = device
+        self.field = field
+        self.size = size
+        self.values = array(typecode, [0] * size)
+        self.times = array("I", [0] * size)
+        # Index the next sample is written to, and the number of samples held
+        self.head = 0
+        self.count = 0
+        # Number of samples ever appended (identifies the latest sample, e.g. to tell whether it was already sent)
+        self.seq = 0
+        # Optional running statistics updated on every append (see aggregator.py)
+        self.stats = None
+
+    def __len__(self):
+        return self.count
+
+    # Store a sample (None is ignored). now_ms defaults to ticks_ms().
+    def append(self, value, now_ms=None):
+        if value is None:
+            return
+        head = self.head
+        self.values[head] = value
+        self.times[head] = ticks_ms() if now_ms is None else now_ms
+        self.head = (head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+        self.seq += 1
+        if self.stats is not None:
+            self.stats.add(value)
+
+    # Latest value, or None before the first sample
+    def last(self):
+        if not self.count:
+            return None
+        return self.values[(self.head - 1) % self.size]
+
+    # Time (ticks_ms) of the latest sample, or None before the first sample
+    def last_time(self):
+        if not self.count:
+            return None
+        return self.times[(self.head - 1) % self.size]
+
+    # Age in ms of the latest sample, or None before the first sample
+    def age_ms(self, now_ms=None):
+        if not self.count:
+            return None
+        return ticks_diff(ticks_ms() if now_ms is None else now_ms, self.times[(self.head - 1) % self.size])
+
+    # The i-th newest sample as (value, ticks_ms); i = 0 is the latest
+    def get(self, i):
+        index = (self.head - 1 - i) % self.size
+        return self.values[index], self.times[index]
+
+    # Number of samples (newest first) that are at most max_age_ms old
+    def count_since(self, max_age_ms, now_ms=None):
+        now = ticks_ms() if now_ms is None else now_ms
+        n = 0
+        while n < self.count and ticks_diff(now, self.times[(self.head - 1 - n) % self.size]) <= max_age_ms:
+            n += 1
+        return n
+
+    # (count, min, max, mean) over the newest n samples (all of them by default), or the ones at most max_age_ms old.
+    # min/max/mean are None when the window is empty.
+    def window(self, n=None, max_age_ms=None, now_ms=None):
+        if n is None or n > self.count:
+            n = self.count
+        if max_age_ms is not None:
+            since = self.count_since(max_age_ms, now_ms)
+            if since < n:
+                n = since
+        if not n:
+            return 0, None, None, None
+        values = self.values
+        index = (self.head - 1) % self.size
+        low = high = total = values[index]
+        for _ in range(n - 1):
+            index = (index - 1) % self.size
+            value = values[index]
+            total += value
+            if value < low:
+                low = value
+            elif value > high:
+                high = value
+        return n, low, high, total / n
+
+    # Bytes held by the two arrays
+    def footprint(self):
+        return self.size * (self.values.itemsize + self.times.itemsize)
+
+# ------------------------
+# Store
+# ------------------------
+
+class ReadingStore:
+    # size: samples kept per channel
+    def __init__(self, size=32):
+        self.size = size
+        # Channels grouped by device, in creation order: device -> list of (field, channel)
+        self.devices = {}
+
+    # Create a channel for one field of a device and return it
+    def add(self, device, field, typecode="f"):
+        channel = Channel(device, field, self.size, typecode)
+        fields = self.devices.get(device)
+        if fields is None:
+            fields = []
+            self.devices[device] = fields
+        fields.append((field, channel))
+        return channel
+
+    # Create channels for several fields of a device; returns them in the same order
+    def add_device(self, device, field_names, typecode="f"):
+        return tuple(self.add(device, field, typecode) for field in field_names)
+
+    # Look up a channel (None if it doesn't exist)
+    def channel(self, device, field):
+        for name, channel in self.devices.get(device, ()):
+            if name == field:
+                return channel
+        return None
+
+    # Total bytes held by all channels' arrays
+    def footprint(self):
+        return sum(channel.footprint() for fields in self.devices.values() for _, channel in fields)
+
+    # Number of channels
+    def __len__(self):
+        return sum(len(fields) for fields in self.devices.values())
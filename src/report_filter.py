@@ -0,0 +1,91 @@
+# EnviroSnoop Report Filter 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Decides, per channel and send cycle, whether a reading is worth writing to InfluxDB:
+# - samples that were already sent are skipped (each channel counts its samples, so a reading that hasn't been
+#   replaced since the last send, e.g. SCD4X between data_ready flags, has the same sequence number)
+# - a new sample within the channel's deadband of the last sent value is skipped (absolute, or percent of the
+#   last sent value, e.g. "0.1" or "0.5%")
+# - a heartbeat re-sends the latest value after heartbeat seconds without a write, so a slow-moving channel still
+#   gets a periodic point
+# - samples older than max_age seconds are never sent, so a sensor that stopped responding isn't reported as
+#   a flat line by the heartbeat
+#
+# A channel that is skipped keeps accumulating its window statistics (see aggregator.py), so the next point that
+# is sent summarises everything since the previous one.
+
+from reading_store import ticks_ms, ticks_diff
+
+# ------------------------
+# Deadbands
+# ------------------------
+
+# Parse a deadband setting: "0.1" (absolute) or "0.5%" (percent of the last sent value).
+# Returns (absolute, percent); an empty or missing setting is (0, 0), which only skips exact repeats.
+def parse_deadband(text):
+    if not text:
+        return 0.0, 0.0
+    text = text.strip()
+    if text.endswith("%"):
+        return 0.0, float(text[:-1])
+    return float(text), 0.0
+
+# ------------------------
+# Filter
+# ------------------------
+
+class ReportFilter:
+    # heartbeat: seconds after which an unchanged channel is sent anyway (0 disables)
+    # max_age: seconds after which a sample is considered stale and never sent (0 disables)
+    def __init__(self, heartbeat=300, max_age=600):
+        self.heartbeat_ms = int(heartbeat * 1000)
+        self.max_age_ms = int(max_age * 1000)
+        # Per channel: [absolute deadband, percent deadband, last sent sequence, last sent value, last sent ticks_ms]
+        self._state = {}
+        # Counters (fields)
+        self.sent = 0
+        self.skipped = 0
+
+    def _entry(self, channel):
+        entry = self._state.get(channel)
+        if entry is None:
+            entry = [0.0, 0.0, -1, None, 0]
+            self._state[channel] = entry
+        return entry
+
+    # Set a channel's deadband (absolute and/or percent of the last sent value)
+    def set_deadband(self, channel, absolute=0.0, percent=0.0):
+        entry = self._entry(channel)
+        entry[0] = absolute
+        entry[1] = percent
+
+    # True if the channel's latest sample should be written this cycle (and records it as sent)
+    def should_send(self, channel, now_ms=None):
+        if not channel.count:
+            return False
+        now = ticks_ms() if now_ms is None else now_ms
+        if self.max_age_ms and channel.age_ms(now) > self.max_age_ms:
+            self.skipped += 1
+            return False
+        entry = self._entry(channel)
+        value = channel.last()
+        if entry[3] is None:
+            send = True
+        elif self.heartbeat_ms and ticks_diff(now, entry[4]) >= self.heartbeat_ms:
+            send = True
+        elif channel.seq == entry[2]:
+            send = False
+        else:
+            band = entry[0]
+            relative = abs(entry[3]) * entry[1] / 100
+            if relative > band:
+                band = relative
+            send = abs(value - entry[3]) > band
+        if not send:
+            self.skipped += 1
+            return False
+        entry[2] = channel.seq
+        entry[3] = value
+        entry[4] = now
+        self.sent += 1
+        return True
@@ -0,0 +1,268 @@
+# EnviroSnoop Sensor Trace 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Record of what the device saw, for replaying a field problem on a host (see sim/replay.py): every reading the
+# sensor tasks stored, every sensor error and the outcome of every InfluxDB write, each stamped with ticks_ms().
+#
+# File layout (little-endian, packed with struct so the trace stays small):
+#   file header  b"ESTR" + version (1 byte), written at the start of every file
+#   record       kind (1 byte), id (1 byte), ticks_ms (4 bytes) and a payload whose size depends on the kind:
+#     NAME       name length (1 byte) + name, e.g. b"scd4x.co2" or b"scd4x"; defines what id means in this file
+#     READING    value (float32)                                      10 bytes per reading
+#     COUNT      value (uint32, for channels that must stay exact)    10 bytes per reading
+#                (a reading equal to the channel's previous one is not recorded)
+#     ERROR      code (int16): errno of an OSError, ERROR_RUNTIME or ERROR_OTHER
+#     WRITE      status (int16: HTTP status, STATUS_TIMEOUT or STATUS_ERROR), body bytes (uint32), ms taken (uint32)
+#     BOOT       no payload; starts a new run (ticks_ms restarts from the boot of that run)
+#
+# Records are packed into a preallocated RAM buffer and appended to flash when it fills up (or on flush()), so the
+# flash sees one write per buffer rather than one per reading. A file that grows past max_bytes is renamed to
+# path + ".old" (replacing the previous one) and a new file is started, so at most two files' worth is kept.
+# Like the spool, the trace needs a writable filesystem; on a read-only one the recorder stays disabled.
+
+import os
+import struct
+
+from reading_store import ticks_ms
+
+MAGIC = b"ESTR"
+VERSION = 1
+FILE_HEADER = MAGIC + bytes((VERSION,))
+
+# Record kinds
+KIND_NAME = 0
+KIND_READING = 1
+KIND_COUNT = 2
+KIND_ERROR = 3
+KIND_WRITE = 4
+KIND_BOOT = 5
+
+RECORD_FORMAT = "<BBI"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+# Payload formats (KIND_NAME has a variable payload)
+PAYLOAD_FORMATS = {
+    KIND_READING: "<f",
+    KIND_COUNT: "<I",
+    KIND_ERROR: "<h",
+    KIND_WRITE: "<hII",
+    KIND_BOOT: "",
+}
+
+# Error codes that are not an errno
+ERROR_RUNTIME = -1
+ERROR_OTHER = -2
+
+# Write statuses that are not an HTTP status
+STATUS_TIMEOUT = -1
+STATUS_ERROR = -2
+
+# Largest record (a NAME with a 255 byte name)
+_MAX_RECORD = RECORD_SIZE + 1 + 255
+
+# ------------------------
+# Recorder
+# ------------------------
+
+class TraceRecorder:
+    # enabled: False makes every method a no-op (so call sites need no checks)
+    # store: the ReadingStore whose channels capture() records
+    # path: trace file on the CIRCUITPY filesystem; max_bytes: size at which it is rotated
+    # buffer_size: bytes buffered in RAM between flash writes
+    def __init__(self, enabled, store=None, path="/envirosnoop_trace.bin", max_bytes=262144, buffer_size=512):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = False
+        # Counters for diagnostics
+        self.records = 0
+        self.missed = 0
+        self.bytes_written = 0
+        self.write_errors = 0
+        self._buffer = bytearray(max(buffer_size, _MAX_RECORD))
+        self._view = memoryview(self._buffer)
+        self._used = 0
+        self._file_bytes = 0
+        # Name -> id (assigned by NAME records, which are repeated at the start of every new file)
+        self._ids = {}
+        # [channel, name, seq recorded up to, kind, last value recorded] for every channel of the store
+        self._channels = []
+        if store is not None:
+            for device, fields in store.devices.items():
+                for field, channel in fields:
+                    kind = KIND_READING if channel.values.typecode in ("f", "d") else KIND_COUNT
+                    self._channels.append([channel, device + "." + field, channel.seq, kind, None])
+        if not enabled:
+            return
+        try:
+            self._file_bytes = os.stat(path)[6]
+        except OSError:
+            self._file_bytes = 0
+        try:
+            with open(path, "ab") as f:
+                if not self._file_bytes:
+                    f.write(FILE_HEADER)
+                    self._file_bytes = len(FILE_HEADER)
+        except OSError:
+            # Read-only filesystem (the CircuitPython default) or no space
+            return
+        self.enabled = True
+        self._record(KIND_BOOT, 0, None, ())
+
+    # Record the samples appended to the store's channels since the last call.
+    # A sample equal to the last one recorded for its channel is skipped (a replay holds every value until the next
+    # one anyway), which keeps slow-moving readings such as the PM2.5 concentrations cheap.
+    # Samples that were overwritten in a channel's ring buffer before they could be recorded are counted as missed.
+    def capture(self):
+        if not self.enabled:
+            return
+        for entry in self._channels:
+            channel, name, recorded, kind, last = entry
+            new = channel.seq - recorded
+            if not new:
+                continue
+            if new > channel.count:
+                self.missed += new - channel.count
+                new = channel.count
+            fmt = PAYLOAD_FORMATS[kind]
+            for i in range(new - 1, -1, -1):
+                value, now = channel.get(i)
+                if value == last:
+                    continue
+                self._record(kind, self._id(name), now, (value,), fmt)
+                last = value
+            entry[2] = channel.seq
+            entry[4] = last
+
+    # Record a sensor error (error is the exception the read task caught)
+    def error(self, device, error, now=None):
+        if not self.enabled:
+            return
+        if isinstance(error, OSError):
+            code = error.errno if isinstance(error.errno, int) and 0 < error.errno < 32768 else 5
+        elif isinstance(error, RuntimeError):
+            code = ERROR_RUNTIME
+        else:
+            code = ERROR_OTHER
+        self._record(KIND_ERROR, self._id(device), now, (code,))
+
+    # Record the outcome of an InfluxDB write: an HTTP status (or STATUS_TIMEOUT/STATUS_ERROR), the body size and
+    # how long the write took in ms
+    def write(self, status, size, elapsed_ms, now=None):
+        if not self.enabled:
+            return
+        self._record(KIND_WRITE, 0, now, (status, size, elapsed_ms))
+
+    # Append the buffered records to flash
+    def flush(self):
+        if not self.enabled or not self._used:
+            return
+        try:
+            if self._file_bytes + self._used > self.max_bytes:
+                self._rotate()
+            with open(self.path, "ab") as f:
+                f.write(self._view[:self._used])
+            self._file_bytes += self._used
+            self.bytes_written += self._used
+        except OSError:
+            # Keep going (the buffered records are lost); a full or failing filesystem shouldn't stop the device
+            self.write_errors += 1
+        self._used = 0
+
+    # Start a new file, keeping the current one as path + ".old". The new file defines the names in use again, so
+    # ids stay the same (and the buffered records stay valid).
+    def _rotate(self):
+        old = self.path + ".old"
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+        os.rename(self.path, old)
+        header = FILE_HEADER + b"".join(_name_record(ident, name) for name, ident in self._ids.items())
+        with open(self.path, "wb") as f:
+            f.write(header)
+        self._file_bytes = len(header)
+
+    # Id of a name in the current file, recording its NAME record first if it is new
+    def _id(self, name):
+        ident = self._ids.get(name)
+        if ident is None:
+            ident = len(self._ids)
+            if ident > 255:
+                # More names than ids; reuse the last one rather than failing
+                ident = 255
+            self._ids[name] = ident
+            record = _name_record(ident, name)
+            self._reserve(len(record))
+            self._buffer[self._used:self._used + len(record)] = record
+            self._used += len(record)
+        return ident
+
+    def _record(self, kind, ident, now, values, fmt=None):
+        if fmt is None:
+            fmt = PAYLOAD_FORMATS[kind]
+        if now is None:
+            now = ticks_ms()
+        size = RECORD_SIZE + struct.calcsize(fmt)
+        self._reserve(size)
+        struct.pack_into(RECORD_FORMAT, self._buffer, self._used, kind, ident, now)
+        if fmt:
+            struct.pack_into(fmt, self._buffer, self._used + RECORD_SIZE, *values)
+        self._used += size
+        self.records += 1
+
+    # Make room for size bytes in the buffer
+    def _reserve(self, size):
+        if self._used + size > len(self._buffer):
+            self.flush()
+
+# ------------------------
+# Reader
+# ------------------------
+
+# Decode trace data (the contents of a trace file) into records: (kind, name, ticks_ms, payload tuple).
+# name is the name the record's id stands for (None for WRITE and BOOT records). A torn record at the end (a
+# power cut during a write) and anything after it is ignored.
+def decode(data):
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not an EnviroSnoop trace")
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError("unsupported trace version %d" % data[len(MAGIC)])
+    names = {}
+    for kind, ident, now, payload in _parse(data[len(FILE_HEADER):], names):
+        yield kind, names.get(ident) if kind in (KIND_READING, KIND_COUNT, KIND_ERROR) else None, now, payload
+
+# Records of a trace file (see decode())
+def read_trace(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return decode(data)
+
+# NAME record defining ident as name
+def _name_record(ident, name):
+    encoded = name.encode()[:255]
+    return struct.pack("<BBIB", KIND_NAME, ident, 0, len(encoded)) + encoded
+
+# Parse raw records, keeping names (id -> name) up to date from the NAME records; yields the other records as
+# (kind, id, ticks_ms, payload)
+def _parse(data, names):
+    offset = 0
+    end = len(data)
+    while offset + RECORD_SIZE <= end:
+        kind, ident, now = struct.unpack_from(RECORD_FORMAT, data, offset)
+        offset += RECORD_SIZE
+        if kind == KIND_NAME:
+            if offset >= end or offset + 1 + data[offset] > end:
+                return
+            length = data[offset]
+            name = bytes(data[offset + 1:offset + 1 + length]).decode()
+            offset += 1 + length
+            names[ident] = name
+            continue
+        fmt = PAYLOAD_FORMATS.get(kind)
+        if fmt is None:
+            return
+        size = struct.calcsize(fmt)
+        if offset + size > end:
+            return
+        payload = struct.unpack_from(fmt, data, offset) if fmt else ()
+        offset += size
+        yield kind, ident, now, payload
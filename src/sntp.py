@@ -0,0 +1,194 @@
+# EnviroSnoop Async SNTP Client 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Non-blocking SNTP (RFC 4330) client that feeds the ClockModel (see clock_model.py).
+# Each sync sends a short burst of requests over a non-blocking UDP socket and yields to the other tasks while
+# waiting for the replies. For every reply the usual four timestamps give the offset and the round-trip delay:
+#
+#     t1 request sent (monotonic)    t2 request received (server)
+#     t4 reply received (monotonic)  t3 reply sent (server)
+#
+#     offset = ((t2 - t1) + (t3 - t4)) / 2      delay = (t4 - t1) - (t3 - t2)
+#
+# Since t1/t4 come from the monotonic clock, the offset maps the monotonic clock straight to UTC.
+# Outliers are filtered out:
+# - replies that don't answer our request (origin timestamp), come from an unsynchronized server (leap indicator 3,
+#   stratum 0 "kiss-o'-death") or have a round trip longer than max_delay are rejected
+# - of the valid replies in a burst, the one with the shortest round trip is used (queueing delay only ever adds
+#   error, so it is the most accurate)
+# - a result that is further than spike from what the clock model predicts is held back once; only if the next
+#   sync confirms it is the clock stepped
+#
+# next_interval() stretches the time to the next sync while the clock model predicts the syncs well (the
+# drift correction is working) and shrinks it when the prediction error grows, keeping the expected error at
+# each sync around a tolerance.
+
+import asyncio
+import struct
+import time
+
+try:
+    import errno
+    _EAGAIN = errno.EAGAIN
+    _ETIMEDOUT = errno.ETIMEDOUT
+except ImportError:
+    _EAGAIN = 11
+    _ETIMEDOUT = 110
+
+# Errors that only mean "no datagram yet" on a non-blocking socket (116 is ETIMEDOUT on CircuitPython)
+_WOULD_BLOCK = (_EAGAIN, _ETIMEDOUT, 116)
+
+# Seconds from the NTP era (1900) to the Unix epoch (1970)
+NTP_TO_UNIX = 2_208_988_800
+
+# Request header: leap indicator 0, version 4, mode 3 (client)
+_REQUEST = 0x23
+# Reply mode (server)
+_MODE_SERVER = 4
+
+# Pause between polls of the socket while waiting for a reply (seconds)
+POLL_INTERVAL = 0.01
+
+# ------------------------
+# Timestamps
+# ------------------------
+
+# NTP 64-bit timestamp (seconds and fraction) at offset in data, as ns since the Unix epoch
+def _read_timestamp(data, offset):
+    seconds, fraction = struct.unpack_from("!II", data, offset)
+    return (seconds - NTP_TO_UNIX) * 1_000_000_000 + ((fraction * 1_000_000_000) >> 32)
+
+# ------------------------
+# Poll Interval
+# ------------------------
+
+# Next sync interval (seconds) after a sync with prediction error error_ns over interval seconds.
+# Aims for an error of about tolerance_ns at the next sync, changing by at most a factor of two per sync and
+# staying within [low, high].
+def next_interval(interval, error_ns, tolerance_ns, low, high):
+    error = abs(error_ns)
+    if error * 2 <= tolerance_ns:
+        interval *= 2
+    elif error > tolerance_ns:
+        interval = max(interval // 2, interval * tolerance_ns // error)
+    if interval < low:
+        return low
+    if interval > high:
+        return high
+    return int(interval)
+
+# ------------------------
+# Client
+# ------------------------
+
+class SNTPClient:
+    # pool: socketpool.SocketPool (or the CPython socket module)
+    # timeout: seconds to wait for each reply
+    # samples: requests per sync (the reply with the shortest round trip is used)
+    # max_delay_ms: replies with a longer round trip are rejected
+    # spike_ms: a result this far from the clock model's prediction is only accepted when confirmed (0 disables)
+    def __init__(self, pool, server="pool.ntp.org", port=123, timeout=2, samples=4, max_delay_ms=500,
+                 spike_ms=1000):
+        self.pool = pool
+        self.server = server
+        self.port = port
+        self.timeout_ns = int(timeout * 1_000_000_000)
+        self.samples = samples
+        self.max_delay_ns = max_delay_ms * 1_000_000
+        self.spike_ns = spike_ms * 1_000_000
+        self._address = None
+        self._request = bytearray(48)
+        self._reply = bytearray(48)
+        # Set after a result was held back as a spike
+        self._spike = False
+        # Counters
+        self.requests = 0
+        self.replies = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.spikes = 0
+        # Round-trip delay and offset (UTC - monotonic) of the last result used (ns)
+        self.delay_ns = 0
+        self.offset_ns = 0
+
+    # Run one sync: measure a burst and feed the best result to the clock model.
+    # Returns the clock model's prediction error (ns), or None if there was no usable result.
+    async def sync(self, clock):
+        result = await self.measure()
+        if result is None:
+            return None
+        mono_ns, utc_ns, delay_ns = result
+        if self.spike_ns and clock.synced:
+            if abs(utc_ns - clock.to_epoch_ns(mono_ns)) > self.spike_ns and not self._spike:
+                # Hold it back until the next sync confirms it
+                self._spike = True
+                self.spikes += 1
+                return None
+        self._spike = False
+        self.delay_ns = delay_ns
+        self.offset_ns = utc_ns - mono_ns
+        return clock.update(utc_ns, mono_ns)
+
+    # Send a burst of requests; returns (monotonic ns, UTC ns, delay ns) of the reply with the shortest
+    # round trip, or None if there was no valid reply
+    async def measure(self):
+        if self._address is None:
+            # Resolved once (DNS lookups block on CircuitPython)
+            self._address = self.pool.getaddrinfo(self.server, self.port)[0][4]
+        sock = self.pool.socket(self.pool.AF_INET, self.pool.SOCK_DGRAM)
+        best = None
+        try:
+            sock.settimeout(0)
+            for _ in range(self.samples):
+                result = await self._query(sock)
+                if result is not None and (best is None or result[2] < best[2]):
+                    best = result
+        finally:
+            sock.close()
+        return best
+
+    # One request/reply exchange; returns (monotonic ns, UTC ns, delay ns) or None
+    async def _query(self, sock):
+        request = self._request
+        reply = self._reply
+        request[0] = _REQUEST
+        # The transmit timestamp is only used to match the reply (the server echoes it as the origin timestamp),
+        # so it carries t1 as an arbitrary 64-bit value
+        t1 = time.monotonic_ns()
+        struct.pack_into("!Q", request, 40, t1 & 0xFFFFFFFFFFFFFFFF)
+        try:
+            sock.sendto(request, self._address)
+        except OSError:
+            # Unreachable network etc.: resolve again next time
+            self._address = None
+            self.timeouts += 1
+            return None
+        self.requests += 1
+        while True:
+            try:
+                size = sock.recvfrom_into(reply)[0]
+                t4 = time.monotonic_ns()
+            except OSError as e:
+                if not e.args or e.args[0] not in _WOULD_BLOCK:
+                    raise
+                if time.monotonic_ns() - t1 > self.timeout_ns:
+                    self.timeouts += 1
+                    return None
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            if size < 48 or reply[24:32] != request[40:48]:
+                # Not a reply to this request (e.g. a late reply to an earlier one): keep waiting
+                continue
+            break
+        self.replies += 1
+        if reply[0] >> 6 == 3 or reply[0] & 7 != _MODE_SERVER or reply[1] == 0:
+            self.rejected += 1
+            return None
+        t2 = _read_timestamp(reply, 32)
+        t3 = _read_timestamp(reply, 40)
+        delay = (t4 - t1) - (t3 - t2)
+        if delay < 0 or delay > self.max_delay_ns:
+            self.rejected += 1
+            return None
+        offset = ((t2 - t1) + (t3 - t4)) // 2
+        return t4, t4 + offset, delay
@@ -0,0 +1,204 @@
+# EnviroSnoop Sparkline Graphs 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Rolling trend graphs for the OLED (graph mode).
+# Each page (CO2, temperature, radiation, ...) keeps a fixed-size history with one float per screen column.
+# Only the page on screen is drawn, onto one shared 1-bit canvas bitmap that is used as a ring:
+# - a new sample is drawn into a single column (the column that held the oldest sample) and the write position
+#   advances
+# - the canvas is shown through a TileGrid that has the bitmap twice side by side, shifted left by the write
+#   position, so the oldest column always appears at the left edge and the newest at the right
+# so the work per sample is one column of pixels plus moving the TileGrid, however long the history is.
+# The whole canvas is only redrawn when the page changes or a sample falls outside the current vertical range.
+
+import displayio
+
+from array import array
+
+# bitmaptools (CircuitPython) fills a column in C; fall back to per-pixel writes elsewhere
+try:
+    from bitmaptools import fill_region
+except ImportError:
+    fill_region = None
+
+# Fraction of the value range added above and below the data when a page is scaled
+RANGE_PADDING = 0.1
+
+# ------------------------
+# History
+# ------------------------
+
+# Fixed-size ring of samples (NaN marks a missing reading)
+class History:
+    def __init__(self, size):
+        self.size = size
+        self.values = array("f", [0.0] * size)
+        self.head = 0
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.head] = float("nan") if value is None else value
+        self.head = (self.head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    # Sample i, counting from the oldest
+    def get(self, i):
+        return self.values[(self.head - self.count + i) % self.size]
+
+    # Newest sample (NaN if empty)
+    def last(self):
+        return self.get(self.count - 1) if self.count else float("nan")
+
+    # (min, max) of the stored samples, or None if there are none
+    def bounds(self):
+        low = None
+        high = None
+        for i in range(self.count):
+            value = self.get(i)
+            if value != value:
+                continue
+            if low is None or value < low:
+                low = value
+            if high is None or value > high:
+                high = value
+        return None if low is None else (low, high)
+
+# ------------------------
+# Graph
+# ------------------------
+
+# One sensor's page: its history plus the title shown above the graph
+class Page:
+    def __init__(self, size, template, fallback, min_span):
+        self.history = History(size)
+        # %-template for the title, formatted with the latest value (fallback while there is none)
+        self.template = template
+        self.fallback = fallback
+        # Smallest vertical range, so sensor noise isn't magnified into full-height swings
+        self.min_span = min_span
+
+class SparklineGraph:
+    # width/height: size of the graph area in pixels; top: its y position on the display
+    def __init__(self, font, label_class, width=128, height=52, top=12, title_y=5):
+        self.width = width
+        self.height = height
+        self.pages = []
+        # Page on screen (None until show() is called)
+        self.active = None
+        # Vertical range of the active page
+        self.low = 0.0
+        self.high = 1.0
+        # Canvas (ring of columns) and its palette
+        self.bitmap = displayio.Bitmap(width, height, 2)
+        palette = displayio.Palette(2)
+        palette[0] = 0x000000
+        palette[1] = 0xFFFFFF
+        # Two tiles, both showing the whole canvas; shifting the grid left scrolls the ring
+        self.tile_grid = displayio.TileGrid(self.bitmap, pixel_shader=palette, width=2, height=1,
+                                            tile_width=width, tile_height=height, x=0, y=top)
+        # Next column to draw into
+        self.column = 0
+        self.title = label_class(font, text="", color=0xFFFFFF, x=0, y=title_y)
+        self.group = displayio.Group()
+        self.group.append(self.tile_grid)
+        self.group.append(self.title)
+
+    # Add a page. Returns its index (used with sample() and show()).
+    def add_page(self, template, fallback, min_span=1.0):
+        self.pages.append(Page(self.width, template, fallback, min_span))
+        return len(self.pages) - 1
+
+    # Record a sample for a page; if the page is on screen, draw it.
+    # Returns True if the screen content changed.
+    def sample(self, index, value):
+        page = self.pages[index]
+        page.history.append(value)
+        if index != self.active:
+            return False
+        self._set_title(page)
+        if value is not None and (value < self.low or value > self.high):
+            self._scale(page)
+            self._redraw(page)
+        else:
+            self._draw_column(page, page.history.count - 1)
+            self._advance()
+        return True
+
+    # Put a page on screen (rescales and redraws the canvas)
+    def show(self, index):
+        self.active = index
+        page = self.pages[index]
+        self._set_title(page)
+        self._scale(page)
+        self._redraw(page)
+
+    def _set_title(self, page):
+        value = page.history.last()
+        text = page.fallback if value != value else page.template % value
+        if self.title.text != text:
+            self.title.text = text
+
+    # Fit the vertical range to the page's history
+    def _scale(self, page):
+        bounds = page.history.bounds()
+        if bounds is None:
+            self.low, self.high = 0.0, page.min_span
+            return
+        low, high = bounds
+        span = high - low
+        if span < page.min_span:
+            middle = (low + high) / 2
+            low = middle - page.min_span / 2
+            high = middle + page.min_span / 2
+            span = page.min_span
+        self.low = low - span * RANGE_PADDING
+        self.high = high + span * RANGE_PADDING
+
+    # Redraw every column of the canvas from the page's history (oldest on the left)
+    def _redraw(self, page):
+        self._fill(0, 0, self.width, self.height, 0)
+        # Columns with no samples yet stay blank at the left edge
+        self.column = 0
+        for _ in range(self.width - page.history.count):
+            self._advance()
+        for i in range(page.history.count):
+            self._draw_column(page, i)
+            self._advance()
+
+    # Draw sample i of the page into the current column, joined to the previous sample by a vertical segment
+    def _draw_column(self, page, i):
+        x = self.column
+        self._fill(x, 0, x + 1, self.height, 0)
+        value = page.history.get(i)
+        if value != value:
+            return
+        y = self._y(value)
+        previous = page.history.get(i - 1) if i > 0 else value
+        top = y
+        bottom = y
+        if previous == previous:
+            py = self._y(previous)
+            top = min(y, py)
+            bottom = max(y, py)
+        self._fill(x, top, x + 1, bottom + 1, 1)
+
+    # Move the write position one column and shift the view so that column ends up at the right edge
+    def _advance(self):
+        self.column = (self.column + 1) % self.width
+        self.tile_grid.x = -self.column
+
+    # Pixel row for a value (0 is the top)
+    def _y(self, value):
+        row = int((self.high - value) * (self.height - 1) / (self.high - self.low))
+        return 0 if row < 0 else self.height - 1 if row >= self.height else row
+
+    # Fill the rectangle [x1, x2) x [y1, y2) of the canvas
+    def _fill(self, x1, y1, x2, y2, color):
+        if fill_region is not None:
+            fill_region(self.bitmap, x1, y1, x2, y2, color)
+            return
+        bitmap = self.bitmap
+        for x in range(x1, x2):
+            for y in range(y1, y2):
+                bitmap[x, y] = color
@@ -0,0 +1,393 @@
+# EnviroSnoop Store-and-Forward Spool 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# This module implements a bounded, append-only queue of timestamped line protocol records.
+# When a write to InfluxDB fails, the batch is appended here instead of being lost, and once connectivity
+# returns the queue is drained oldest-first in large bulk writes.
+#
+# Records are kept in a file on flash when the filesystem is writable (CircuitPython only allows this when
+# boot.py remounts the drive), otherwise they are kept in RAM with a smaller cap.
+#
+# On-flash framing (little-endian), one record after another:
+#   magic (1 byte, 0xA5) | payload length (2 bytes) | timestamp ns (8 bytes) | payload | crc32 (4 bytes)
+# The crc32 covers the timestamp and payload. A record cut short by a crash or power loss (or otherwise
+# damaged) fails its length/crc check and is dropped when the spool is opened.
+#
+# Records that were sent are not cut out of the file one drain step at a time: their magic byte is overwritten
+# with CONSUMED (one byte written in place), and the file is only compacted once the consumed records at its head
+# take up more than a quarter of the cap (or truncated once everything has been sent). Flash is then rewritten
+# about once per max_bytes / 4 drained, rather than once per drain step.
+#
+# If the flash fails (a write, read or rename raises OSError), the spool moves the records it can still read to
+# RAM and carries on there with the RAM cap; nothing it raises reaches the caller. Sent records whose marker
+# couldn't be written are sent again after the next boot (InfluxDB overwrites points with the same series and
+# timestamp, so this only costs the extra write).
+
+import os
+import struct
+
+# CircuitPython and CPython both normally provide binascii.crc32; fall back to a small pure-Python version
+try:
+    from binascii import crc32
+except ImportError:
+    def crc32(data, crc=0):
+        crc = crc ^ 0xFFFFFFFF
+        for byte in data:
+            crc ^= byte
+            for _ in range(8):
+                crc = (crc >> 1) ^ (0xEDB88320 if crc & 1 else 0)
+        return crc ^ 0xFFFFFFFF
+
+# ------------------------
+# Framing
+# ------------------------
+
+# Record marker byte, and the marker written over it once the record has been sent
+MAGIC = 0xA5
+CONSUMED = 0x5A
+_CONSUMED_BYTE = bytes((CONSUMED,))
+# Header layout: magic, payload length, timestamp (ns)
+HEADER_FORMAT = "<BHQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# Trailer layout: crc32 of timestamp + payload
+TRAILER_FORMAT = "<I"
+TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+# Bytes added to every payload by the framing
+OVERHEAD = HEADER_SIZE + TRAILER_SIZE
+# Largest payload that fits the 2-byte length field
+MAX_PAYLOAD = 0xFFFF
+
+# Chunk size used when copying records between files (keeps RAM use small)
+_COPY_CHUNK = 512
+
+# Encode one record into its on-flash frame (header[3:] is the timestamp, covered by the crc)
+def encode_record(timestamp_ns, payload):
+    header = struct.pack(HEADER_FORMAT, MAGIC, len(payload), timestamp_ns)
+    crc = crc32(payload, crc32(header[3:]))
+    return header + payload + struct.pack(TRAILER_FORMAT, crc & 0xFFFFFFFF)
+
+# Append a timestamp to every line of a payload that was spooled without one.
+# A timestamp of 0 means the lines already carry their own timestamps and are returned unchanged.
+def stamp_lines(payload, timestamp_ns):
+    if not timestamp_ns:
+        return bytes(payload)
+    suffix = b" " + str(timestamp_ns).encode()
+    return b"\n".join(line + suffix for line in bytes(payload).split(b"\n") if line)
+
+# Convert the timestamps of lines that were stamped on the monotonic clock (encoded before the first NTP sync) to
+# UTC, using a synced ClockModel
+def restamp_lines(payload, clock):
+    lines = []
+    for line in bytes(payload).split(b"\n"):
+        if not line:
+            continue
+        head, _, mono_ns = line.rpartition(b" ")
+        lines.append(head + b" " + str(clock.to_epoch_ns(int(mono_ns))).encode())
+    return b"\n".join(lines)
+
+# ------------------------
+# Spool
+# ------------------------
+
+class RecordSpool:
+    # path: file used on flash (None for RAM only)
+    # max_bytes: cap for the on-flash file, ram_max_bytes: cap when falling back to RAM
+    def __init__(self, path=None, max_bytes=32768, ram_max_bytes=8192):
+        self.path = path
+        # Size (framed bytes) of each queued record, oldest first
+        self._sizes = []
+        # Total framed bytes queued
+        self._bytes = 0
+        # Bytes of consumed records at the head of the file (the queued records start at this offset)
+        self._dead = 0
+        # RAM fallback storage: list of (timestamp_ns, payload) tuples, oldest first
+        self._ram = None
+        self._ram_max_bytes = ram_max_bytes
+        # Counters for diagnostics
+        self.evicted = 0
+        self.corrupt = 0
+        # Flash errors that moved the spool to RAM
+        self.flash_errors = 0
+        self.on_flash = False
+        self.max_bytes = ram_max_bytes
+        if path:
+            try:
+                self._open_file()
+                self.on_flash = True
+                self.max_bytes = max_bytes
+            except OSError:
+                # Read-only filesystem (the CircuitPython default) or no space; use RAM instead
+                if self._sizes:
+                    # Records found before the error (e.g. cleaning up a damaged file failed) move to RAM
+                    self._fall_back_to_ram()
+                self.on_flash = False
+        if not self.on_flash and self._ram is None:
+            self._ram = []
+
+    # Number of queued records
+    def __len__(self):
+        return len(self._sizes)
+
+    # Total framed bytes queued
+    @property
+    def size(self):
+        return self._bytes
+
+    # Queue one record. payload is the line protocol (str or bytes) and timestamp_ns the time to stamp it with.
+    # Returns False if the record could not be stored (e.g. larger than the whole spool, or the write failed).
+    # The oldest records are evicted only after the new one was stored.
+    def append(self, timestamp_ns, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        elif not isinstance(payload, bytes):
+            # memoryview/bytearray bodies point at reused buffers, so take a copy
+            payload = bytes(payload)
+        framed_size = len(payload) + OVERHEAD
+        if len(payload) > MAX_PAYLOAD or framed_size > self.max_bytes:
+            return False
+        if self.on_flash:
+            try:
+                with open(self.path, "ab") as f:
+                    f.write(encode_record(timestamp_ns, payload))
+                _sync()
+            except OSError:
+                # A write that failed partway (e.g. no space) may have left a torn record at the end of the file;
+                # it is dropped when the file is next opened. Keep the queue, and this record, in RAM from now on.
+                self._fall_back_to_ram()
+                if framed_size > self.max_bytes:
+                    return False
+        if not self.on_flash:
+            self._ram.append((timestamp_ns, payload))
+        self._sizes.append(framed_size)
+        self._bytes += framed_size
+        if self._bytes > self.max_bytes:
+            self._evict()
+        return True
+
+    # Return the oldest records, as (timestamp_ns, payload) tuples, up to max_bytes of payload.
+    # At least one record is returned if the spool is not empty. The records stay queued until discard().
+    def peek(self, max_bytes):
+        records = []
+        if not self._sizes:
+            return records
+        if not self.on_flash:
+            total = 0
+            for timestamp_ns, payload in self._ram:
+                if records and total + len(payload) > max_bytes:
+                    break
+                records.append((timestamp_ns, payload))
+                total += len(payload)
+            return records
+        total = 0
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._dead)
+                for size in self._sizes:
+                    if records and total + size - OVERHEAD > max_bytes:
+                        break
+                    record = _read_record(f)
+                    if record is None:
+                        raise OSError("spool record unreadable")
+                    records.append(record)
+                    total += size - OVERHEAD
+        except OSError:
+            self._fall_back_to_ram()
+            return self.peek(max_bytes)
+        return records
+
+    # Remove the oldest count records (after they were written successfully)
+    def discard(self, count):
+        count = min(count, len(self._sizes))
+        if count <= 0:
+            return
+        size = sum(self._sizes[:count])
+        if self.on_flash:
+            try:
+                self._consume(count)
+            except OSError:
+                # The records count as sent either way; the rest of the queue moves to RAM
+                self._discard_index(count, size)
+                self._fall_back_to_ram()
+                return
+        else:
+            del self._ram[:count]
+        self._discard_index(count, size)
+        if self.on_flash and (not self._sizes or self._dead > self.max_bytes // 4):
+            try:
+                self._compact()
+            except OSError:
+                self._fall_back_to_ram()
+
+    # Drop everything
+    def clear(self):
+        self.discard(len(self._sizes))
+
+    # Evict oldest records (never the newest one) until the spool is down to 3/4 of its cap, so a full spool
+    # isn't evicting on every append
+    def _evict(self):
+        target = (self.max_bytes * 3) // 4
+        count = 0
+        remaining = self._bytes
+        while count < len(self._sizes) - 1 and remaining > target:
+            remaining -= self._sizes[count]
+            count += 1
+        self.evicted += count
+        self.discard(count)
+
+    # Drop the oldest count records (size framed bytes in total) from the index
+    def _discard_index(self, count, size):
+        self._bytes -= size
+        del self._sizes[:count]
+        if self.on_flash:
+            self._dead += size
+
+    # Mark the oldest count records as consumed, in place
+    def _consume(self, count):
+        offset = self._dead
+        with open(self.path, "r+b") as f:
+            for size in self._sizes[:count]:
+                f.seek(offset)
+                f.write(_CONSUMED_BYTE)
+                offset += size
+        _sync()
+
+    # Stop using the file after a flash error: move the queued records that can still be read to RAM (the oldest
+    # are evicted if they exceed the RAM cap; unreadable ones are counted as corrupt)
+    def _fall_back_to_ram(self):
+        self.flash_errors += 1
+        records = []
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._dead)
+                for _ in self._sizes:
+                    record = _read_record(f)
+                    if record is None:
+                        break
+                    records.append(record)
+        except OSError:
+            pass
+        self.corrupt += len(self._sizes) - len(records)
+        self.on_flash = False
+        self.max_bytes = self._ram_max_bytes
+        self._ram = []
+        self._sizes = []
+        self._bytes = 0
+        self._dead = 0
+        for timestamp_ns, payload in records:
+            self.append(timestamp_ns, payload)
+
+    # Scan an existing spool file, index its valid records and drop anything damaged
+    def _open_file(self):
+        self._recover()
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            # No spool yet; make sure the file can be created (raises OSError on a read-only filesystem)
+            with open(self.path, "ab"):
+                pass
+            return
+        valid_bytes = 0
+        damaged = False
+        with f:
+            while True:
+                start = f.tell()
+                record = _read_record(f, True)
+                if record is None or (record is _CONSUMED_RECORD and self._sizes):
+                    # Anything left after the last good record is a torn or damaged tail (consumed records only
+                    # ever come before the queued ones)
+                    f.seek(start)
+                    if f.read(1):
+                        damaged = True
+                        self.corrupt += 1
+                    break
+                size = f.tell() - start
+                if record is _CONSUMED_RECORD:
+                    self._dead += size
+                    continue
+                self._sizes.append(size)
+                valid_bytes += size
+        self._bytes = valid_bytes
+        if damaged or (self._dead and not valid_bytes):
+            # Keep only the queued records
+            self._compact()
+
+    # Finish or undo a _copy_tail() that was interrupted by a crash or power loss
+    def _recover(self):
+        temp_path = self.path + ".tmp"
+        try:
+            os.stat(temp_path)
+        except OSError:
+            return
+        try:
+            os.stat(self.path)
+        except OSError:
+            # Cut after the old file was removed: the temporary file is complete, so it becomes the spool
+            os.rename(temp_path, self.path)
+            return
+        # Cut while the temporary file was being written: the old file is still intact
+        os.remove(temp_path)
+
+    # Rewrite the spool file with only the queued records (drops the consumed ones and anything after the last
+    # complete record)
+    def _compact(self):
+        self._copy_tail(self._dead, self._bytes)
+        self._dead = 0
+
+    # Replace the spool file with length bytes copied from offset onwards.
+    # The bytes are written to a temporary file, which replaces the spool once it is complete. A crash before the
+    # old file is removed leaves the old file (and a partial temporary file); a crash between the removal and the
+    # rename leaves only the complete temporary file. _recover() sorts out both when the spool is opened.
+    def _copy_tail(self, offset, length):
+        if length <= 0:
+            with open(self.path, "wb"):
+                pass
+            _sync()
+            return
+        temp_path = self.path + ".tmp"
+        with open(self.path, "rb") as src, open(temp_path, "wb") as dst:
+            src.seek(offset)
+            while length > 0:
+                chunk = src.read(min(_COPY_CHUNK, length))
+                if not chunk:
+                    break
+                dst.write(chunk)
+                length -= len(chunk)
+        _sync()
+        os.remove(self.path)
+        os.rename(temp_path, self.path)
+        _sync()
+
+# ------------------------
+# Helpers
+# ------------------------
+
+# Returned by _read_record() for a record that was already sent
+_CONSUMED_RECORD = ()
+
+# Read and verify one record from an open file, returning (timestamp_ns, payload) or None.
+# With consumed, a record marked as sent is returned as _CONSUMED_RECORD rather than None.
+def _read_record(f, consumed=False):
+    header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        return None
+    magic, length, timestamp_ns = struct.unpack(HEADER_FORMAT, header)
+    if magic != MAGIC and not (consumed and magic == CONSUMED):
+        return None
+    payload = f.read(length)
+    trailer = f.read(TRAILER_SIZE)
+    if len(payload) < length or len(trailer) < TRAILER_SIZE:
+        return None
+    if struct.unpack(TRAILER_FORMAT, trailer)[0] != crc32(payload, crc32(header[3:])) & 0xFFFFFFFF:
+        return None
+    if magic == CONSUMED:
+        return _CONSUMED_RECORD
+    return (timestamp_ns, payload)
+
+# Flush filesystem buffers where supported (os.sync exists on CircuitPython and most POSIX hosts)
+def _sync():
+    sync = getattr(os, "sync", None)
+    if sync is not None:
+        try:
+            sync()
+        except OSError:
+            pass
@@ -0,0 +1,165 @@
+# EnviroSnoop Queued Syslog Sink 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# A syslog sink for the Logger that never does network I/O on the caller's time.
+# enqueue() (the Logger sink) only stores the message in a fixed-size ring buffer; a separate asyncio task
+# (run()) resolves the server, sends the queued messages over a non-blocking UDP socket and yields between
+# datagrams. When the buffer is full, new messages are dropped and counted instead of blocking the sensor task
+# that logged them.
+#
+# Messages use the same "<PRI>message" framing as usyslog (facility user). UDP syslog carries one message per
+# datagram; with pack enabled, several queued messages are joined with newlines into one datagram (up to
+# max_datagram bytes). Only enable packing if the receiver splits datagrams on newlines.
+#
+# Counters: enqueued, sent, dropped (buffer full), send_errors and send latency (time from enqueue to send).
+
+import asyncio
+import time
+
+try:
+    import errno
+    _EAGAIN = errno.EAGAIN
+except ImportError:
+    _EAGAIN = 11
+
+# Syslog facility "user" (as used by usyslog)
+FACILITY_USER = 1
+
+# How long to wait before retrying after the server couldn't be resolved or the socket failed (seconds)
+RETRY_INTERVAL = 5
+
+# ------------------------
+# Sink
+# ------------------------
+
+class SyslogSink:
+    # pool: socketpool.SocketPool (or the CPython socket module)
+    # capacity: number of messages the ring buffer holds
+    # max_message: messages longer than this (in bytes, including the PRI header) are truncated
+    def __init__(self, pool, host, port=514, capacity=32, pack=False, max_datagram=1024, max_message=480,
+                 facility=FACILITY_USER):
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.pack = pack
+        self.max_datagram = max_datagram
+        self.max_message = max_message
+        self.facility = facility
+        # Ring buffer: parallel lists of encoded datagram parts and enqueue times
+        self.capacity = capacity
+        self._messages = [None] * capacity
+        self._times = [0] * capacity
+        self._head = 0
+        self._count = 0
+        # Set when a message is queued, so the drain task sleeps while the queue is empty
+        self._ready = asyncio.Event()
+        self._sock = None
+        self._address = None
+        # Counters
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.send_errors = 0
+        self.latency_ns = 0
+        self.latency_max_ns = 0
+
+    # Number of messages waiting to be sent
+    def __len__(self):
+        return self._count
+
+    # Logger sink: queue a message (never blocks; drops the message if the buffer is full)
+    def enqueue(self, level, message):
+        if self._count >= self.capacity:
+            self.dropped += 1
+            return False
+        data = ("<%d>%s" % ((self.facility << 3) + level, message)).encode()
+        if len(data) > self.max_message:
+            data = data[:self.max_message]
+        index = (self._head + self._count) % self.capacity
+        self._messages[index] = data
+        self._times[index] = time.monotonic_ns()
+        self._count += 1
+        self.enqueued += 1
+        self._ready.set()
+        return True
+
+    # Drain task: send queued messages as they arrive
+    async def run(self):
+        while True:
+            if not self._count:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            if self._sock is None:
+                try:
+                    self._open()
+                except (OSError, RuntimeError):
+                    self.send_errors += 1
+                    await asyncio.sleep(RETRY_INTERVAL)
+                    continue
+            await self._send_next()
+            # Let the other tasks run between datagrams
+            await asyncio.sleep(0)
+
+    # Resolve the server and create the non-blocking UDP socket
+    def _open(self):
+        self._address = self.pool.getaddrinfo(self.host, self.port)[0][4]
+        sock = self.pool.socket(self.pool.AF_INET, self.pool.SOCK_DGRAM)
+        sock.settimeout(0)
+        self._sock = sock
+
+    # Send the oldest message (or, with pack enabled, as many queued messages as fit in one datagram)
+    async def _send_next(self):
+        count = 1
+        data = self._messages[self._head]
+        if self.pack and self._count > 1:
+            size = len(data)
+            while count < self._count:
+                part = self._messages[(self._head + count) % self.capacity]
+                if size + 1 + len(part) > self.max_datagram:
+                    break
+                size += 1 + len(part)
+                count += 1
+            if count > 1:
+                data = b"\n".join([self._messages[(self._head + i) % self.capacity] for i in range(count)])
+        while True:
+            try:
+                self._sock.sendto(data, self._address)
+                break
+            except OSError as e:
+                if e.args and e.args[0] == _EAGAIN:
+                    # Socket buffer full: try again on the next pass of the event loop
+                    await asyncio.sleep(0)
+                    continue
+                # Unreachable network etc.: drop these messages and recreate the socket next time
+                self.send_errors += 1
+                self._close()
+                self._pop(count, None)
+                return
+        self._pop(count, time.monotonic_ns())
+
+    # Remove messages from the head of the buffer, recording their latency if they were sent
+    def _pop(self, count, now):
+        for _ in range(count):
+            if now is not None:
+                latency = now - self._times[self._head]
+                self.latency_ns += latency
+                if latency > self.latency_max_ns:
+                    self.latency_max_ns = latency
+                self.sent += 1
+            self._messages[self._head] = None
+            self._head = (self._head + 1) % self.capacity
+            self._count -= 1
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+
+    # Mean send latency in milliseconds (None before anything was sent)
+    @property
+    def latency_ms_mean(self):
+        return self.latency_ns / self.sent / 1_000_000 if self.sent else None
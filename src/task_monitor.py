@@ -0,0 +1,153 @@
+# EnviroSnoop Task Instrumentation 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Lightweight per-task timing for the asyncio tasks started in main().
+# Every task loop ends its iteration with "await task_monitor.sleep(name, seconds)" instead of asyncio.sleep().
+# That single call marks the iteration boundary, so the monitor can record:
+# - wall time per iteration (from waking up until the next sleep, including any awaited I/O)
+# - loop lag (how late the wakeup fired compared to the requested sleep)
+# - error counts (reported by the task's except clauses) and task crashes (from wrap())
+# The results are published as the envirosnoop_internal measurement, one line per task.
+#
+# When disabled, sleep() goes straight to asyncio.sleep() and nothing is recorded. When enabled, the time the
+# monitor spends on its own bookkeeping is accumulated too (overhead_us), so its cost is visible.
+#
+# If a MemoryManager is passed in, the same iteration boundary is used to track how much each task allocates per
+# iteration (its allocation high-water mark). This works whether or not the timing is enabled.
+
+import asyncio
+import time
+
+from line_protocol import make_prefix
+
+# ------------------------
+# Statistics
+# ------------------------
+
+class TaskStats:
+    __slots__ = ("prefix", "iterations", "errors", "crashes", "busy_ns", "busy_max_ns",
+                 "lag_ns", "lag_max_ns", "window_iterations", "window_wakes", "wake_ns")
+
+    def __init__(self, prefix):
+        # Encoded line prefix for this task's internal metrics
+        self.prefix = prefix
+        # Cumulative counters
+        self.iterations = 0
+        self.errors = 0
+        self.crashes = 0
+        # Per-publish-window sums and maxima (reset each time the stats are published)
+        self.busy_ns = 0
+        self.busy_max_ns = 0
+        self.lag_ns = 0
+        self.lag_max_ns = 0
+        self.window_iterations = 0
+        self.window_wakes = 0
+        # When the task last woke up (0 before its first sleep)
+        self.wake_ns = 0
+
+# ------------------------
+# Monitor
+# ------------------------
+
+class TaskMonitor:
+    # measurement/location: used for the published envirosnoop_internal lines
+    # memory: optional MemoryManager that tracks per-task allocation high-water marks
+    def __init__(self, enabled, location, measurement="envirosnoop_internal", memory=None):
+        self.enabled = enabled
+        self.memory = memory
+        self.location = location
+        self.measurement = measurement
+        # Per-task statistics, keyed by task name
+        self.tasks = {}
+        # Time spent in the monitor's own bookkeeping
+        self.overhead_ns = 0
+
+    # Statistics for a task (created on first use)
+    def stats(self, name):
+        stats = self.tasks.get(name)
+        if stats is None:
+            stats = TaskStats(make_prefix(self.measurement, (("location", self.location), ("task", name))))
+            self.tasks[name] = stats
+        return stats
+
+    # Sleep at the end of a task iteration, recording the iteration's wall time and the wakeup lag
+    async def sleep(self, name, seconds):
+        memory = self.memory
+        if not self.enabled:
+            if memory is None:
+                await asyncio.sleep(seconds)
+                return
+            memory.end(name)
+            await asyncio.sleep(seconds)
+            memory.begin(name)
+            return
+        if memory is not None:
+            memory.end(name)
+        now = time.monotonic_ns()
+        stats = self.stats(name)
+        if stats.wake_ns:
+            busy = now - stats.wake_ns
+            stats.iterations += 1
+            stats.window_iterations += 1
+            stats.busy_ns += busy
+            if busy > stats.busy_max_ns:
+                stats.busy_max_ns = busy
+        expected = now + int(seconds * 1_000_000_000)
+        self.overhead_ns += time.monotonic_ns() - now
+        await asyncio.sleep(seconds)
+        woke = time.monotonic_ns()
+        lag = woke - expected
+        stats.window_wakes += 1
+        if lag > 0:
+            stats.lag_ns += lag
+            if lag > stats.lag_max_ns:
+                stats.lag_max_ns = lag
+        stats.wake_ns = woke
+        if memory is not None:
+            memory.begin(name)
+        self.overhead_ns += time.monotonic_ns() - woke
+
+    # Count an error handled inside a task
+    def error(self, name):
+        if self.enabled:
+            self.stats(name).errors += 1
+
+    # Wrap a task coroutine so a crash (an exception escaping the task) is counted before it propagates
+    async def wrap(self, name, coro):
+        try:
+            return await coro
+        except Exception:
+            if self.enabled:
+                self.stats(name).crashes += 1
+            raise
+
+    # Add one envirosnoop_internal line per task to a LineBatch and start a new window.
+    # Times are in milliseconds; means and maxima cover the window since the previous publish.
+    def publish(self, batch, timestamp_ns=None):
+        if not self.enabled:
+            return
+        memory = self.memory
+        for name, stats in self.tasks.items():
+            count = stats.window_iterations
+            wakes = stats.window_wakes
+            batch.add_prefixed(stats.prefix, (
+                ("iterations", stats.iterations),
+                ("errors", stats.errors),
+                ("crashes", stats.crashes),
+                ("iter_ms_mean", stats.busy_ns / count / 1_000_000 if count else None),
+                ("iter_ms_max", stats.busy_max_ns / 1_000_000 if count else None),
+                ("lag_ms_mean", stats.lag_ns / wakes / 1_000_000 if wakes else None),
+                ("lag_ms_max", stats.lag_max_ns / 1_000_000 if wakes else None),
+                ("alloc_hw_bytes", memory.high_water(name) if memory is not None else None),
+            ), timestamp_ns)
+            stats.busy_ns = 0
+            stats.busy_max_ns = 0
+            stats.lag_ns = 0
+            stats.lag_max_ns = 0
+            stats.window_iterations = 0
+            stats.window_wakes = 0
+
+    # Monitor overhead in microseconds (cumulative)
+    @property
+    def overhead_us(self):
+        return self.overhead_ns // 1000
@@ -0,0 +1,172 @@
+# EnviroSnoop Non-Blocking HTTP Writer Tests 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Runs AsyncHTTPWriter against a plain HTTP server on 127.0.0.1 (CPython's socket module stands in for
+# socketpool) that drops kept connections in the ways real servers and NAT boxes do, or never answers.
+#
+# From the repository root:
+#   python -m pytest tests
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from async_http import AsyncHTTPWriter, HTTPTimeoutError
+
+BODY = b"env,device=bme680,location=Test temperature=21.5"
+
+# ------------------------
+# Local server
+# ------------------------
+
+# Threaded HTTP/1.1 server. behaviour(connection_number, request_number) returns what to do with each request on a
+# connection: "answer" (204 and keep the connection), "answer_close" (204, then close without saying so), "drop"
+# (read the request and close without answering) or "hang" (read the request and never answer).
+class Server:
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(8)
+        self.port = self.listener.getsockname()[1]
+        # Bodies received on each connection
+        self.connections = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                bodies = []
+                self.connections.append(bodies)
+                number = len(self.connections) - 1
+            threading.Thread(target=self._handle, args=(conn, number, bodies), daemon=True).start()
+
+    def _handle(self, conn, number, bodies):
+        data = b""
+        with conn:
+            while True:
+                while b"\r\n\r\n" not in data:
+                    chunk = conn.recv(1024)
+                    if not chunk:
+                        return
+                    data += chunk
+                head, _, data = data.partition(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                while len(data) < length:
+                    data += conn.recv(1024)
+                bodies.append(data[:length])
+                data = data[length:]
+                action = self.behaviour(number, len(bodies) - 1)
+                if action == "drop":
+                    return
+                if action == "hang":
+                    threading.Event().wait(5)
+                    return
+                conn.sendall(b"HTTP/1.1 204 No Content\r\n\r\n")
+                if action == "answer_close":
+                    return
+
+    def close(self):
+        self.listener.close()
+
+@pytest.fixture
+def server(request):
+    instance = Server(request.param)
+    yield instance
+    instance.close()
+
+def make_writer(server, **kwargs):
+    return AsyncHTTPWriter(socket, f"http://127.0.0.1:{server.port}/api/v2/write", {"Content-Type": "text/plain"},
+                           **kwargs)
+
+# Post each body in turn, pausing between posts; returns the statuses
+def post_all(writer, bodies, pause=0.05):
+    async def main():
+        statuses = []
+        for body in bodies:
+            status, _ = await writer.post(body)
+            statuses.append(status)
+            await asyncio.sleep(pause)
+        writer.close()
+        return statuses
+    return asyncio.run(main())
+
+# ------------------------
+# Tests
+# ------------------------
+
+@pytest.mark.parametrize("server", [lambda connection, request: "answer"], indirect=True)
+def test_connection_is_reused(server):
+    writer = make_writer(server)
+    assert post_all(writer, [BODY] * 5) == [204] * 5
+    assert writer.handshakes == 1
+    assert writer.reused == 4
+    assert len(server.connections) == 1
+
+@pytest.mark.parametrize("server", [lambda connection, request: "answer_close"], indirect=True)
+def test_connection_closed_while_idle_is_reopened(server):
+    writer = make_writer(server)
+    assert post_all(writer, [BODY] * 3) == [204] * 3
+    # The server closed each connection after answering; the writer notices before posting instead of failing
+    assert writer.stale == 2
+    assert writer.retries == 0
+    assert writer.handshakes == 3
+    assert [len(bodies) for bodies in server.connections] == [1, 1, 1]
+
+@pytest.mark.parametrize("server", [lambda connection, request: "drop" if request == 1 else "answer"], indirect=True)
+def test_connection_dropped_mid_request_is_retried_once(server):
+    writer = make_writer(server)
+    # The second post goes out on the kept connection, which the server drops without answering
+    assert post_all(writer, [BODY, BODY + b"1"], pause=0) == [204, 204]
+    assert writer.retries == 1
+    assert writer.handshakes == 2
+    assert server.connections[0] == [BODY, BODY + b"1"]
+    assert server.connections[1] == [BODY + b"1"]
+
+@pytest.mark.parametrize("server", [lambda connection, request: "answer"], indirect=True)
+def test_idle_connection_is_reopened_before_use(server):
+    writer = make_writer(server, idle_timeout=0.1)
+    assert post_all(writer, [BODY] * 3, pause=0.2) == [204] * 3
+    assert writer.idle_reconnects == 2
+    assert writer.handshakes == 3
+
+@pytest.mark.parametrize("server", [lambda connection, request: "hang"], indirect=True)
+def test_slow_server_times_out_without_blocking_the_loop(server):
+    writer = make_writer(server, response_timeout=0.3)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        try:
+            with pytest.raises(HTTPTimeoutError) as error:
+                await writer.post(BODY)
+        finally:
+            task.cancel()
+        return error.value
+
+    error = asyncio.run(main())
+    assert error.phase == "response"
+    # The other task kept running while the writer waited (about 30 ticks in 0.3 s)
+    assert ticks >= 15
+    # A timeout isn't retried on a new connection
+    assert writer.retries == 0
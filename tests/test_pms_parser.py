@@ -0,0 +1,78 @@
+# EnviroSnoop PMS Frame Parser Tests 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Feeds byte streams in the PMS5003/PMS7003 wire format to PMSFrameParser the way the UART delivers them
+# (split frames, corrupted frames, line noise, several frames per read) and checks what comes out.
+#
+# From the repository root:
+#   python -m pytest tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pms_parser import PMSFrameParser
+
+# Two consecutive frames from a sensor in clean indoor air
+FRAME_A = bytes.fromhex("424d001c000500080009000500080009040b0131003400060002000000000154")
+FRAME_B = bytes.fromhex("424d001c00060009000b00060009000b0462014b003c000800020001000001d8")
+VALUES_A = (5, 8, 9, 5, 8, 9, 1035, 305, 52, 6, 2, 0)
+VALUES_B = (6, 9, 11, 6, 9, 11, 1122, 331, 60, 8, 2, 1)
+
+# Feed chunks one read at a time; returns the frames parsed, oldest first
+def parse(parser, *chunks):
+    for chunk in chunks:
+        parser.feed(chunk)
+    frames = []
+    while True:
+        frame = parser.pop()
+        if frame is None:
+            return frames
+        frames.append(frame)
+
+def test_whole_frame():
+    parser = PMSFrameParser()
+    assert parse(parser, FRAME_A) == [VALUES_A]
+    assert parser.checksum_errors == 0
+    assert parser.skipped_bytes == 0
+
+def test_frame_split_across_reads():
+    parser = PMSFrameParser()
+    # Split inside the header, inside the data and right before the checksum
+    assert parse(parser, FRAME_A[:1], FRAME_A[1:3], FRAME_A[3:17], FRAME_A[17:30]) == []
+    assert parse(parser, FRAME_A[30:]) == [VALUES_A]
+    assert parser.checksum_errors == 0
+
+def test_bad_checksum_is_dropped_and_next_frame_kept():
+    parser = PMSFrameParser()
+    corrupted = bytearray(FRAME_A)
+    corrupted[10] ^= 0x04
+    assert parse(parser, bytes(corrupted), FRAME_B) == [VALUES_B]
+    assert parser.checksum_errors == 1
+    assert parser.frame_count == 1
+
+def test_leading_garbage():
+    parser = PMSFrameParser()
+    # Noise (including a stray 0x42 that isn't followed by 0x4D) from joining the stream mid-frame
+    garbage = bytes.fromhex("0131003442000600") + FRAME_B[-5:]
+    assert parse(parser, garbage + FRAME_A) == [VALUES_A]
+    assert parser.skipped_bytes == len(garbage)
+    assert parser.checksum_errors == 0
+
+def test_two_frames_in_one_read():
+    parser = PMSFrameParser()
+    assert parse(parser, FRAME_A + FRAME_B) == [VALUES_A, VALUES_B]
+    assert parser.frame_count == 2
+
+def test_truncated_frame_followed_by_a_good_one():
+    parser = PMSFrameParser()
+    # A frame cut short (the sensor was reset mid-frame) runs into the next header
+    assert parse(parser, FRAME_A[:20] + FRAME_B) == [VALUES_B]
+    assert parser.checksum_errors == 1
+
+def test_latest_skips_older_frames():
+    parser = PMSFrameParser()
+    parser.feed(FRAME_A + FRAME_B)
+    assert parser.latest() == VALUES_B
+    assert parser.pop() is None
@@ -0,0 +1,130 @@
+# EnviroSnoop SNTP Client Tests 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Runs SNTPClient against an NTP responder on 127.0.0.1 (CPython's socket module stands in for socketpool) whose
+# replies can be made to misbehave: a wrong origin timestamp, an unsynchronized server, a step in server time.
+#
+# From the repository root:
+#   python -m pytest tests
+
+import asyncio
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from clock_model import ClockModel
+from sntp import NTP_TO_UNIX, SNTPClient, next_interval
+
+# ------------------------
+# Local responder
+# ------------------------
+
+# NTP 64-bit timestamp for ns since the Unix epoch
+def ntp_timestamp(ns):
+    seconds, rest = divmod(ns, 1_000_000_000)
+    return struct.pack("!II", seconds + NTP_TO_UNIX, (rest << 32) // 1_000_000_000)
+
+class Responder:
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.05)
+        self.port = self.sock.getsockname()[1]
+        # Reply fields, changed by the tests
+        self.leap = 0
+        self.stratum = 2
+        self.step_ns = 0
+        self.origin = None
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while self._running:
+            try:
+                request, address = self.sock.recvfrom(48)
+            except OSError:
+                continue
+            now = time.time_ns() + self.step_ns
+            origin = self.origin if self.origin is not None else request[40:48]
+            reply = (bytes(((self.leap << 6) | (4 << 3) | 4, self.stratum)) + bytes(22) + origin
+                     + ntp_timestamp(now) + ntp_timestamp(now))
+            self.sock.sendto(reply, address)
+
+    def close(self):
+        self._running = False
+        self._thread.join()
+        self.sock.close()
+
+@pytest.fixture
+def responder():
+    server = Responder()
+    yield server
+    server.close()
+
+def make_client(responder, **kwargs):
+    kwargs.setdefault("timeout", 0.2)
+    kwargs.setdefault("samples", 2)
+    return SNTPClient(socket, "127.0.0.1", responder.port, **kwargs)
+
+# ------------------------
+# Tests
+# ------------------------
+
+def test_sync_maps_monotonic_to_utc(responder):
+    client = make_client(responder)
+    clock = ClockModel()
+    assert asyncio.run(client.sync(clock)) is not None
+    assert clock.synced
+    assert client.replies == 2
+    assert client.rejected == 0
+    # The model's time matches the responder's (the host clock) to well within the loopback round trip
+    assert abs(clock.to_epoch_ns(time.monotonic_ns()) - time.time_ns()) < 50_000_000
+
+def test_reply_to_another_request_is_ignored(responder):
+    responder.origin = bytes(8)
+    client = make_client(responder, samples=1)
+    clock = ClockModel()
+    assert asyncio.run(client.sync(clock)) is None
+    assert client.timeouts == 1
+    assert client.replies == 0
+    assert not clock.synced
+
+@pytest.mark.parametrize("leap, stratum", [(3, 2), (0, 0)])
+def test_unsynchronized_server_is_rejected(responder, leap, stratum):
+    responder.leap = leap
+    responder.stratum = stratum
+    client = make_client(responder)
+    clock = ClockModel()
+    assert asyncio.run(client.sync(clock)) is None
+    assert client.rejected == 2
+    assert not clock.synced
+
+def test_spike_is_held_back_until_confirmed(responder):
+    client = make_client(responder, spike_ms=1000)
+    clock = ClockModel()
+    assert asyncio.run(client.sync(clock)) is not None
+    # Server time steps 5 s: the first sync after the step is held back, the second confirms it
+    responder.step_ns = 5_000_000_000
+    assert asyncio.run(client.sync(clock)) is None
+    assert client.spikes == 1
+    assert abs(clock.to_epoch_ns(time.monotonic_ns()) - time.time_ns()) < 50_000_000
+    assert asyncio.run(client.sync(clock)) is not None
+    assert abs(clock.to_epoch_ns(time.monotonic_ns()) - time.time_ns() - 5_000_000_000) < 50_000_000
+
+def test_next_interval_adapts_within_bounds():
+    # Well inside the tolerance: double, up to the maximum
+    assert next_interval(300, 10_000_000, 50_000_000, 60, 86400) == 600
+    assert next_interval(80000, 0, 50_000_000, 60, 86400) == 86400
+    # Over the tolerance: shrink towards it (at most halving), not below the minimum
+    assert next_interval(600, 100_000_000, 50_000_000, 60, 86400) == 300
+    assert next_interval(100, 500_000_000, 50_000_000, 60, 86400) == 60
+    # In between: keep the interval
+    assert next_interval(600, 40_000_000, 50_000_000, 60, 86400) == 600
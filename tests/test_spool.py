@@ -0,0 +1,137 @@
+# EnviroSnoop Spool Tests 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Checks RecordSpool against a spool file in a temporary directory: records survive a reopen, damaged or torn
+# records are dropped, an interrupted compaction is recovered, and a failing flash moves the queue to RAM.
+#
+# From the repository root:
+#   python -m pytest tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import spool as spool_module
+from spool import OVERHEAD, RecordSpool
+
+RECORDS = [(1_000 + i, b"env,device=bme680 temperature=%d" % i) for i in range(4)]
+
+def filled(path, records=RECORDS, max_bytes=32768):
+    spool = RecordSpool(str(path), max_bytes)
+    for timestamp_ns, payload in records:
+        assert spool.append(timestamp_ns, payload)
+    return spool
+
+def test_records_survive_reopen(tmp_path):
+    path = tmp_path / "spool.bin"
+    spool = filled(path)
+    assert spool.on_flash
+    reopened = RecordSpool(str(path))
+    assert len(reopened) == len(RECORDS)
+    assert reopened.peek(1 << 16) == RECORDS
+
+def test_torn_tail_is_dropped(tmp_path):
+    path = tmp_path / "spool.bin"
+    filled(path)
+    # Power lost halfway through writing the last record
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 5)
+    reopened = RecordSpool(str(path))
+    assert reopened.peek(1 << 16) == RECORDS[:-1]
+    assert reopened.corrupt == 1
+    # The torn bytes are cut off, so new records follow the last good one
+    assert reopened.append(*RECORDS[-1])
+    assert RecordSpool(str(path)).peek(1 << 16) == RECORDS
+
+def test_crc_mismatch_drops_the_rest(tmp_path):
+    path = tmp_path / "spool.bin"
+    filled(path)
+    size = len(RECORDS[0][1]) + OVERHEAD
+    with open(path, "r+b") as f:
+        # Flip one payload byte of the third record
+        f.seek(2 * size + 15)
+        byte = f.read(1)[0]
+        f.seek(2 * size + 15)
+        f.write(bytes((byte ^ 0x01,)))
+    reopened = RecordSpool(str(path))
+    assert reopened.peek(1 << 16) == RECORDS[:2]
+    assert reopened.corrupt == 1
+
+def test_consumed_records_are_not_sent_again(tmp_path):
+    path = tmp_path / "spool.bin"
+    spool = filled(path)
+    spool.discard(1)
+    assert spool.peek(1 << 16) == RECORDS[1:]
+    reopened = RecordSpool(str(path))
+    assert reopened.peek(1 << 16) == RECORDS[1:]
+    reopened.clear()
+    assert len(RecordSpool(str(path))) == 0
+    assert os.path.getsize(path) == 0
+
+def test_interrupted_compaction_is_recovered(tmp_path):
+    path = tmp_path / "spool.bin"
+    filled(path)
+    # Cut between removing the old file and renaming the complete temporary file
+    os.rename(path, str(path) + ".tmp")
+    reopened = RecordSpool(str(path))
+    assert reopened.peek(1 << 16) == RECORDS
+    assert not os.path.exists(str(path) + ".tmp")
+
+def test_partial_temporary_file_is_discarded(tmp_path):
+    path = tmp_path / "spool.bin"
+    filled(path)
+    # Cut while the temporary file was being written: the old file is still complete
+    with open(str(path) + ".tmp", "wb") as f:
+        f.write(b"\xa5\x01")
+    reopened = RecordSpool(str(path))
+    assert reopened.peek(1 << 16) == RECORDS
+    assert not os.path.exists(str(path) + ".tmp")
+
+def test_peek_respects_max_bytes(tmp_path):
+    spool = filled(tmp_path / "spool.bin")
+    one = len(RECORDS[0][1])
+    assert spool.peek(2 * one) == RECORDS[:2]
+    # At least one record, even if it is larger than max_bytes
+    assert spool.peek(1) == RECORDS[:1]
+
+def test_eviction_keeps_newest(tmp_path):
+    size = len(RECORDS[0][1]) + OVERHEAD
+    spool = filled(tmp_path / "spool.bin", max_bytes=3 * size)
+    assert spool.evicted > 0
+    assert spool.peek(1 << 16)[-1] == RECORDS[-1]
+    assert spool.size <= 3 * size
+
+# Stand-in for open() that fails for the given modes, like a flash that stopped accepting writes
+def failing_open(modes):
+    def _open(path, mode="r", *args, **kwargs):
+        if mode in modes:
+            raise OSError(28, "No space left on device")
+        return open(path, mode, *args, **kwargs)
+    return _open
+
+def test_failed_append_moves_to_ram(tmp_path, monkeypatch):
+    spool = filled(tmp_path / "spool.bin", RECORDS[:2])
+    monkeypatch.setattr(spool_module, "open", failing_open(("ab",)), raising=False)
+    assert spool.append(*RECORDS[2])
+    assert not spool.on_flash
+    assert spool.flash_errors == 1
+    assert spool.peek(1 << 16) == RECORDS[:3]
+
+def test_failed_discard_moves_to_ram(tmp_path, monkeypatch):
+    spool = filled(tmp_path / "spool.bin")
+    monkeypatch.setattr(spool_module, "open", failing_open(("r+b",)), raising=False)
+    spool.discard(1)
+    assert not spool.on_flash
+    assert spool.peek(1 << 16) == RECORDS[1:]
+    spool.discard(3)
+    assert len(spool) == 0
+
+def test_unreadable_flash_drops_records_without_raising(tmp_path, monkeypatch):
+    spool = filled(tmp_path / "spool.bin")
+    monkeypatch.setattr(spool_module, "open", failing_open(("rb", "r+b", "ab", "wb")), raising=False)
+    assert spool.peek(1 << 16) == []
+    assert not spool.on_flash
+    assert spool.corrupt == len(RECORDS)
+    assert spool.append(*RECORDS[0])
+    assert spool.peek(1 << 16) == RECORDS[:1]
@@ -0,0 +1,100 @@
+# EnviroSnoop Syslog Sink Tests 20261016a
+# https://github.com/ageagainstthemachine/EnviroSnoop
+
+# Runs SyslogSink against a UDP listener on 127.0.0.1 (CPython's socket module stands in for socketpool) and
+# checks the datagrams it receives: framing, packing, truncation, drop-newest when the buffer is full and the
+# sent/dropped/latency counters.
+#
+# From the repository root:
+#   python -m pytest tests
+
+import asyncio
+import os
+import socket
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from syslog_sink import SyslogSink
+
+# Severities (usyslog values)
+S_ERR = 3
+S_INFO = 6
+
+@pytest.fixture
+def listener():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+def make_sink(listener, **kwargs):
+    return SyslogSink(socket, "127.0.0.1", listener.getsockname()[1], **kwargs)
+
+# Run the sink's drain task until its queue is empty
+def drain(sink):
+    async def main():
+        task = asyncio.create_task(sink.run())
+        while len(sink):
+            await asyncio.sleep(0.001)
+        task.cancel()
+    asyncio.run(main())
+
+# Datagrams received by the listener, in order
+def received(listener, count):
+    return [listener.recvfrom(2048)[0] for _ in range(count)]
+
+def test_one_datagram_per_message(listener):
+    sink = make_sink(listener)
+    assert sink.enqueue(S_INFO, "CO2: 612 ppm")
+    assert sink.enqueue(S_ERR, "BME680 sensor I/O error")
+    drain(sink)
+    # PRI is facility user (1) * 8 + severity
+    assert received(listener, 2) == [b"<14>CO2: 612 ppm", b"<11>BME680 sensor I/O error"]
+    assert sink.sent == 2
+    assert sink.send_errors == 0
+
+def test_pack_joins_messages_up_to_max_datagram(listener):
+    sink = make_sink(listener, pack=True, max_datagram=20)
+    for text in ("one", "two", "three", "four"):
+        sink.enqueue(S_INFO, text)
+    drain(sink)
+    # "<14>one\n<14>two" is 15 bytes; adding "<14>three" would make it 25
+    assert received(listener, 2) == [b"<14>one\n<14>two", b"<14>three\n<14>four"]
+    assert sink.sent == 4
+
+def test_long_message_is_truncated(listener):
+    sink = make_sink(listener, max_message=16)
+    sink.enqueue(S_INFO, "x" * 100)
+    drain(sink)
+    assert received(listener, 1) == [b"<14>" + b"x" * 12]
+
+def test_full_buffer_drops_newest(listener):
+    sink = make_sink(listener, capacity=2)
+    assert sink.enqueue(S_INFO, "first")
+    assert sink.enqueue(S_INFO, "second")
+    assert not sink.enqueue(S_INFO, "third")
+    assert sink.dropped == 1
+    assert sink.enqueued == 2
+    drain(sink)
+    assert received(listener, 2) == [b"<14>first", b"<14>second"]
+    # Room again once the queue has been sent
+    assert sink.enqueue(S_INFO, "fourth")
+    drain(sink)
+    assert received(listener, 1) == [b"<14>fourth"]
+    assert sink.dropped == 1
+
+def test_latency_counters(listener):
+    sink = make_sink(listener)
+    assert sink.latency_ms_mean is None
+    for i in range(3):
+        sink.enqueue(S_INFO, "message %d" % i)
+    drain(sink)
+    received(listener, 3)
+    assert sink.sent == 3
+    assert sink.latency_ms_mean is not None
+    assert 0 <= sink.latency_ms_mean * 1_000_000 <= sink.latency_max_ns
+    assert sink.latency_ns >= sink.latency_max_ns